@@ -1,33 +1,32 @@
 # File: scripts/news_merge_json_files.py
 
+import argparse
 import os
-import json
+import sys
+
+# Make the packages under src/ importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from news_fetch import news_merge
 
 # Define the directory containing the JSON files
 directory = '../data/news'
 
-# Initialize an empty dictionary to hold the merged data
-merged_data = {}
-
-# Loop over all files in the directory
-for filename in os.listdir(directory):
-    if filename.endswith('.json'):
-        # Construct the full file path
-        filepath = os.path.join(directory, filename)
-        
-        # Read the content of the JSON file
-        with open(filepath, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-        
-        # Use the filename (without the extension) as the key in the merged dictionary
-        key = os.path.splitext(filename)[0]
-        merged_data[key] = data
-
-# Define the output file path
-output_file = os.path.join(directory, 'merged_news_data.json')
-
-# Write the merged data to a new JSON file
-with open(output_file, 'w', encoding='utf-8') as outfile:
-    json.dump(merged_data, outfile, ensure_ascii=False, indent=4)
-
-print(f"Merged data has been written to {output_file}")
\ No newline at end of file
+# Define the output file paths (JSON Lines, one day per line, plus its offset index)
+output_file = os.path.join(directory, 'merged_news_data.jsonl')
+json_output_file = os.path.join(directory, 'merged_news_data.json')
+
+parser = argparse.ArgumentParser(description="Merge the daily news files into one JSON Lines file.")
+parser.add_argument('--full', action='store_true', help="Rebuild from scratch instead of appending new days")
+parser.add_argument('--json', action='store_true', help=f"Also write the {{key: stories}} file {json_output_file}")
+args = parser.parse_args()
+
+# Stream the daily files, ordered by (counter, date), validating the file names in the same pass
+written, invalid_files = news_merge.merge_day_files(directory, output_file, incremental=not args.full)
+for filename in invalid_files:
+    print(f"Invalid key found: '{os.path.splitext(filename)[0]}' (skipped)")
+
+print(f"{written} day file(s) merged into {output_file}")
+
+if args.json:
+    news_merge.export_json_object(output_file, json_output_file, indent=4, ensure_ascii=False)
+    print(f"Merged data has been written to {json_output_file}")
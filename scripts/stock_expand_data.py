@@ -1,38 +1,24 @@
-import json
-from collections import OrderedDict
+import os
+import sys
 
-# Load the JSON files
-with open('../data/stock/_daily_SPY.json', 'r') as daily_file:
-    daily_data = json.load(daily_file)
+# Make the packages under src/ importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from stock_fetch import preprocess, series_store
 
-with open('../data/stock/reverse_daily_SPY.json', 'r') as reverse_file:
-    reverse_data = json.load(reverse_file)
+# Load the time series from both files
+daily_series = series_store.load_series('../data/stock/_daily_SPY.json')
+reverse_series = series_store.load_series('../data/stock/reverse_daily_SPY.json')
 
-# Get the time series from both files
-daily_time_series = daily_data["Time Series (Daily)"]
-reverse_time_series = reverse_data["Time Series (Daily)"]
+# Refactor reverse_series to have negative index starting at 0_date, -1_date, -2_date, etc.
+reverse_series = preprocess.index_positions(reverse_series, start=0, step=-1)
 
-# Refactor reverse_time_series to have negative index starting at 0_date, -1_date, -2_date, etc.
-refactored_reverse_series = {}
-for i, (key, value) in enumerate(reverse_time_series.items()):
-    # Extract the date part from the original key and create the new key with a negative index
-    date = key.split('_')[1]
-    new_key = f"{-i}_{date}"  # Example: 0_2022-02-01, -1_2022-02-02
-    refactored_reverse_series[new_key] = value
+# Merge both time series (daily rows win on identical keys, as with {**reverse, **daily})
+merged_series = preprocess.merge_with(reverse_series, daily_series)
 
-# Merge both time series dictionaries
-merged_series = {**refactored_reverse_series, **daily_time_series}
+# Sort the merged series by the numeric part of the key (stable, keeping date order in mind)
+sorted_series = preprocess.sort_by_position(merged_series)
 
-# Sort the merged series by the numeric part of the key (keeping date in mind)
-sorted_series = OrderedDict(sorted(merged_series.items(), key=lambda x: int(x[0].split('_')[0])))
-
-# Create a new dictionary to hold the final structure
-merged_data = {
-    "Time Series (Daily)": sorted_series
-}
-
-# Save the merged and sorted data to a new JSON file
-with open('../data/stock/merged_daily_SPY.json', 'w') as merged_file:
-    json.dump(merged_data, merged_file, indent=4)
+# Save the merged and sorted data (columnar plus the JSON export)
+series_store.save_series('../data/stock/merged_daily_SPY.json', sorted_series)
 
 print("Merging complete. File saved as 'data/stock/merged_daily_SPY.json'.")
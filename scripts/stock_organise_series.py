@@ -1,35 +1,24 @@
 # File: scripts/stock_organise_series.py
 
-import json
+import os
+import sys
+
+# Make the packages under src/ importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from stock_fetch import preprocess, series_store
 
 # Constants for the JSON data keys and paths
 DATA_TIME_SERIES = "Time Series (Daily)"
 PATH_SOURCE = "../data/stock/daily_SPY.json"
 PATH_OUTPUT = "../data/stock/reverse_daily_SPY.json"
 
-# Load the JSON data from a file
-with open(PATH_SOURCE, 'r') as file:
-    data = json.load(file)
-
-# Extract the time series data
-time_series = data[DATA_TIME_SERIES]
-
-# Reverse the order of the time series
-reversed_time_series = dict(list(time_series.items())) # dict(reversed(list(time_series.items())))
-
-# Add a counter to each date
-counter = 1
-new_time_series = {}
-for date in reversed_time_series:
-    new_key = f"{counter}_{date}"
-    new_time_series[new_key] = reversed_time_series[date]
-    counter += 1
+# Load the time series (columnar copy if present, otherwise the JSON file)
+series = series_store.load_series(PATH_SOURCE, DATA_TIME_SERIES)
 
-# Update the original data with the new time series
-data[DATA_TIME_SERIES] = new_time_series
+# The series keeps its stored order (it is not reversed); add a counter to each date
+series = preprocess.index_positions(series, start=1)
 
-# Save the updated data back to a file
-with open(PATH_OUTPUT, 'w') as file:
-    json.dump(data, file, indent=4)
+# Save the updated series (columnar plus the JSON export)
+series_store.save_series(PATH_OUTPUT, series, DATA_TIME_SERIES)
 
-print("The order has been reversed and the counter has been added.")
\ No newline at end of file
+print("The order has been reversed and the counter has been added.")
@@ -0,0 +1 @@
+# File: src/benchmarks/__init__.py
\ No newline at end of file
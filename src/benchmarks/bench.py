@@ -0,0 +1,239 @@
+# File: src/benchmarks/bench.py
+
+# Benchmarks for the data and metrics hot paths, on synthetic inputs (see synthetic.py).
+#
+#     cd src && python -m cli bench --scale 1 10 100
+#
+# Each benchmark builds its input at `base size x scale` (1x is about the size of the real
+# dataset), times the stage `--repeat` times and then runs it once more under tracemalloc for the
+# peak memory. Results are written to data/benchmarks/bench-<timestamp>.json and compared with a
+# baseline run (data/benchmarks/baseline.json, written with --save-baseline). A stage that got
+# slower or bigger than the baseline by more than the tolerance is reported as a regression, and
+# the command then exits with status 1.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import synthetic
+from common.settings import data_path
+
+RESULTS_DIR = data_path('benchmarks')
+BASELINE_PATH = data_path('benchmarks', 'baseline.json')
+SCALES = (1, 10, 100)
+# Relative slow-down (or memory growth) reported as a regression
+TOLERANCE = 0.25
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.002
+MIN_BYTES = 1 << 20
+
+# Benchmark name -> (setup function(size, workdir) returning the callable to time, base size)
+BENCHMARKS = {}
+
+
+# Decorator to register a benchmark; `base_size` is the number of items at scale 1
+def benchmark(name, base_size):
+    def decorator(function):
+        BENCHMARKS[name] = (function, base_size)
+        return function
+    return decorator
+
+
+@benchmark('filter_data_by_date', 640)
+def bench_filter_data_by_date(size, workdir):
+    from stock_fetch.stock_fetch import filter_data_by_date
+    from stock_fetch.series_store import DAILY_KEY
+
+    data = synthetic.alpha_vantage_daily(size)
+    dates = sorted(data[DAILY_KEY])
+    start, end = dates[len(dates) // 4], dates[3 * len(dates) // 4]
+    return lambda: filter_data_by_date(data, start, end, DAILY_KEY)
+
+
+@benchmark('features', 640)
+def bench_features(size, workdir):
+    from stock_fetch import series_store
+    from stock_fetch.features import compute_features
+
+    series = series_store.sort_by_date(series_store.from_alpha_vantage(synthetic.alpha_vantage_daily(size)))
+    return lambda: compute_features(series)
+
+
+@benchmark('resample', 640)
+def bench_resample(size, workdir):
+    from stock_fetch import series_store
+    from stock_fetch.resample import resample
+
+    series = series_store.from_alpha_vantage(synthetic.alpha_vantage_daily(size))
+    return lambda: [resample(series, period) for period in ('weekly', 'monthly')]
+
+
+@benchmark('filter_stories', 1000)
+def bench_filter_stories(size, workdir):
+    from news_fetch.news_fetch import filter_stories
+
+    stories = synthetic.aylien_stories(size)
+    return lambda: filter_stories(stories)
+
+
+@benchmark('parse_amount', 3000)
+def bench_parse_amount(size, workdir):
+    from metrics.amount_parser import _parse_magnitude, parse_amount
+
+    amounts = synthetic.amount_strings(size)
+    directions = ['rise' if index % 2 else 'fall' for index in range(size)]
+
+    def run():
+        # Start from a cold cache, like a new process
+        _parse_magnitude.cache_clear()
+        return [parse_amount(amount, direction) for amount, direction in zip(amounts, directions)]
+    return run
+
+
+@benchmark('evaluate_model', 600)
+def bench_evaluate_model(size, workdir):
+    from metrics.metrics import evaluate_model
+
+    log = synthetic.eval_log(size)
+    return lambda: list(evaluate_model(log, 'gpta'))
+
+
+@benchmark('simulate_investment', 600)
+def bench_simulate_investment(size, workdir):
+    from metrics.investment_simulation import simulate_investment
+
+    log = synthetic.eval_log(size)
+    return lambda: simulate_investment(log, 10000.00, 'gpta')
+
+
+@benchmark('merge_news', 30)
+def bench_merge_news(size, workdir):
+    from news_fetch.news_merge import merge_day_files
+
+    news_dir = synthetic.write_news_dir(os.path.join(workdir, 'news'), size, stories_per_day=10)
+    output_path = os.path.join(workdir, 'merged_news_data.jsonl')
+    return lambda: merge_day_files(news_dir, output_path, incremental=False)
+
+
+@benchmark('sort_news', 30)
+def bench_sort_news(size, workdir):
+    from news_fetch.news_merge import export_json_object, merge_day_files
+
+    news_dir = synthetic.write_news_dir(os.path.join(workdir, 'news'), size, stories_per_day=10)
+    output_path = os.path.join(workdir, 'merged_news_data.jsonl')
+    merge_day_files(news_dir, output_path, incremental=False)
+    return lambda: export_json_object(output_path, os.path.join(workdir, 'sorted_output.json'), indent=4,
+                                      ensure_ascii=True)
+
+
+# Function to time `run` `repeat` times after one untimed warm-up run (imports, caches, first
+# allocations), then measure its peak traced memory in one more run. Output printed by the stage
+# is discarded.
+def measure(run, repeat=3):
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        run()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {'seconds': statistics.median(timings), 'min_seconds': min(timings), 'peak_bytes': peak}
+
+
+def run_benchmarks(names=None, scales=SCALES, repeat=3, progress=print):
+    results = []
+    for scale in scales:
+        for name in names or BENCHMARKS:
+            setup, base_size = BENCHMARKS[name]
+            size = base_size * scale
+            with tempfile.TemporaryDirectory(prefix='bench-') as workdir:
+                result = {'stage': name, 'scale': scale, 'size': size, **measure(setup(size, workdir), repeat)}
+            result['items_per_second'] = size / result['seconds'] if result['seconds'] else None
+            results.append(result)
+            if progress:
+                progress(f"{name:<22}{scale:>4}x {size:>8}  {result['seconds'] * 1000:10.2f} ms  "
+                         f"{result['peak_bytes'] / 1e6:9.2f} MB")
+    return results
+
+
+# Function to compare results with a baseline run; returns the regressions, one dict per
+# (stage, scale, measure) that got worse by more than `tolerance`
+def compare(results, baseline, tolerance=TOLERANCE):
+    previous = {(result['stage'], result['scale']): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get((result['stage'], result['scale']))
+        if before is None:
+            continue
+        for measure_name, minimum in (('seconds', MIN_SECONDS), ('peak_bytes', MIN_BYTES)):
+            old, new = before[measure_name], result[measure_name]
+            if new > old * (1 + tolerance) and new - old > minimum:
+                regressions.append({'stage': result['stage'], 'scale': result['scale'], 'measure': measure_name,
+                                    'baseline': old, 'current': new, 'ratio': new / old if old else None})
+    return regressions
+
+
+def save_results(path, results, repeat):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    run = {'created': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+           'platform': platform.platform(), 'repeat': repeat, 'results': results}
+    with open(path, 'w') as file:
+        json.dump(run, file, indent=4)
+    return run
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the data and metrics hot paths on synthetic inputs.")
+    parser.add_argument('--stage', action='append', choices=list(BENCHMARKS),
+                        help="Benchmark to run (repeatable; default: all)")
+    parser.add_argument('--scale', type=int, nargs='+', default=list(SCALES), help="Input size multipliers")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage (the median is kept)")
+    parser.add_argument('--output', help="Results file (default: data/benchmarks/bench-<timestamp>.json)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Run to compare with")
+    parser.add_argument('--save-baseline', action='store_true', help="Also save this run as the baseline")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="Relative slow-down or memory growth reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.stage, args.scale, args.repeat)
+    output_path = args.output or os.path.join(RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    save_results(output_path, results, args.repeat)
+    print(f"Results saved to {output_path}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            ratio = f"{regression['ratio']:.2f}x" if regression['ratio'] is not None else "new"
+            print(f"REGRESSION {regression['stage']} {regression['scale']}x {regression['measure']}: "
+                  f"{regression['baseline']:.6g} -> {regression['current']:.6g} ({ratio})")
+        if not regressions:
+            print(f"No regressions against {args.baseline}")
+    if args.save_baseline:
+        save_results(args.baseline, results, args.repeat)
+        print(f"Baseline saved to {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
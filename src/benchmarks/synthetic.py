@@ -0,0 +1,121 @@
+# File: src/benchmarks/synthetic.py
+
+# Synthetic inputs with the shapes the pipeline reads: Alpha Vantage daily time series, Aylien
+# story payloads and evaluation logs. Everything is generated from a seed, so two runs at the same
+# scale time the same data.
+
+import json
+import os
+import random
+from datetime import date, timedelta
+
+from news_fetch.story_io import day_file_name
+
+AMOUNT_FORMATS = ('{:.2f}%', '{:.2f} %', '{:.1f}%', '+{:.2f}%', '{:.2f} percent', '{:.2f}')
+UNPARSEABLE_AMOUNTS = ('n/a', 'unknown', '')
+CATEGORIES = (('ay.econ', 'Economy'), ('ay.fin', 'Finance'), ('ay.pol', 'Politics'), ('ay.tech', 'Technology'),
+              ('ay.sports', 'Sports'))
+SOURCES = (('reuters.com', 'Reuters'), ('bloomberg.com', 'Bloomberg'), ('cnbc.com', 'CNBC'),
+           ('ft.com', 'Financial Times'), ('wsj.com', 'The Wall Street Journal'))
+WORDS = ('market', 'stocks', 'inflation', 'rates', 'earnings', 'federal', 'reserve', 'growth', 'bond', 'yield',
+         'investors', 'quarter', 'report', 'shares', 'index', 'economy', 'oil', 'prices', 'jobs', 'outlook')
+
+
+# Function to list `count` weekdays starting at `start`
+def trading_days(count, start=date(2022, 2, 1)):
+    days, day = [], start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+# Function to build an Alpha Vantage 'TIME_SERIES_DAILY' payload with `count` bars, newest first
+def alpha_vantage_daily(count, symbol='SPY', seed=0):
+    rng = random.Random(seed)
+    series, close = {}, 400.0
+    for day in trading_days(count):
+        open_ = close * (1 + rng.gauss(0, 0.004))
+        close = open_ * (1 + rng.gauss(0, 0.01))
+        series[day.isoformat()] = {
+            "1. open": f"{open_:.4f}",
+            "2. high": f"{max(open_, close) * (1 + abs(rng.gauss(0, 0.003))):.4f}",
+            "3. low": f"{min(open_, close) * (1 - abs(rng.gauss(0, 0.003))):.4f}",
+            "4. close": f"{close:.4f}",
+            "5. volume": str(rng.randint(40_000_000, 120_000_000)),
+        }
+    return {
+        "Meta Data": {"1. Information": "Daily Prices (open, high, low, close) and Volumes", "2. Symbol": symbol,
+                      "3. Last Refreshed": max(series), "4. Output Size": "Full size", "5. Time Zone": "US/Eastern"},
+        "Time Series (Daily)": dict(sorted(series.items(), reverse=True)),
+    }
+
+
+def _sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+# Function to build `count` stories in the Aylien News API response layout
+def aylien_stories(count, seed=0, body_sentences=8):
+    rng = random.Random(seed)
+    stories = []
+    for index in range(count):
+        domain, name = rng.choice(SOURCES)
+        categories = [{"id": category_id, "label": label, "score": rng.choice((1, 1, 0.6)),
+                       "taxonomy": "aylien", "links": {"self": f"https://api.aylien.com/categories/{category_id}"}}
+                      for category_id, label in rng.sample(CATEGORIES, rng.randint(1, 3))]
+        stories.append({
+            "id": 1_000_000 + index,
+            "author": {"name": f"Author {rng.randint(1, 500)}", "avatar_url": None},
+            "title": _sentence(rng, 8)[:-1],
+            "body": ' '.join(_sentence(rng) for _ in range(body_sentences)),
+            "summary": {"sentences": [_sentence(rng) for _ in range(3)]},
+            "source": {"id": rng.randint(1, 100), "domain": domain, "home_page_url": f"https://www.{domain}",
+                       "name": name},
+            "categories": categories,
+            "language": "en",
+            "published_at": "2022-06-10T14:00:00Z",
+            "sentiment": {"body": {"polarity": rng.choice(("positive", "neutral", "negative")),
+                                   "score": rng.random()}},
+        })
+    return stories
+
+
+# Function to build `count` amount strings in the formats the models answer with; about one in
+# fifty cannot be parsed
+def amount_strings(count, seed=0):
+    rng = random.Random(seed)
+    amounts = []
+    for _ in range(count):
+        if rng.random() < 0.02:
+            amounts.append(rng.choice(UNPARSEABLE_AMOUNTS))
+        else:
+            amounts.append(rng.choice(AMOUNT_FORMATS).format(abs(rng.gauss(0, 0.8))))
+    return amounts
+
+
+# Function to build an evaluation log of `count` entries for `models`
+def eval_log(count, models=('gpta', 'gptb', 'gptc', 'gptd'), seed=0):
+    rng = random.Random(seed)
+    amounts = amount_strings(count * (len(models) + 1), seed)
+    log = []
+    for position in range(1, count + 1):
+        entry = {"position": position}
+        for model in models:
+            entry[model] = {"direction": rng.choice(('rise', 'fall')), "amount": amounts.pop()}
+        entry["outcome"] = {"direction": rng.choice(('rise', 'fall')), "amount": f"{abs(rng.gauss(0, 0.8)):.2f}%"}
+        log.append(entry)
+    return log
+
+
+# Function to write `days` daily news files of `stories_per_day` filtered stories into `directory`
+def write_news_dir(directory, days, stories_per_day, seed=0):
+    from news_fetch.news_fetch import filter_stories
+
+    os.makedirs(directory, exist_ok=True)
+    for counter, day in enumerate(trading_days(days), 1):
+        stories = filter_stories(aylien_stories(stories_per_day, seed + counter, body_sentences=4))
+        with open(os.path.join(directory, day_file_name(counter, day.isoformat())), 'w') as file:
+            json.dump(stories, file, indent=4)
+    return directory
@@ -0,0 +1 @@
+# File: src/cli/__init__.py
\ No newline at end of file
@@ -0,0 +1,77 @@
+# File: src/cli/__main__.py
+
+# Single entry point for the Python tools:
+#
+#     cd src && python -m cli [--data-dir DIR] <command> [options]
+#     PYTHONPATH=src python -m cli <command> --help
+#
+# Each command runs the `run_cli(argv)` of its module. Modules are only imported once their command
+# is chosen, so start-up stays cheap and only the chosen command loads its dependencies (requests,
+# numpy, matplotlib...).
+
+import argparse
+import importlib
+import os
+import sys
+
+# Command -> (module, help)
+COMMANDS = {
+    'fetch-stock': ('stock_fetch.stock_fetch', "Fetch daily bars for a watch-list from Alpha Vantage"),
+    'fetch-intraday': ('stock_fetch.intraday', "Fetch intraday bars month by month into monthly partitions"),
+    'fetch-news': ('news_fetch.news_fetch', "Backfill daily news stories from the Aylien News API"),
+    'dedup-news': ('news_fetch.dedup', "Drop exact and near-duplicate stories from the daily news files"),
+    'merge-news': ('news_fetch.news_merge', "Merge the daily news files into JSON Lines"),
+    'preprocess-stock': ('stock_fetch.preprocess', "Derive directions, positions and merge the daily series"),
+    'resample-stock': ('stock_fetch.resample', "Build weekly/monthly bars from the stored daily bars"),
+    'features': ('stock_fetch.features', "Compute technical-indicator features for the stored daily series"),
+    'eval': ('metrics.runner', "Evaluate every model in one or more evaluation logs"),
+    'convert-eval-log': ('metrics.eval_log', "Convert a JSON evaluation log into JSON Lines"),
+    'eval-incremental': ('metrics.incremental', "Fold only the new log entries into the stored metrics"),
+    'batch-store': ('metrics.batch_store', "Load the per-batch orchestration logs into an indexed store"),
+    'significance': ('metrics.significance', "Directional accuracy and bootstrap intervals for models and pairs"),
+    'simulate': ('metrics.investment_simulation', "Run the investment simulation for every model"),
+    'backtest': ('metrics.backtest', "Sweep trading strategies and costs over the model predictions"),
+    'bench': ('benchmarks.bench', "Benchmark the data and metrics hot paths on synthetic inputs"),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m cli',
+        description="Data fetching, preprocessing and evaluation tools.",
+        epilog="commands:\n" + '\n'.join(f"  {name:<18}{text}" for name, (_, text) in COMMANDS.items())
+               + "\n\nRun 'python -m cli <command> --help' for the options of a command.",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', help="Data directory (default: data/ at the repository root)")
+    parser.add_argument('--config-dir', help="Directory holding .env (default: config/ at the repository root)")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="Write the run's stage timings, counters and latency histograms as JSON to PATH")
+    parser.add_argument('--profile', metavar='DIR', help="Also profile each stage with cProfile into DIR/<stage>.prof")
+    parser.add_argument('command', choices=COMMANDS, metavar='command')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    # Set before the command module is imported, since module paths are resolved at import time
+    if args.data_dir:
+        os.environ['DISSERTATION_DATA_DIR'] = os.path.abspath(args.data_dir)
+    if args.config_dir:
+        os.environ['DISSERTATION_CONFIG_DIR'] = os.path.abspath(args.config_dir)
+
+    from common import instrumentation
+    if args.profile:
+        instrumentation.REGISTRY.profile_dir = os.path.abspath(args.profile)
+
+    module = importlib.import_module(COMMANDS[args.command][0])
+    sys.argv[0] = f"python -m cli {args.command}"
+    status = None
+    try:
+        status = module.run_cli(args.args)
+    finally:
+        if args.metrics:
+            instrumentation.REGISTRY.write(args.metrics, command=args.command, args=args.args, exit_code=status)
+            print(f"Metrics written to {args.metrics}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+# File: src/common/__init__.py
\ No newline at end of file
@@ -0,0 +1,31 @@
+# File: src/common/backoff.py
+
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+# Function to read a Retry-After header given either as seconds or as an HTTP date
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+# Function to compute a full-jitter exponential backoff delay; a server-provided
+# Retry-After always wins over the computed delay
+def backoff_delay(attempt, base=1.0, cap=120.0, retry_after=None):
+    if retry_after is not None:
+        return min(cap, retry_after) + random.uniform(0, base)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
@@ -0,0 +1,26 @@
+# File: src/common/http.py
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_local = threading.local()
+
+
+# Function to create a session with a keep-alive connection pool
+def make_session(pool_size=10):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+# Function to get the calling thread's session (requests.Session is not thread-safe)
+def thread_session(pool_size=10):
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = make_session(pool_size)
+        _local.session = session
+    return session
@@ -0,0 +1,207 @@
+# File: src/common/http_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from requests import HTTPError
+
+from common import instrumentation
+from common.settings import data_path, load_env
+
+MODE_OFF = 'off'        # always go to the network, never read or write the cache
+MODE_ON = 'on'          # serve fresh entries from disk, fetch and store everything else
+MODE_REPLAY = 'replay'  # offline: serve whatever is on disk (ignoring TTLs), never touch the network
+
+# Parameters that identify the caller rather than the request
+IGNORED_PARAMS = {'apikey', 'api_key'}
+
+
+class CacheMiss(Exception):
+    pass
+
+
+# Minimal stand-in for requests.Response, enough for the fetchers in this repo
+class CachedResponse:
+    def __init__(self, status_code, text, headers=None, from_cache=False):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    def json(self):
+        return json.loads(self.text)
+
+    # Same error as requests.Response.raise_for_status, so callers handle live and cached responses alike
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPError(f"{self.status_code} Error (cached response)", response=self)
+
+
+# Function to build the cache key: endpoint plus sorted, stringified params
+def cache_key(url, params=None):
+    parts = urlsplit(url)
+    endpoint = f"{parts.netloc}{parts.path}".rstrip('/')
+    normalized = sorted(
+        (str(key), str(value)) for key, value in (params or {}).items()
+        if key not in IGNORED_PARAMS and value is not None
+    )
+    payload = json.dumps([endpoint, normalized], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# Content-addressed on-disk response cache with per-endpoint TTLs and size-bounded LRU eviction.
+# `ttls` maps an Alpha Vantage `function` name or a URL path fragment to a lifetime in seconds
+# (None means the entry never expires).
+class ResponseCache:
+    def __init__(self, directory, ttls=None, default_ttl=86400, max_bytes=512 * 1024 * 1024, mode=MODE_ON):
+        if mode not in (MODE_OFF, MODE_ON, MODE_REPLAY):
+            raise ValueError(f"Unknown cache mode '{mode}'")
+        self.directory = directory
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.total_bytes = None
+
+    def ttl_for(self, url, params):
+        function = (params or {}).get('function')
+        if function in self.ttls:
+            return self.ttls[function]
+        for fragment, ttl in self.ttls.items():
+            if fragment in url:
+                return ttl
+        return self.default_ttl
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    # Return the cached response for a request, or None if it is missing or stale
+    def load(self, url, params=None):
+        path = self.path_for(cache_key(url, params))
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        ttl = self.ttl_for(url, params)
+        if self.mode != MODE_REPLAY and ttl is not None and time.time() - entry['stored_at'] > ttl:
+            return None
+        try:
+            os.utime(path)  # mark as recently used for LRU eviction
+        except OSError:
+            pass
+        return CachedResponse(entry['status_code'], entry['text'], entry.get('headers'), from_cache=True)
+
+    def store(self, url, params, response):
+        key = cache_key(url, params)
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            'url': url,
+            'params': {k: v for k, v in (params or {}).items() if k not in IGNORED_PARAMS},
+            'status_code': response.status_code,
+            'headers': {'Content-Type': response.headers.get('Content-Type', '')},
+            'text': response.text,
+            'stored_at': time.time(),
+        }
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(entry, file)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+        self._account(os.path.getsize(path) - previous)
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.json'):
+                    yield os.path.join(root, name)
+
+    def _account(self, delta):
+        with self.lock:
+            if self.total_bytes is None:
+                self.total_bytes = sum(os.path.getsize(path) for path in self._entries())
+            else:
+                self.total_bytes += delta
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    # Drop least recently used entries until the cache is back under 90% of its budget
+    def _evict(self):
+        entries = []
+        for path in self._entries():
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        target = self.max_bytes * 0.9
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self.total_bytes = total
+
+    def clear(self):
+        with self.lock:
+            for path in list(self._entries()):
+                os.remove(path)
+            self.total_bytes = 0
+
+
+# Drop-in replacement for a requests session whose GETs go through a ResponseCache.
+# `cacheable` decides whether a live response may be stored (by default only HTTP 200).
+class CachedSession:
+    def __init__(self, session, cache, cacheable=None):
+        self.session = session
+        self.cache = cache
+        self.cacheable = cacheable or (lambda response: response.status_code == 200)
+
+    def get(self, url, params=None, **kwargs):
+        if self.cache is None or self.cache.mode == MODE_OFF:
+            return self._fetch(url, params, **kwargs)
+        cached = self.cache.load(url, params)
+        if cached is not None:
+            instrumentation.count('http.cache_hits')
+            return cached
+        if self.cache.mode == MODE_REPLAY:
+            shown = {k: v for k, v in (params or {}).items() if k not in IGNORED_PARAMS}
+            raise CacheMiss(f"No recorded response for {url} {shown} (replay mode)")
+        response = self._fetch(url, params, **kwargs)
+        if self.cacheable(response):
+            self.cache.store(url, params, response)
+        return response
+
+    # Function to send a request, recording its latency per host and its status code
+    def _fetch(self, url, params=None, **kwargs):
+        host = urlsplit(url).netloc
+        instrumentation.count('http.requests')
+        try:
+            with instrumentation.timer(f"http.latency.{host}"):
+                response = self.session.get(url, params=params, **kwargs)
+        except Exception as e:
+            instrumentation.count(f"http.errors.{type(e).__name__}")
+            raise
+        instrumentation.count(f"http.status.{response.status_code}")
+        return response
+
+
+# Function to build a cache from the HTTP_CACHE_MODE / HTTP_CACHE_DIR / HTTP_CACHE_MAX_MB
+# environment variables (or config/.env). Caching is opt-in: without HTTP_CACHE_MODE every request
+# goes to the network. A relative HTTP_CACHE_DIR is taken under the data directory, not the working one.
+def cache_from_env(default_dir, ttls=None, default_ttl=86400):
+    load_env()
+    mode = os.getenv('HTTP_CACHE_MODE', MODE_OFF).lower()
+    if mode == MODE_OFF:
+        return None
+    directory = data_path(os.getenv('HTTP_CACHE_DIR') or default_dir)
+    max_bytes = int(float(os.getenv('HTTP_CACHE_MAX_MB', '512')) * 1024 * 1024)
+    return ResponseCache(directory, ttls=ttls, default_ttl=default_ttl, max_bytes=max_bytes, mode=mode)
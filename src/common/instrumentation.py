@@ -0,0 +1,238 @@
+# File: src/common/instrumentation.py
+
+# Lightweight, process-wide instrumentation: stage timers, counters and latency histograms.
+#
+#     with instrumentation.stage('news_fetch.day') as stage:
+#         ...
+#         stage.records += len(stories)
+#     instrumentation.count('news_fetch.retries.rate_limit')
+#     instrumentation.observe('http.latency.api.aylien.com', seconds)
+#
+# Recording is a dict update under a lock, so it stays on all the time. snapshot() returns
+# everything as one JSON-serialisable dict and write() saves it; `python -m cli --metrics PATH`
+# does that at the end of a command. With a profile directory (--profile DIR), each stage also runs
+# under cProfile and write() dumps one '<stage>.prof' per stage (one stage is profiled at a time).
+# Worker processes keep their own registry: drain() hands their numbers to merge() in the parent,
+# and their profiles are dumped with the process id in the file name.
+
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.bounds) and value > self.bounds[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    # Function to estimate a quantile as the upper bound of the bucket it falls in (capped at max)
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds + (None,), self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return self.max if bound is None else min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        labels = [str(bound) for bound in self.bounds] + ['+Inf']
+        return {'count': self.count, 'sum': self.total, 'min': self.min, 'max': self.max,
+                'mean': self.total / self.count if self.count else None,
+                'p50': self.quantile(0.5), 'p90': self.quantile(0.9), 'p99': self.quantile(0.99),
+                'buckets': dict(zip(labels, self.buckets))}
+
+    def merge(self, data):
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, data['buckets'].values())]
+        self.count += data['count']
+        self.total += data['sum']
+        for name, pick in (('min', min), ('max', max)):
+            if data[name] is not None:
+                setattr(self, name, data[name] if getattr(self, name) is None else pick(getattr(self, name), data[name]))
+
+
+# Handle yielded by Registry.stage(); callers add the number of records the stage processed
+class Stage:
+    def __init__(self, name):
+        self.name = name
+        self.records = 0
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.profile_dir = None
+        self._profiling = False
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.counters = {}
+            self.histograms = {}
+            self.stages = {}
+            self.profiles = {}
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value, bounds=LATENCY_BUCKETS):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(bounds)
+            histogram.observe(value)
+
+    # Context manager recording the duration of a block into the histogram `name`
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    # Context manager timing one run of a pipeline stage; calls, wall time and records add up over
+    # runs of the same stage
+    @contextmanager
+    def stage(self, name):
+        stage = Stage(name)
+        profile = self._start_profile(name)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                with self.lock:
+                    self._profiling = False
+            with self.lock:
+                totals = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'records': 0})
+                totals['calls'] += 1
+                totals['seconds'] += elapsed
+                totals['records'] += stage.records
+
+    # Decorator running every call of a function as the stage `name`; `records`, if given, maps the
+    # function's result to the number of records it processed
+    def timed(self, name, records=None):
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name) as stage:
+                    result = function(*args, **kwargs)
+                    if records is not None:
+                        stage.records = records(result)
+                    return result
+            return wrapper
+        return decorator
+
+    def _start_profile(self, name):
+        if self.profile_dir is None:
+            return None
+        with self.lock:
+            if self._profiling:
+                return None  # only one profiler can be active at a time
+            self._profiling = True
+            profile = self.profiles.setdefault(name, cProfile.Profile())
+        profile.enable()
+        return profile
+
+    # Function to sleep and record the time slept under the counter 'sleep_seconds.<name>'
+    def sleep(self, seconds, name):
+        self.count(f"sleep_seconds.{name}", seconds)
+        time.sleep(seconds)
+
+    # Function to record the bytes a file (or every file of a directory) takes on disk
+    def record_write(self, name, path):
+        if os.path.isdir(path):
+            size = sum(os.path.getsize(os.path.join(root, file)) for root, _, files in os.walk(path) for file in files)
+        else:
+            size = os.path.getsize(path)
+        self.count(f"bytes_written.{name}", size)
+        self.count(f"files_written.{name}")
+
+    def snapshot(self):
+        with self.lock:
+            stages = {}
+            for name, totals in self.stages.items():
+                seconds = totals['seconds']
+                stages[name] = dict(totals, records_per_second=totals['records'] / seconds if seconds else None)
+            return {'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                    'elapsed_seconds': time.time() - self.started,
+                    'stages': stages,
+                    'counters': dict(sorted(self.counters.items())),
+                    'histograms': {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())}}
+
+    # Function to take the numbers recorded so far and start afresh (for worker processes)
+    def drain(self):
+        snapshot = self.snapshot()
+        with self.lock:
+            self.counters, self.histograms, self.stages = {}, {}, {}
+        return snapshot
+
+    # Function to add a snapshot taken in another process
+    def merge(self, snapshot):
+        with self.lock:
+            for name, value in snapshot['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for name, totals in snapshot['stages'].items():
+                mine = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0, 'records': 0})
+                for key in mine:
+                    mine[key] += totals[key]
+            for name, data in snapshot['histograms'].items():
+                bounds = tuple(float(label) for label in data['buckets'] if label != '+Inf')
+                self.histograms.setdefault(name, Histogram(bounds)).merge(data)
+
+    # Function to write the snapshot (plus `extra` fields) as JSON, and the stage profiles if any
+    def write(self, path, **extra):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(dict(extra, **self.snapshot()), file, indent=4)
+        self.dump_profiles()
+        return path
+
+    # Function to dump the profile of each stage to '<profile_dir>/<stage><suffix>.prof'
+    def dump_profiles(self, suffix=''):
+        if self.profile_dir is None:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        for name, profile in self.profiles.items():
+            profile.dump_stats(os.path.join(self.profile_dir, f"{name}{suffix}.prof"))
+
+
+# The registry of this process and shortcuts to it
+REGISTRY = Registry()
+
+count = REGISTRY.count
+observe = REGISTRY.observe
+timer = REGISTRY.timer
+stage = REGISTRY.stage
+timed = REGISTRY.timed
+sleep = REGISTRY.sleep
+record_write = REGISTRY.record_write
+snapshot = REGISTRY.snapshot
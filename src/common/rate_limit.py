@@ -0,0 +1,40 @@
+# File: src/common/rate_limit.py
+
+import threading
+import time
+
+from common import instrumentation
+
+
+# Token-bucket rate limiter shared by every worker of a fetcher, so the combined
+# request rate stays under the API limit no matter how many threads are running
+class RateLimiter:
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    # Block until a request slot is available
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            instrumentation.sleep(wait, 'rate_limit')
+
+    # Pause every worker for the given number of seconds (e.g. after a 429)
+    def pause(self, seconds):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
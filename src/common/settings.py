@@ -0,0 +1,35 @@
+# File: src/common/settings.py
+
+# Locations of the data and config directories, and lazy loading of config/.env.
+#
+# The directories default to data/ and config/ at the repository root, so the tools work from any
+# working directory; DISSERTATION_DATA_DIR and DISSERTATION_CONFIG_DIR move them. Nothing is read
+# from disk when this module is imported: load_env() loads the .env file on first use.
+
+import os
+import threading
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DATA_DIR = os.environ.get('DISSERTATION_DATA_DIR') or os.path.join(ROOT_DIR, 'data')
+CONFIG_DIR = os.environ.get('DISSERTATION_CONFIG_DIR') or os.path.join(ROOT_DIR, 'config')
+
+_env_loaded = False
+_env_lock = threading.Lock()
+
+
+def data_path(*parts):
+    return os.path.join(DATA_DIR, *parts)
+
+
+def config_path(*parts):
+    return os.path.join(CONFIG_DIR, *parts)
+
+
+# Function to load config/.env into the environment once (existing variables win)
+def load_env():
+    global _env_loaded
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+            load_dotenv(dotenv_path=config_path('.env'))
+            _env_loaded = True
@@ -0,0 +1 @@
+# File: src/metrics/__init__.py
\ No newline at end of file
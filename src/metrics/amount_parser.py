@@ -0,0 +1,80 @@
+# File: src/metrics/amount_parser.py
+
+# Shared parser for the free-text "amount" fields of the evaluation log (e.g. "0.8%",
+# "Approximately 1.5% decline", "from 1.0% to 1.5%"). Patterns are compiled once and results are
+# memoized, because LLM outputs repeat the same strings constantly. Strings that cannot be parsed
+# are counted in UNPARSEABLE (and come back as NaN from parse_amounts) instead of silently becoming 0.0.
+
+import re
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+FIRST_NUMBER = re.compile(r'\d+(\.\d+)?')
+NON_NUMERIC = re.compile(r'[^\d.-]')
+
+# Unparseable amount strings seen so far, with how often each occurred
+UNPARSEABLE = Counter()
+
+
+# Function to parse the unsigned/signed magnitude of an amount string; None when it cannot be parsed
+@lru_cache(maxsize=8192)
+def _parse_magnitude(amount_str):
+    # Handle cases like "from 1.0% to 1.5%" or "Approximately 1.5% decline"
+    if "from" in amount_str or "Approximately" in amount_str or "decline" in amount_str:
+        match = FIRST_NUMBER.search(amount_str)  # Take the first number
+        if match is None:
+            return None
+        amount_str = match.group(0)
+
+    # Remove any remaining non-numeric characters, %, etc.
+    try:
+        return float(NON_NUMERIC.sub('', amount_str))
+    except ValueError:
+        return None
+
+
+# Function to parse one amount; returns NaN when it cannot be parsed
+def parse_amount_or_nan(amount_str, direction):
+    if isinstance(amount_str, (int, float)) and not isinstance(amount_str, bool):
+        amount = float(amount_str)
+    else:
+        amount = _parse_magnitude(str(amount_str))
+        if amount is None:
+            UNPARSEABLE[str(amount_str)] += 1
+            return float('nan')
+
+    # If direction is 'fall' and the amount is positive, invert the value
+    if str(direction).lower() == "fall" and amount > 0:
+        amount = -amount
+    return amount
+
+
+# Function to parse and clean the amount (unparseable strings give `default` and are recorded)
+def parse_amount(amount_str, direction, default=0.0):
+    amount = parse_amount_or_nan(amount_str, direction)
+    return default if amount != amount else amount
+
+
+# Function to parse a batch of amounts into a float64 array (NaN where parsing failed).
+# `directions` is a list of the same length or None; failures are appended to `report` as
+# (index, amount_str) pairs when a list is given.
+def parse_amounts(amounts, directions=None, report=None):
+    if directions is None:
+        directions = [''] * len(amounts)
+    values = np.fromiter((parse_amount_or_nan(amount, direction) for amount, direction in zip(amounts, directions)),
+                         dtype=np.float64, count=len(amounts))
+    if report is not None:
+        report.extend((int(i), amounts[i]) for i in np.nonzero(np.isnan(values))[0])
+    return values
+
+
+# Function to print a short summary of the unparseable strings seen so far
+def print_unparseable_report(limit=10):
+    if not UNPARSEABLE:
+        return
+    total = sum(UNPARSEABLE.values())
+    print(f"{total} amount(s) could not be parsed ({len(UNPARSEABLE)} distinct):")
+    for text, count in UNPARSEABLE.most_common(limit):
+        print(f"  {count:>5}x {text!r}")
@@ -0,0 +1,183 @@
+# File: src/metrics/backtest.py
+
+# Vectorized backtesting over the evaluation log.
+#
+# A strategy turns the predicted amounts (percent, signed) into target positions in [-1, 1] for each
+# day. Positions earn the *realized* return of that day (the outcome amount), minus transaction
+# costs and slippage charged on turnover. All arrays are (n_runs, n_days), so a parameter sweep over
+# thousands of strategy/model/cost combinations runs as one batched NumPy computation.
+
+import argparse
+import itertools
+import json
+import os
+import sys
+
+import numpy as np
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from metrics import engine
+from metrics.eval_log import default_log_path, load_entries
+
+input_file_path = default_log_path()
+TRADING_DAYS_PER_YEAR = 252
+initial_investment = 10000.00
+
+
+# Strategy: long when the predicted move is above `threshold`, short below -threshold
+# (flat instead when long_only)
+def threshold_strategy(predictions, threshold=0.0, long_only=True):
+    positions = (predictions > threshold).astype(np.float64)
+    if not long_only:
+        positions -= (predictions < -threshold)
+    return positions
+
+
+# Strategy: position sized by the predicted magnitude, `scale` percent = full position
+def confidence_strategy(predictions, scale=1.0, long_only=True, cap=1.0):
+    positions = np.clip(predictions / scale, -cap, cap)
+    if long_only:
+        positions = np.maximum(positions, 0.0)
+    return positions
+
+
+# Strategy: always long or short in the predicted direction
+def long_short_strategy(predictions, threshold=0.0):
+    return threshold_strategy(predictions, threshold, long_only=False)
+
+
+STRATEGIES = {
+    'threshold': threshold_strategy,
+    'confidence': confidence_strategy,
+    'long_short': long_short_strategy,
+}
+
+
+# Function to run a batch of backtests. `positions` and `returns` are (runs, days) or (days,) arrays
+# (returns as fractions, e.g. 0.012); `cost_bps` and `slippage_bps` are scalars or per-run arrays and
+# are charged on every unit of turnover.
+def run_backtest(positions, returns, cost_bps=0.0, slippage_bps=0.0, initial=initial_investment):
+    positions = np.atleast_2d(np.asarray(positions, dtype=np.float64))
+    returns = np.broadcast_to(np.atleast_2d(np.asarray(returns, dtype=np.float64)), positions.shape)
+    per_unit_cost = (np.asarray(cost_bps, dtype=np.float64) + np.asarray(slippage_bps, dtype=np.float64)) / 1e4
+    per_unit_cost = np.broadcast_to(np.atleast_1d(per_unit_cost), (positions.shape[0],))[:, None]
+
+    turnover = np.abs(np.diff(positions, axis=1, prepend=0.0))
+    daily_returns = positions * returns - turnover * per_unit_cost
+    equity = initial * np.cumprod(1.0 + daily_returns, axis=1)
+
+    peaks = np.maximum.accumulate(np.concatenate([np.full((len(equity), 1), initial), equity], axis=1), axis=1)[:, 1:]
+    drawdown = equity / peaks - 1.0
+    mean = daily_returns.mean(axis=1)
+    std = daily_returns.std(axis=1, ddof=1) if daily_returns.shape[1] > 1 else np.zeros(len(daily_returns))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(TRADING_DAYS_PER_YEAR), 0.0)
+
+    return {
+        'equity': equity,
+        'drawdown': drawdown,
+        'daily_returns': daily_returns,
+        'final_value': equity[:, -1] if equity.shape[1] else np.full(len(equity), initial),
+        'total_return': (equity[:, -1] / initial - 1.0) if equity.shape[1] else np.zeros(len(equity)),
+        'max_drawdown': drawdown.min(axis=1) if drawdown.shape[1] else np.zeros(len(equity)),
+        'sharpe': sharpe,
+        'turnover': turnover.sum(axis=1),
+    }
+
+
+# Function to backtest one model of the log with one strategy
+def backtest_model(data, model_name, strategy='threshold', cost_bps=0.0, slippage_bps=0.0, **params):
+    arrays = engine.extract_arrays(data, model_name)
+    positions = STRATEGIES[strategy](arrays['prediction'], **params)
+    result = run_backtest(positions, arrays['actual'] / 100.0, cost_bps, slippage_bps)
+    result['position'] = arrays['position']
+    return result
+
+
+# Function to take the rows of `arrays` at the sorted, unique `positions` (all present in `arrays`);
+# when a position was logged more than once, its last entry wins
+def align_positions(arrays, positions):
+    order = np.argsort(arrays['position'], kind='stable')
+    last = np.searchsorted(arrays['position'][order], positions, side='right') - 1
+    return {name: values[order[last]] for name, values in arrays.items()}
+
+
+# Function to evaluate every combination of model x strategy parameters x costs in one batch.
+# `grid` maps strategy name -> {param: [values]}; returns one record per combination.
+def sweep(data, models, grid, cost_bps=(0.0,), slippage_bps=(0.0,)):
+    arrays = {model: engine.extract_arrays(data, model) for model in models}
+    # Runs share one day axis: the positions every model covers, in position order
+    common = None
+    for model_arrays in arrays.values():
+        positions = set(model_arrays['position'].tolist())
+        common = positions if common is None else common & positions
+    common = np.array(sorted(common or ()), dtype=np.int64)
+
+    combos, rows, returns = [], [], None
+    for model, model_arrays in arrays.items():
+        aligned = align_positions(model_arrays, common)
+        predictions = aligned['prediction']
+        if returns is None:
+            returns = aligned['actual'] / 100.0
+        for strategy, params in grid.items():
+            names = list(params)
+            for values in itertools.product(*(params[name] for name in names)):
+                settings = dict(zip(names, values))
+                positions = STRATEGIES[strategy](predictions, **settings)
+                for cost, slippage in itertools.product(cost_bps, slippage_bps):
+                    combos.append({'model': model, 'strategy': strategy, **settings,
+                                   'cost_bps': cost, 'slippage_bps': slippage})
+                    rows.append(positions)
+
+    if not rows:
+        return []
+    result = run_backtest(np.vstack(rows), returns, [c['cost_bps'] for c in combos],
+                          [c['slippage_bps'] for c in combos])
+    for i, combo in enumerate(combos):
+        combo.update({
+            'final_value': float(result['final_value'][i]),
+            'total_return': float(result['total_return'][i]),
+            'max_drawdown': float(result['max_drawdown'][i]),
+            'sharpe': float(result['sharpe'][i]),
+            'turnover': float(result['turnover'][i]),
+        })
+    return combos
+
+
+DEFAULT_GRID = {
+    'threshold': {'threshold': [0.0, 0.1, 0.25, 0.5, 1.0], 'long_only': [True, False]},
+    'confidence': {'scale': [0.5, 1.0, 2.0], 'long_only': [True, False]},
+}
+
+
+def run_cli(argv=None):
+    from metrics.runner import discover_models
+
+    parser = argparse.ArgumentParser(description="Backtest trading strategies on the model predictions.")
+    parser.add_argument('--log', default=input_file_path)
+    parser.add_argument('--model', action='append', help="Model keys to include (default: all found)")
+    parser.add_argument('--cost-bps', type=float, nargs='+', default=[0.0, 5.0])
+    parser.add_argument('--slippage-bps', type=float, nargs='+', default=[0.0, 2.0])
+    parser.add_argument('--grid', help="JSON file with a strategy parameter grid (default: DEFAULT_GRID)")
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    data = load_entries(args.log)
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid, 'r') as file:
+            grid = json.load(file)
+
+    records = sweep(data, args.model or discover_models(data), grid, args.cost_bps, args.slippage_bps)
+    records.sort(key=lambda record: record['sharpe'], reverse=True)
+    print(f"Evaluated {len(records)} combinations; top {args.top} by Sharpe:")
+    for record in records[:args.top]:
+        print(json.dumps(record))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
@@ -0,0 +1,296 @@
+# File: src/metrics/batch_store.py
+
+# Queryable store of the per-batch logs of orchestration runs.
+#
+# After each batch of 30 positions the orchestration program saves the batch's entries of
+# eval.logs.json as '{batch}-eval.logs.json' (see orchestration/batch-logs.js); when fine-tuning is
+# on, it also renames its logs to '{batch}-eval-gpt*.logs.json' (evaluations) and
+# '{batch}-gpt*.logs.json' (adaptor outputs). The per-model evaluation logs only hold the written
+# evaluations; the direction and amount predictions models are compared on come from
+# '{batch}-eval.logs.json'. build() loads all of them into one SQLite database: one row per log
+# entry (batch, kind, model, position, day and the entry as JSON), and one row per model prediction
+# found in an entry (direction, amount and the actual outcome). Both tables are indexed on batch,
+# model and position. Rows are bulk inserted, and only batch files that are new or changed since
+# the last build are read.
+#
+# evaluation_log() rebuilds an evaluation log (the format metrics.py and investment_simulation.py
+# read) from the stored predictions, so models can be compared across batches without reading the
+# batch files again. The runner accepts 'batch:<number>' (or 'batch:all') wherever it takes a log.
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import instrumentation
+from common.settings import data_path
+from metrics.eval_log import iter_entries
+
+LOGS_DIR = data_path('logs')
+DB_PATH = data_path('logs', 'batch_logs.sqlite')
+# '{batch}-eval-gpta.logs.json', '{batch}-eval.logs.jsonl', '{batch}-gptb.logs.json', ...
+BATCH_FILE_PATTERN = re.compile(r'^(\d+)-(?:(eval)(?:-(\w+))?|(\w+))\.logs\.jsonl?$')
+# Log "paths" the runner resolves through the store instead of the file system
+STORE_PREFIX = 'batch:'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    batch INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    model TEXT,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    entries INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+    entry_index INTEGER NOT NULL,
+    batch INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    model TEXT,
+    position INTEGER,
+    day TEXT,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS predictions (
+    path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+    batch INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    day TEXT,
+    direction TEXT,
+    amount TEXT,
+    actual_direction TEXT,
+    actual_amount TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_entries_batch ON entries(batch, model, position);
+CREATE INDEX IF NOT EXISTS idx_entries_model ON entries(model, position);
+CREATE INDEX IF NOT EXISTS idx_entries_path ON entries(path);
+CREATE INDEX IF NOT EXISTS idx_predictions_batch ON predictions(batch, model, position);
+CREATE INDEX IF NOT EXISTS idx_predictions_model ON predictions(model, position);
+CREATE INDEX IF NOT EXISTS idx_predictions_path ON predictions(path);
+"""
+
+
+# Function to read a batch log file name as (batch, kind, model); None for other files. The model
+# is None for combined evaluation logs ('{batch}-eval.logs.json').
+def parse_batch_file(name):
+    match = BATCH_FILE_PATTERN.match(name)
+    if match is None:
+        return None
+    batch, evaluation, eval_model, output_model = match.groups()
+    return int(batch), 'eval' if evaluation else 'output', eval_model or output_model
+
+
+def list_batch_files(logs_dir=LOGS_DIR):
+    files = []
+    for name in sorted(os.listdir(logs_dir)) if os.path.isdir(logs_dir) else []:
+        parsed = parse_batch_file(name)
+        if parsed is not None:
+            path = os.path.join(logs_dir, name)
+            stat = os.stat(path)
+            files.append({'path': path, 'batch': parsed[0], 'kind': parsed[1], 'model': parsed[2],
+                          'source': (stat.st_size, stat.st_mtime)})
+    return files
+
+
+# Function to find the model predictions of one entry as (model, direction, amount)
+def entry_predictions(entry):
+    return [(key, str(value['direction']), str(value['amount'])) for key, value in entry.items()
+            if key != 'outcome' and isinstance(value, dict) and 'direction' in value and 'amount' in value]
+
+
+class BatchStore:
+    def __init__(self, db_path=DB_PATH, logs_dir=LOGS_DIR):
+        self.db_path = db_path
+        self.logs_dir = logs_dir
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Function to load the batch files that are new or changed since the last build, and drop files
+    # that no longer exist. Returns the number of files loaded.
+    @instrumentation.timed('batch_store.build', records=lambda loaded: loaded)
+    def build(self):
+        files = list_batch_files(self.logs_dir)
+        known = {path: (size, mtime) for path, size, mtime in self.connection.execute(
+            'SELECT path, size, mtime FROM files')}
+        on_disk = {file['path'] for file in files}
+        stale = [(path,) for path in known if path not in on_disk]
+        todo = [file for file in files if known.get(file['path']) != tuple(file['source'])]
+
+        with self.connection:
+            self.connection.executemany('DELETE FROM files WHERE path = ?', stale)
+            for file in todo:
+                entries, predictions = [], []
+                for index, entry in enumerate(iter_entries(file['path'])):
+                    position, day = entry.get('position'), entry.get('current day', entry.get('date'))
+                    entries.append((file['path'], index, file['batch'], file['kind'], file['model'], position, day,
+                                    json.dumps(entry, ensure_ascii=False)))
+                    outcome = entry.get('outcome') or {}
+                    predictions.extend((file['path'], file['batch'], model, position, day, direction, amount,
+                                        outcome.get('direction'), outcome.get('amount'))
+                                       for model, direction, amount in entry_predictions(entry)
+                                       if position is not None)
+                self.connection.execute('DELETE FROM files WHERE path = ?', (file['path'],))
+                self.connection.execute(
+                    'INSERT INTO files (path, batch, kind, model, size, mtime, entries) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (file['path'], file['batch'], file['kind'], file['model'], *file['source'], len(entries)))
+                self.connection.executemany(
+                    'INSERT INTO entries (path, entry_index, batch, kind, model, position, day, payload) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', entries)
+                self.connection.executemany(
+                    'INSERT INTO predictions (path, batch, model, position, day, direction, amount, '
+                    'actual_direction, actual_amount) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', predictions)
+        return len(todo)
+
+    # Function to list the stored batches as (batch, files, entries, predictions)
+    def batches(self):
+        return self.connection.execute(
+            'SELECT f.batch, COUNT(*), SUM(f.entries), '
+            '(SELECT COUNT(*) FROM predictions p WHERE p.batch = f.batch) '
+            'FROM files f GROUP BY f.batch ORDER BY f.batch').fetchall()
+
+    # Function to list the models with predictions, in a batch or in all of them
+    def models(self, batch=None):
+        sql, params = 'SELECT DISTINCT model FROM predictions', []
+        if batch is not None:
+            sql, params = sql + ' WHERE batch = ?', [batch]
+        return [model for (model,) in self.connection.execute(sql + ' ORDER BY model', params)]
+
+    # Function to find log entries by batch, kind ('eval' or 'output'), model and position range
+    # (inclusive). Yields (batch, kind, model, entry) in batch, file and log order.
+    def entries(self, batch=None, kind=None, model=None, start_position=None, end_position=None):
+        where, params = [], []
+        for column, value in (('batch', batch), ('kind', kind), ('model', model)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if start_position is not None:
+            where.append('position >= ?')
+            params.append(start_position)
+        if end_position is not None:
+            where.append('position <= ?')
+            params.append(end_position)
+        sql = 'SELECT batch, kind, model, payload FROM entries'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        for batch, kind, model, payload in self.connection.execute(sql + ' ORDER BY batch, path, entry_index', params):
+            yield batch, kind, model, json.loads(payload)
+
+    # Function to rebuild an evaluation log from the stored predictions: one entry per (batch,
+    # position), ordered by batch and position, with every selected model's prediction and the
+    # outcome. `batch` None takes every batch.
+    def evaluation_log(self, batch=None, models=None):
+        sql = ('SELECT batch, position, day, model, direction, amount, actual_direction, actual_amount '
+               'FROM predictions')
+        where, params = [], []
+        if batch is not None:
+            where.append('batch = ?')
+            params.append(batch)
+        if models:
+            where.append(f"model IN ({', '.join('?' * len(models))})")
+            params.extend(models)
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+
+        log, current = [], None
+        for batch, position, day, model, direction, amount, actual_direction, actual_amount in self.connection.execute(
+                sql + ' ORDER BY batch, position, path, rowid', params):
+            if current is None or (batch, position) != current:
+                current = (batch, position)
+                log.append({'position': position, 'date': day})
+            entry = log[-1]
+            entry[model] = {'direction': direction, 'amount': amount}
+            if actual_direction is not None or actual_amount is not None:
+                # The outcome stays the last key, as in the organised log
+                entry.pop('outcome', None)
+                entry['outcome'] = {'direction': actual_direction, 'amount': actual_amount}
+        return [entry for entry in log if 'outcome' in entry]
+
+    # Function to compare models across batches: RMSE, MAE, R² and directional accuracy of every
+    # model in every batch, as {batch: {model: metrics}}
+    def compare(self, models=None):
+        from metrics.significance import METRICS, VALID, _number, entry_statistics, metrics_from_statistics
+
+        comparison = {}
+        for batch, *_ in self.batches():
+            log = self.evaluation_log(batch, models)
+            for model in self.models(batch):
+                if models and model not in models:
+                    continue
+                statistics = entry_statistics(log, model)
+                values = metrics_from_statistics(statistics.sum(axis=0))
+                comparison.setdefault(batch, {})[model] = dict(
+                    {name: _number(values[name]) for name in METRICS}, entries=int(statistics[:, VALID].sum()))
+        return comparison
+
+
+def is_store_path(path):
+    return str(path).startswith(STORE_PREFIX)
+
+
+# Function to load the evaluation log named by a 'batch:<number>' or 'batch:all' path, after
+# bringing the store up to date
+def load_store_log(path, db_path=DB_PATH, logs_dir=LOGS_DIR):
+    batch = path[len(STORE_PREFIX):]
+    with BatchStore(db_path, logs_dir) as store:
+        store.build()
+        return store.evaluation_log(None if batch == 'all' else int(batch))
+
+
+# Function to list the 'batch:<number>' paths of every stored batch with predictions
+def store_log_paths(db_path=DB_PATH, logs_dir=LOGS_DIR):
+    with BatchStore(db_path, logs_dir) as store:
+        store.build()
+        return [f"{STORE_PREFIX}{batch}" for batch, _, _, predictions in store.batches() if predictions]
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Load the per-batch orchestration logs into an indexed store and "
+                                                 "compare models across batches.")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--logs-dir', default=LOGS_DIR)
+    parser.add_argument('--model', action='append', help="Only these model keys (repeatable)")
+    parser.add_argument('--compare', action='store_true', help="Print the metrics of every model in every batch")
+    parser.add_argument('--export', metavar='PATH', help="Write the evaluation log rebuilt from the store to PATH")
+    parser.add_argument('--batch', type=int, help="Batch to export (default: all)")
+    args = parser.parse_args(argv)
+
+    with BatchStore(args.db, args.logs_dir) as store:
+        print(f"Loaded {store.build()} new or changed batch file(s)")
+        for batch, files, entries, predictions in store.batches():
+            print(f"  batch {batch}: {files} file(s), {entries} entries, {predictions} predictions")
+            if not predictions:
+                print(f"  batch {batch}: no predictions; {batch}-eval.logs.json is missing from {args.logs_dir}")
+        if args.compare:
+            print(json.dumps(store.compare(args.model), indent=4, ensure_ascii=False))
+        if args.export:
+            log = store.evaluation_log(args.batch, args.model)
+            with open(args.export, 'w') as file:
+                json.dump(log, file, indent=4, ensure_ascii=False)
+            print(f"Wrote {len(log)} entries to {args.export}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
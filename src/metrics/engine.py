@@ -0,0 +1,101 @@
+# File: src/metrics/engine.py
+
+# NumPy evaluation engine: the evaluation log is turned into prediction / actual arrays once, and
+# RMSE / MAE / R² for any set of row windows come from cumulative sums instead of per-window calls.
+
+import numpy as np
+
+from metrics.amount_parser import parse_amounts
+
+# Relative tolerance below which a window's total sum of squares is treated as zero
+SST_TOLERANCE = 1e-10
+
+
+# Function to turn the evaluation log into arrays for one model: the index of each entry in the log,
+# its position, and the parsed predicted / actual amounts. Entries without the model are skipped, and
+# so are entries whose amounts cannot be parsed (they are listed in `report` when a list is given).
+def extract_arrays(data, model_name, report=None):
+    rows = [(i, entry) for i, entry in enumerate(data) if model_name in entry]
+    count = len(rows)
+    failures = []
+    predictions = parse_amounts([entry[model_name]['amount'] for _, entry in rows],
+                                [entry[model_name]['direction'] for _, entry in rows], failures)
+    actuals = parse_amounts([entry['outcome']['amount'] for _, entry in rows],
+                            [entry['outcome']['direction'] for _, entry in rows], failures)
+    arrays = {
+        'index': np.fromiter((i for i, _ in rows), dtype=np.int64, count=count),
+        'position': np.fromiter((entry['position'] for _, entry in rows), dtype=np.int64, count=count),
+        'prediction': predictions,
+        'actual': actuals,
+    }
+    if failures:
+        if report is not None:
+            report.extend((rows[i][1]['position'], text) for i, text in failures)
+        valid = ~(np.isnan(predictions) | np.isnan(actuals))
+        arrays = {name: values[valid] for name, values in arrays.items()}
+    return arrays
+
+
+def _prefix_sum(values):
+    return np.concatenate(([0.0], np.cumsum(values)))
+
+
+# Function to compute RMSE, MAE and R² for the row windows [starts[i], ends[i]). R² follows
+# sklearn's r2_score: 1.0 for a perfect fit on constant actuals, 0.0 for an imperfect one.
+def window_metrics(predictions, actuals, starts, ends):
+    predictions = np.asarray(predictions, dtype=np.float64)
+    actuals = np.asarray(actuals, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    errors = predictions - actuals
+
+    squared = _prefix_sum(errors * errors)
+    absolute = _prefix_sum(np.abs(errors))
+    total = _prefix_sum(actuals)
+    total_squared = _prefix_sum(actuals * actuals)
+
+    count = (ends - starts).astype(np.float64)
+    return metrics_from_sums(count, squared[ends] - squared[starts], absolute[ends] - absolute[starts],
+                             total[ends] - total[starts], total_squared[ends] - total_squared[starts])
+
+
+# Function to compute RMSE, MAE and R² from the sufficient statistics of windows: row count, sum of
+# squared errors, sum of absolute errors, sum of actuals and sum of squared actuals
+def metrics_from_sums(count, sse, sae, total, total_squared):
+    count = np.asarray(count, dtype=np.float64)
+    sse = np.maximum(np.asarray(sse, dtype=np.float64), 0.0)
+    total = np.asarray(total, dtype=np.float64)
+    total_squared = np.asarray(total_squared, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sst = total_squared - total * total / count
+        constant = sst <= SST_TOLERANCE * np.maximum(total_squared, 1.0)
+        r2 = np.where(constant, np.where(sse <= SST_TOLERANCE, 1.0, 0.0), 1.0 - sse / sst)
+        return {
+            'RMSE': np.sqrt(sse / count),
+            'MAE': np.asarray(sae, dtype=np.float64) / count,
+            'R²': r2,
+            'count': count.astype(np.int64),
+        }
+
+
+# Function to lay out fixed-width windows over n rows: ends at width, width + stride, ...
+def rolling_bounds(n, width, stride=1):
+    ends = np.arange(width, n + 1, stride, dtype=np.int64)
+    return ends - width, ends
+
+
+# Function to convert window metrics into the list-of-dicts layout written to the metric JSON files
+def metrics_records(metrics, start_positions, end_positions, include_mae_r2=True):
+    records = []
+    columns = {name: metrics[name].tolist() for name in ('RMSE', 'MAE', 'R²')}
+    counts = metrics['count'].tolist()
+    for i, (start, end) in enumerate(zip(np.asarray(start_positions).tolist(), np.asarray(end_positions).tolist())):
+        record = {"RMSE": columns['RMSE'][i]}
+        if include_mae_r2:
+            record["MAE"] = columns['MAE'][i]
+            if counts[i] > 1:
+                record["R²"] = columns['R²'][i]
+        record["start_position"] = start
+        record["end_position"] = end
+        records.append(record)
+    return records
@@ -0,0 +1,195 @@
+# File: src/metrics/eval_log.py
+
+# Append-only JSON Lines evaluation log ('eval.logs.jsonl'): one entry per line,
+#     {"position": 12, "gpta": {"direction": "rise", "amount": "0.5%"}, ..., "outcome": {...}}
+#
+# Entries are normalized while they are read (keys stripped, prediction fields lower-cased,
+# 'outcome' moved last), so the separate reorganise step is no longer needed. EvalLogReader
+# remembers the byte offset it has read up to and only returns complete lines, so a reader can
+# start while a writer is still appending. The legacy JSON array logs are read entry by entry as
+# well, and convert_log() turns one into JSON Lines.
+
+import argparse
+import json
+import os
+import sys
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.settings import data_path
+
+EVAL_LOG_PATH = data_path('logs', 'eval.logs.jsonl')
+LEGACY_LOG_PATH = data_path('logs', 'eval.logs.json')
+ORGANISED_LOG_PATH = data_path('logs', 'eval-organised.logs.json')
+
+_decoder = json.JSONDecoder()
+
+
+# Function to pick the evaluation log to read by default: the JSON Lines log when it exists,
+# otherwise the organised legacy copy
+def default_log_path():
+    return EVAL_LOG_PATH if os.path.exists(EVAL_LOG_PATH) else ORGANISED_LOG_PATH
+
+
+def is_jsonl(path):
+    return path.endswith('.jsonl')
+
+
+# Function to normalize one entry: keys stripped, keys of nested dicts lower-cased ('Direction' ->
+# 'direction') and 'outcome' moved to the end
+def normalize_entry(entry):
+    normalized, outcome = {}, None
+    for key, value in entry.items():
+        key = key.strip()
+        if isinstance(value, dict):
+            value = {name.strip().lower(): item for name, item in value.items()}
+        if key.lower() == 'outcome':
+            outcome = value
+        else:
+            normalized[key] = value
+    if outcome is not None:
+        normalized['outcome'] = outcome
+    return normalized
+
+
+# Function to stream the objects of a JSON array file one at a time, reading it in chunks
+def _iter_json_array(path, chunk_size=1 << 20):
+    with open(path, 'r', encoding='utf-8') as file:
+        buffer, position, eof, started = '', 0, False, False
+        while True:
+            # Skip whitespace and separators up to the next value
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise ValueError(f"{path} is not a JSON array")
+                started, position = True, position + 1
+                continue
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                if position >= len(buffer):
+                    raise ValueError
+                value, end = _decoder.raw_decode(buffer, position)
+                if end == len(buffer) and not eof:
+                    raise ValueError  # a number may continue in the next chunk
+            except ValueError:
+                if eof:
+                    if buffer[position:].strip():
+                        raise ValueError(f"{path} ends with an incomplete JSON value")
+                    return
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            yield value
+            position = end
+
+
+# Reader over a JSON Lines evaluation log that can be polled while the log grows
+class EvalLogReader:
+    def __init__(self, path, offset=0):
+        self.path = path
+        self.offset = offset
+        # Where the last non-empty line read starts
+        self.last_line_offset = None
+
+    # Function to read the complete lines appended since the last call, as normalized entries
+    def read_new(self):
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            for line in file:
+                if not line.endswith(b'\n'):
+                    break  # a writer is still in the middle of this line
+                if line.strip():
+                    entries.append(normalize_entry(json.loads(line)))
+                    self.last_line_offset = self.offset
+                self.offset += len(line)
+        return entries
+
+    def __iter__(self):
+        return iter(self.read_new())
+
+
+# Function to iterate over the normalized entries of an evaluation log (JSON Lines or legacy JSON
+# array) without loading the file at once
+def iter_entries(path):
+    if is_jsonl(path):
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    if line.endswith('\n'):
+                        raise
+                    return  # the last line is still being written
+                yield normalize_entry(entry)
+    else:
+        for entry in _iter_json_array(path):
+            yield normalize_entry(entry)
+
+
+def load_entries(path):
+    return list(iter_entries(path))
+
+
+# Function to append entries to a JSON Lines log; each entry is written as one complete line
+def append_entries(path, entries):
+    with open(path, 'a', encoding='utf-8') as file:
+        for entry in entries:
+            file.write(json.dumps(normalize_entry(entry), ensure_ascii=False) + '\n')
+            file.flush()
+
+
+# Function to convert a legacy JSON array log into JSON Lines, streaming entry by entry.
+# Returns the number of entries written.
+def convert_log(json_path=LEGACY_LOG_PATH, jsonl_path=EVAL_LOG_PATH):
+    count = 0
+    tmp_path = f"{jsonl_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        for entry in iter_entries(json_path):
+            file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            count += 1
+    os.replace(tmp_path, jsonl_path)
+    return count
+
+
+# Function to write the entries of a log as an indented JSON array (the organised legacy layout),
+# streaming entry by entry
+def export_json_array(path, json_path, indent=4):
+    pad = ' ' * indent
+    with open(json_path, 'w') as file:
+        file.write('[')
+        first = True
+        for entry in iter_entries(path):
+            file.write(('' if first else ',') + '\n' + pad + json.dumps(entry, indent=indent).replace('\n', '\n' + pad))
+            first = False
+        file.write('\n]' if not first else ']')
+    return json_path
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a JSON evaluation log into the JSON Lines format.")
+    parser.add_argument('source', nargs='?', default=LEGACY_LOG_PATH)
+    parser.add_argument('output', nargs='?', default=EVAL_LOG_PATH)
+    parser.add_argument('--organised-json', metavar='PATH',
+                        help="Also write the organised JSON array copy (legacy layout) to PATH")
+    args = parser.parse_args(argv)
+
+    count = convert_log(args.source, args.output)
+    print(f"Converted {count} entries into {args.output}")
+    if args.organised_json:
+        export_json_array(args.output, args.organised_json)
+        print(f"Organised file saved at: {args.organised_json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
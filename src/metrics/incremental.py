@@ -0,0 +1,283 @@
+# File: src/metrics/incremental.py
+
+# Incremental evaluation of a growing evaluation log.
+#
+# For every (log, model) the sufficient statistics are kept in a state file: running sums for the
+# overall RMSE / MAE / R², buffers of the last rows for the monthly and rolling windows, and the
+# simulation's capital and holdings. When the log grows, only the new entries are folded in (O(1)
+# per entry for a fixed window width) and only the new records are appended to the metric JSON
+# files, which keep the layout written by metrics.save_metrics_to_json. If the last entry consumed
+# has changed or the log got shorter, the state is rebuilt from the start of the log.
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from collections import deque
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.settings import data_path
+from metrics import engine
+from metrics.amount_parser import parse_amount_or_nan, print_unparseable_report
+from metrics.eval_log import EvalLogReader, is_jsonl, normalize_entry
+
+STATE_PATH = data_path('logs', 'incremental_state.json')
+# Monthly metrics are emitted every MONTH log entries, over the last MONTH predictions
+MONTH = 30
+# Version 2: the simulation skips entries with unparseable amounts instead of trading them as 0.0
+STATE_VERSION = 2
+
+
+def entry_fingerprint(entry):
+    return hashlib.sha256(json.dumps(entry, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+# Function to turn window sums into one record of the metric JSON layout
+def _record(count, sse, sae, total, total_squared, start_position, end_position, include_mae_r2=True):
+    metrics = engine.metrics_from_sums([count], [sse], [sae], [total], [total_squared])
+    return engine.metrics_records(metrics, [start_position], [end_position], include_mae_r2)[0]
+
+
+def _window_sums(rows):
+    sse = sae = total = total_squared = 0.0
+    for error, actual, _ in rows:
+        sse += error * error
+        sae += abs(error)
+        total += actual
+        total_squared += actual * actual
+    return len(rows), sse, sae, total, total_squared
+
+
+# Running state of one model: overall sums, window buffers and the investment simulation
+class ModelState:
+    def __init__(self, model, rolling_windows=(), initial_investment=10000.00):
+        self.model = model
+        self.rolling_windows = [tuple(window) for window in rolling_windows]
+        self.count = 0
+        self.sse = self.sae = self.total = self.total_squared = 0.0
+        # (error, actual, position) of the most recent valid rows
+        self.recent = deque(maxlen=max([MONTH] + [width for width, _ in self.rolling_windows]))
+        self.capital = initial_investment
+        self.holdings = 0.0
+
+    # Function to fold one log entry in; returns the new records per metric type.
+    # `month_start_position` is the position of the log entry MONTH - 1 entries back.
+    def update(self, index, entry, month_start_position):
+        new = {}
+        prediction = parse_amount_or_nan(entry[self.model]['amount'], entry[self.model]['direction'])
+        actual = parse_amount_or_nan(entry['outcome']['amount'], entry['outcome']['direction'])
+        if prediction != prediction or actual != actual:
+            return new
+        self._simulate(entry[self.model]['direction'], prediction, actual)
+
+        error = prediction - actual
+        self.count += 1
+        self.sse += error * error
+        self.sae += abs(error)
+        self.total += actual
+        self.total_squared += actual * actual
+        self.recent.append((error, actual, entry['position']))
+
+        if (index + 1) % MONTH == 0:
+            rows = list(self.recent)[-MONTH:]
+            new['monthly'] = [_record(*_window_sums(rows), month_start_position, entry['position'])]
+        for width, stride in self.rolling_windows:
+            if self.count >= width and (self.count - width) % stride == 0:
+                rows = list(self.recent)[-width:]
+                new.setdefault(f"rolling_{width}", []).append(
+                    _record(*_window_sums(rows), rows[0][2], entry['position']))
+        new['daily'] = [{"RMSE": abs(error), "position": entry['position']}]
+        return new
+
+    # Same all-in / all-out rules as investment_simulation.simulate_investment (which also skips
+    # entries with unparseable amounts)
+    def _simulate(self, prediction_direction, prediction_amount, actual_amount):
+        if prediction_direction.lower() == 'rise' and self.capital > 0:
+            self.holdings = self.capital * (1 + prediction_amount / 100)
+            self.capital = 0.0
+        elif prediction_direction.lower() == 'fall' and self.holdings > 0:
+            self.capital = self.holdings * (1 + actual_amount / 100)
+            self.holdings = 0.0
+        if self.capital > 0 and self.holdings == 0 and prediction_direction.lower() == 'rise':
+            self.holdings = self.capital * (1 + prediction_amount / 100)
+            self.capital = 0.0
+
+    def overall(self, first_position, last_position):
+        return [_record(self.count, self.sse, self.sae, self.total, self.total_squared, first_position, last_position)]
+
+    def final_value(self):
+        return self.capital + self.holdings
+
+    def to_dict(self):
+        return {name: (list(value) if isinstance(value, deque) else value) for name, value in vars(self).items()}
+
+    @classmethod
+    def from_dict(cls, state):
+        model_state = cls(state['model'], state['rolling_windows'])
+        for name, value in state.items():
+            if name == 'recent':
+                model_state.recent.extend(tuple(row) for row in value)
+            elif name != 'rolling_windows':
+                setattr(model_state, name, value)
+        return model_state
+
+
+# Function to append records to a metric JSON file written with json.dump(..., indent=4), without
+# rewriting what is already there
+def append_json_records(path, records):
+    if not records:
+        return
+    if not os.path.exists(path) or os.path.getsize(path) <= 2:
+        with open(path, 'w') as file:
+            json.dump(records, file, indent=4)
+        return
+    text = ',\n'.join('    ' + json.dumps(record, indent=4).replace('\n', '\n    ') for record in records)
+    with open(path, 'r+b') as file:
+        file.seek(-2, os.SEEK_END)
+        if file.read(2) != b'\n]':
+            raise ValueError(f"{path} does not end like a JSON array written with indent=4")
+        file.seek(-2, os.SEEK_END)
+        file.truncate()
+        file.write((',\n' + text + '\n]').encode('utf-8'))
+
+
+class IncrementalEvaluator:
+    def __init__(self, state_path=STATE_PATH, rolling_windows=(), initial_investment=10000.00):
+        self.state_path = state_path
+        self.rolling_windows = [list(window) for window in rolling_windows]
+        self.initial_investment = initial_investment
+        self.logs = {}
+        if state_path and os.path.exists(state_path):
+            with open(state_path, 'r') as file:
+                saved = json.load(file)
+            if saved.get('version') == STATE_VERSION:
+                self.logs = saved['logs']
+
+    def _fresh_state(self):
+        return {'entries': 0, 'fingerprint': None, 'first_position': None, 'last_position': None,
+                'month_positions': [], 'models': {}, 'rolling_windows': self.rolling_windows,
+                'initial_investment': self.initial_investment, 'offset': 0, 'last_line_offset': 0}
+
+    def _state_usable(self, state):
+        return (state is not None and state['rolling_windows'] == self.rolling_windows
+                and state['initial_investment'] == self.initial_investment)
+
+    # Function to read the entries appended to a JSON Lines log since the stored byte offset; the
+    # last consumed line is re-checked so a rewritten log is detected
+    def _read_jsonl(self, log_path, state):
+        if not self._state_usable(state) or os.path.getsize(log_path) < state['offset']:
+            state = self._fresh_state()
+        elif state['entries']:
+            with open(log_path, 'rb') as file:
+                file.seek(state['last_line_offset'])
+                last_line = file.read(state['offset'] - state['last_line_offset'])
+            if entry_fingerprint(normalize_entry(json.loads(last_line))) != state['fingerprint']:
+                state = self._fresh_state()
+
+        reader = EvalLogReader(log_path, state['offset'])
+        entries = reader.read_new()
+        if entries:
+            state['last_line_offset'] = reader.last_line_offset
+        state['offset'] = reader.offset
+        return entries, state
+
+    # Function to bring the metrics of one log up to date. JSON Lines logs are read from the stored
+    # byte offset, so only the new lines are parsed; other logs are loaded and the consumed prefix is
+    # skipped. Returns {model: {'overall': record, 'final_value': value, 'new_entries': n}}.
+    def update(self, log_path, data=None, write=True):
+        from metrics import metrics
+        from metrics.runner import discover_models, log_label, load_log, model_label
+
+        key = os.path.abspath(log_path)
+        state = self.logs.get(key)
+        if data is None and is_jsonl(log_path):
+            new_entries, state = self._read_jsonl(log_path, state)
+        else:
+            data = load_log(log_path, reload=True) if data is None else data
+            consumed = state['entries'] if state else 0
+            if (not self._state_usable(state) or consumed > len(data)
+                    or (consumed and entry_fingerprint(data[consumed - 1]) != state['fingerprint'])):
+                # First run, or history was rewritten: start over
+                state = self._fresh_state()
+            new_entries = data[state['entries']:]
+        consumed = state['entries']
+        # Starting over rewrites the metric files
+        rebuild = consumed == 0
+
+        models = {name: ModelState.from_dict(saved) for name, saved in state['models'].items()}
+        for model in discover_models(new_entries):
+            models.setdefault(model, ModelState(model, self.rolling_windows, self.initial_investment))
+        month_positions = deque(state['month_positions'], maxlen=MONTH)
+
+        new_records = {model: {} for model in models}
+        for index, entry in enumerate(new_entries, consumed):
+            month_positions.append(entry['position'])
+            if state['first_position'] is None:
+                state['first_position'] = entry['position']
+            for model, model_state in models.items():
+                if model in entry:
+                    for metric_type, records in model_state.update(index, entry, month_positions[0]).items():
+                        new_records[model].setdefault(metric_type, []).extend(records)
+
+        if new_entries:
+            state.update({'entries': consumed + len(new_entries), 'fingerprint': entry_fingerprint(new_entries[-1]),
+                          'last_position': new_entries[-1]['position'], 'month_positions': list(month_positions)})
+        state['models'] = {model: model_state.to_dict() for model, model_state in models.items()}
+        self.logs[key] = state
+
+        summary = {}
+        for model, model_state in models.items():
+            if model_state.count == 0:
+                continue
+            label = model_label(log_label(log_path), model)
+            overall = model_state.overall(state['first_position'], state['last_position'])
+            if write:
+                if rebuild:
+                    for metric_type in ['monthly', 'daily'] + [f"rolling_{w}" for w, _ in self.rolling_windows]:
+                        path = metrics.output_file_template.format(metric_type=metric_type, model=label)
+                        if os.path.exists(path):
+                            os.remove(path)
+                for metric_type, records in new_records[model].items():
+                    append_json_records(metrics.output_file_template.format(metric_type=metric_type, model=label),
+                                        records)
+                metrics.save_metrics_to_json(overall, label, 'overall')
+            summary[model] = {'overall': overall[0], 'final_value': model_state.final_value(),
+                              'new_entries': len(new_entries)}
+        return summary
+
+    def save(self):
+        if not self.state_path:
+            return
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump({'version': STATE_VERSION, 'logs': self.logs}, file)
+        os.replace(tmp_path, self.state_path)
+
+
+def run_cli(argv=None):
+    from metrics.metrics import input_file_path, parse_window
+
+    parser = argparse.ArgumentParser(description="Update the metrics and simulation with the new log entries only.")
+    parser.add_argument('logs', nargs='*', default=[input_file_path])
+    parser.add_argument('--state', default=STATE_PATH, help="Where the running statistics are kept")
+    parser.add_argument('--window', action='append', type=parse_window, default=[],
+                        help="Extra rolling window as WIDTH or WIDTH:STRIDE (repeatable)")
+    parser.add_argument('--initial', type=float, default=10000.00, help="Initial investment of the simulation")
+    args = parser.parse_args(argv)
+
+    evaluator = IncrementalEvaluator(args.state, args.window, args.initial)
+    for path in args.logs:
+        for model, result in evaluator.update(path).items():
+            print(f"{model}: +{result['new_entries']} entries, RMSE {result['overall']['RMSE']:.4f}, "
+                  f"final value ${result['final_value']:.2f}")
+    evaluator.save()
+    print_unparseable_report()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
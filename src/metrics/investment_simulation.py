@@ -1,46 +1,38 @@
-import json
-import re
+import argparse
+import os
+import sys
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from metrics.amount_parser import parse_amount_or_nan, print_unparseable_report
+from metrics.eval_log import default_log_path
 
 # File path for the JSON data
-input_file_path = '../../data/logs/eval-organised.logs.json'
+input_file_path = default_log_path()
 
 # Initial investment
 initial_investment = 10000.00
 
-# Function to parse and clean the amount
-def parse_amount(amount_str, direction):
-    # Handle cases like "from 1.0% to 1.5%" or "Approximately 1.5% decline"
-    if "from" in amount_str:
-        amount_str = re.search(r'\d+(\.\d+)?', amount_str).group(0)  # Take the first number
-    elif "Approximately" in amount_str or "decline" in amount_str:
-        amount_str = re.search(r'\d+(\.\d+)?', amount_str).group(0)  # Get the numeric part
-    
-    # Remove any remaining non-numeric characters, %, etc.
-    amount_str = re.sub(r'[^\d.-]', '', amount_str)
-
-    # Attempt to convert the cleaned string to a float
-    try:
-        amount = float(amount_str)
-    except ValueError:
-        amount = 0.0
-    
-    # If direction is 'fall' and the amount is positive, invert the value
-    if direction.lower() == "fall" and amount > 0:
-        amount = -amount
-
-    return amount
-
-
-# Function to simulate investment strategy
+# Function to simulate investment strategy. Entries with an unparseable amount are skipped and
+# counted, as in metrics.evaluate_model, instead of being traded as a 0.0% move.
 def simulate_investment(data, initial_investment, model_name):
     capital = initial_investment
     holdings = 0.0  # No stock purchased initially
+    skipped = 0
 
     for entry in data:
+        # Entries without a prediction from this model (e.g. other batches' models) are skipped
+        if model_name not in entry:
+            continue
         prediction_direction = entry[model_name]['direction']
-        prediction_amount = parse_amount(entry[model_name]['amount'], prediction_direction)
+        prediction_amount = parse_amount_or_nan(entry[model_name]['amount'], prediction_direction)
         actual_direction = entry['outcome']['direction']
-        actual_amount = parse_amount(entry['outcome']['amount'], actual_direction)
+        actual_amount = parse_amount_or_nan(entry['outcome']['amount'], actual_direction)
+        if prediction_amount != prediction_amount or actual_amount != actual_amount:
+            skipped += 1
+            continue
 
         if prediction_direction.lower() == 'rise' and capital > 0:
             # Buy: Invest all available capital
@@ -57,29 +49,42 @@ def simulate_investment(data, initial_investment, model_name):
             holdings = capital * (1 + prediction_amount / 100)
             capital = 0.0  # Reinvest cash
 
+    if skipped:
+        print(f"{model_name}: skipped {skipped} entries with unparseable amounts")
+
     # Final valuation
     final_value = capital + holdings
     return final_value
 
-# Main function to load data and run the simulation for each model
-def main():
-    # Load the JSON data
-    with open(input_file_path, 'r') as file:
-        data = json.load(file)
-    
-    # List of models to evaluate
-    models = ['gptb', 'gptc', 'gptd']
+# Main function to run the simulation for every model found in the log (see runner.py)
+def main(workers=None, log_path=None, initial=initial_investment):
+    from metrics.runner import model_label, run_evaluation
+    results = run_evaluation([log_path or input_file_path], evaluators=('simulation',), workers=workers,
+                             initial_investment=initial)
     
     # Dictionary to store final values for each model
     final_values = {}
     
-    for model in models:
-        final_value = simulate_investment(data, initial_investment, model)
-        final_values[model] = final_value
-        print(f"Final value for {model} after simulation: ${final_value:.2f}")
+    # Batch logs (batch files or 'batch:{batch}' store logs) label their models '{batch}-{model}'
+    for log, models in results.items():
+        for model, result in models.items():
+            label = model_label('' if log == 'main' else log, model)
+            final_value = result['simulation']['final_value']
+            final_values[label] = final_value
+            print(f"Final value for {label} after simulation: ${final_value:.2f}")
 
+    print_unparseable_report()
     return final_values
 
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate the all-in/all-out strategy for every model in the log.")
+    parser.add_argument('--log', default=input_file_path)
+    parser.add_argument('--initial', type=float, default=initial_investment)
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size (default: CPU count)")
+    args = parser.parse_args(argv)
+    main(args.workers, args.log, args.initial)
+    return 0
+
 # Run the main function
 if __name__ == "__main__":
-    results = main()
+    sys.exit(run_cli())
@@ -1,91 +1,81 @@
+import argparse
 import json
-import re
+import os
+import sys
 import numpy as np
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-import matplotlib.pyplot as plt
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import instrumentation
+from common.settings import data_path
+from metrics import engine
+from metrics.amount_parser import print_unparseable_report
+from metrics.eval_log import default_log_path
 
 # File paths
-input_file_path = '../../data/logs/eval-organised.logs.json'
-output_file_template = '../../data/logs/metric_{metric_type}_{model}.json'
-
-# Function to parse and clean the amount
-def parse_amount(amount_str, direction):
-    # Handle cases like "from 1.0% to 1.5%" or "Approximately 1.5% decline"
-    if "from" in amount_str:
-        amount_str = re.search(r'\d+(\.\d+)?', amount_str).group(0)  # Take the first number
-    elif "Approximately" in amount_str or "decline" in amount_str:
-        amount_str = re.search(r'\d+(\.\d+)?', amount_str).group(0)  # Get the numeric part
-    
-    # Remove any remaining non-numeric characters, %, etc.
-    amount_str = re.sub(r'[^\d.-]', '', amount_str)
-
-    # Attempt to convert the cleaned string to a float
-    try:
-        amount = float(amount_str)
-    except ValueError:
-        amount = 0.0
-    
-    # If direction is 'fall' and the amount is positive, invert the value
-    if direction.lower() == "fall" and amount > 0:
-        amount = -amount
-    return amount
+input_file_path = default_log_path()
+output_file_template = data_path('logs', 'metric_{metric_type}_{model}.json')
+plot_file_template = data_path('logs', '{metric_type}_metrics_{model}.png')
+
+# Extra rolling windows as (width, stride); each one is written as metric type 'rolling_{width}'
+ROLLING_WINDOWS = []
 
 # Function to calculate metrics for a given model
 def calculate_metrics(predictions, actuals, include_mae_r2=True):
-    rmse = np.sqrt(mean_squared_error(actuals, predictions))
-    metrics = {"RMSE": rmse}
+    window = engine.window_metrics(predictions, actuals, [0], [len(predictions)])
+    metrics = {"RMSE": float(window["RMSE"][0])}
     
     # Include MAE and R² for monthly and overall metrics
     if include_mae_r2:
-        mae = mean_absolute_error(actuals, predictions)
-        r2 = r2_score(actuals, predictions) if len(predictions) > 1 else None
-        metrics["MAE"] = mae
-        if r2 is not None:
-            metrics["R²"] = r2
+        metrics["MAE"] = float(window["MAE"][0])
+        if len(predictions) > 1:
+            metrics["R²"] = float(window["R²"][0])
     
     return metrics
 
-# Function to process the data for each model
-def evaluate_model(data, model_name):
-    daily_metrics = []
-    predictions = []
-    actuals = []
-    monthly_metrics = []
-    
-    for index, entry in enumerate(data):
-        if model_name in entry:
-            position = entry["position"]  # Get the position of the current entry
-            predicted_direction = entry[model_name]['direction']
-            predicted_amount = parse_amount(entry[model_name]['amount'], predicted_direction)
-            actual_direction = entry['outcome']['direction']
-            actual_amount = parse_amount(entry['outcome']['amount'], actual_direction)
-            
-            predictions.append(predicted_amount)
-            actuals.append(actual_amount)
-            
-            # For daily metrics, only calculate RMSE and include position
-            daily_metric = calculate_metrics([predicted_amount], [actual_amount], include_mae_r2=False)
-            daily_metric["position"] = position
-            daily_metrics.append(daily_metric)
-
-            # Every 30 positions, calculate monthly metrics (including MAE and R²)
-            if (index + 1) % 30 == 0:
-                month_metric = calculate_metrics(predictions[-30:], actuals[-30:], include_mae_r2=True)
-                month_metric["start_position"] = data[index - 29]["position"]  # Starting position of the 30-day period
-                month_metric["end_position"] = position  # Ending position of the 30-day period
-                monthly_metrics.append(month_metric)
-    
-    # Yield monthly metrics with positions for each 30-position window
-    if monthly_metrics:
+# Function to process the data for each model. The log is parsed into arrays once; the
+# daily, monthly (every 30 log entries), rolling and overall metrics are all computed from them.
+# A model without any parseable prediction is reported as skipped and yields nothing.
+def evaluate_model(data, model_name, rolling_windows=None):
+    skipped = []
+    arrays = engine.extract_arrays(data, model_name, skipped)
+    if skipped:
+        print(f"{model_name}: skipped {len(skipped)} entries with unparseable amounts")
+    predictions = arrays['prediction']
+    actuals = arrays['actual']
+    positions = arrays['position']
+    count = len(predictions)
+    if count == 0:
+        print(f"{model_name}: no parseable predictions; skipped")
+        return
+
+    # Every 30 positions of the log, calculate monthly metrics over the last 30 predictions
+    month_ends = np.nonzero((arrays['index'] + 1) % 30 == 0)[0]
+    if len(month_ends):
+        log_positions = np.array([entry["position"] for entry in data])
+        month_metrics = engine.window_metrics(predictions, actuals, np.maximum(month_ends - 29, 0), month_ends + 1)
+        # Starting and ending positions of each 30-day period
+        monthly_metrics = engine.metrics_records(
+            month_metrics, log_positions[arrays['index'][month_ends] - 29], positions[month_ends])
         yield "monthly", monthly_metrics
 
+    # Any-width rolling windows with a configurable stride
+    for width, stride in (ROLLING_WINDOWS if rolling_windows is None else rolling_windows):
+        starts, ends = engine.rolling_bounds(count, width, stride)
+        if len(ends):
+            window = engine.window_metrics(predictions, actuals, starts, ends)
+            yield f"rolling_{width}", engine.metrics_records(window, positions[starts], positions[ends - 1])
+
     # Calculate overall metrics (including MAE and R²)
-    overall_metrics = calculate_metrics(predictions, actuals, include_mae_r2=True)
-    overall_metrics["start_position"] = data[0]["position"]  # Overall start position
-    overall_metrics["end_position"] = data[-1]["position"]  # Overall end position
-    yield "overall", [overall_metrics]
+    overall = engine.window_metrics(predictions, actuals, [0], [count])
+    overall_metrics = engine.metrics_records(overall, [data[0]["position"]], [data[-1]["position"]])
+    yield "overall", overall_metrics
 
-    # Return daily metrics (only RMSE and position)
+    # Return daily metrics (only RMSE and position); the RMSE of a single day is its absolute error
+    daily_rmse = np.abs(predictions - actuals).tolist()
+    daily_metrics = [{"RMSE": rmse, "position": position} for rmse, position in zip(daily_rmse, positions.tolist())]
     yield "daily", daily_metrics
 
 # Function to save metrics to JSON file
@@ -93,54 +83,70 @@ def save_metrics_to_json(metrics, model_name, metric_type):
     output_file_path = output_file_template.format(metric_type=metric_type, model=model_name)
     with open(output_file_path, 'w') as output_file:
         json.dump(metrics, output_file, indent=4)
+    instrumentation.record_write('metrics', output_file_path)
     return output_file_path
 
-# Function to plot metrics over time
-def plot_metrics(metrics, metric_type, model_name):
-    dates = range(1, len(metrics) + 1)
-    rmses = [m['RMSE'] for m in metrics]
+# Function to plot metrics over time. Series longer than `max_points` are downsampled with LTTB
+# (on the RMSE curve) before drawing.
+def plot_metrics(metrics, metric_type, model_name, max_points=None):
+    # Imported here so runs that only write JSON metrics never load matplotlib; Agg renders
+    # without a display, also in worker processes
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from metrics.plots import lttb
+
+    dates = np.arange(1, len(metrics) + 1)
+    rmses = np.array([m['RMSE'] for m in metrics], dtype=np.float64)
+    keep = np.arange(len(metrics))
+    if max_points and len(metrics) > max_points:
+        keep = lttb(dates, rmses, max_points)
     
     plt.figure(figsize=(14, 7))
     
     # Plot only RMSE for daily metrics
     if metric_type == "daily":
-        plt.plot(dates, rmses, label='RMSE', marker='x')
+        plt.plot(dates[keep], rmses[keep], label='RMSE', marker='x')
     else:
-        maes = [m['MAE'] for m in metrics if 'MAE' in m]
-        r2s = [m['R²'] for m in metrics if 'R²' in m]
-        plt.plot(dates, rmses, label='RMSE', marker='x')
-        plt.plot(dates, maes, label='MAE', marker='o')
-        if r2s:
-            plt.plot(dates[:len(r2s)], r2s, label='R²', marker='s')
+        maes = np.array([m['MAE'] for m in metrics if 'MAE' in m], dtype=np.float64)
+        r2s = np.array([m['R²'] for m in metrics if 'R²' in m], dtype=np.float64)
+        plt.plot(dates[keep], rmses[keep], label='RMSE', marker='x')
+        plt.plot(dates[keep[keep < len(maes)]], maes[keep[keep < len(maes)]], label='MAE', marker='o')
+        if len(r2s):
+            plt.plot(dates[keep[keep < len(r2s)]], r2s[keep[keep < len(r2s)]], label='R²', marker='s')
 
     plt.xlabel('Date')
     plt.ylabel('Metrics')
     plt.title(f'{metric_type.capitalize()} Metrics for {model_name}')
     plt.legend()
     plt.grid(True)
-    plot_file_path = f'../../data/logs/{metric_type}_metrics_{model_name}.png'
+    plot_file_path = plot_file_template.format(metric_type=metric_type, model=model_name)
     plt.savefig(plot_file_path)
     plt.close()
     return plot_file_path
 
-# Main function to load data and evaluate all models
-def main():
-    with open(input_file_path, 'r') as file:
-        data = json.load(file)
-    
-    models = ['gptb', 'gptc', 'gptd']
-    for model in models:
-        model_results = {}
-        # Here, metric_type and metrics are unpacked correctly
-        for metric_type, metrics in evaluate_model(data, model):
-            model_results[metric_type] = metrics
-            save_metrics_to_json(metrics, model, metric_type)
-            
-            # Call plot_metrics with metrics (correctly unpacked)
-            plot_metrics(metrics, metric_type, model)  # <- Important: metrics is correctly passed now
+# Main function to evaluate every model found in the log (in a process pool, see runner.py)
+def main(rolling_windows=None, workers=None, plot=True, force_plots=False):
+    from metrics.runner import run_evaluation
+    results = run_evaluation([input_file_path], evaluators=('metrics',), workers=workers,
+                             rolling_windows=rolling_windows, plot=plot, force_plots=force_plots)
+    model_results = {model: result['metrics'] for model, result in results.get('main', {}).items()}
     
+    print_unparseable_report()
     return model_results
 
+# Function to read a rolling window given as 'width' or 'width:stride'
+def parse_window(text):
+    width, _, stride = text.partition(':')
+    return int(width), int(stride or 1)
+
 # Run the main function
 if __name__ == "__main__":
-    results = main()
+    parser = argparse.ArgumentParser(description="Evaluate the model predictions in the evaluation log.")
+    parser.add_argument('--window', action='append', type=parse_window, default=[],
+                        help="Extra rolling window as WIDTH or WIDTH:STRIDE (repeatable), e.g. 5 or 90:30")
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument('--no-plots', action='store_true', help="Only write the metrics JSON files")
+    parser.add_argument('--force-plots', action='store_true', help="Redraw plots even when their metrics are unchanged")
+    args = parser.parse_args()
+    results = main(args.window or None, args.workers, not args.no_plots, args.force_plots)
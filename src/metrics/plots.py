@@ -0,0 +1,119 @@
+# File: src/metrics/plots.py
+
+# Background rendering of the metric plots.
+#
+# PlotRenderer renders plots in a process pool, so plotting overlaps with evaluation and spreads
+# over cores. Each plot is keyed by a hash of the metrics it shows; when the hash matches the one
+# recorded for an existing PNG, the plot is skipped. Long series are downsampled with LTTB
+# (Largest-Triangle-Three-Buckets) before drawing, which keeps the shape of the curve at a fraction
+# of the points.
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from common.settings import data_path
+
+PLOT_HASHES_PATH = data_path('logs', 'plot_hashes.json')
+# Series longer than this are downsampled before plotting (the 14x7 figure is 1400 px wide)
+MAX_POINTS = 1000
+
+
+# Function to pick `threshold` indices of (x, y) with the LTTB algorithm; the first and last points
+# are always kept
+def lttb(x, y, threshold):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Bucket boundaries for the n - 2 inner points
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # The next bucket's average point (the last point for the final bucket)
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # Keep the point forming the largest triangle with the previous pick and the next average
+        areas = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+# Function to hash what a plot shows, so unchanged plots are not rendered again
+def plot_hash(metrics, metric_type, model_name, max_points=MAX_POINTS):
+    payload = json.dumps([metrics, metric_type, model_name, max_points], sort_keys=True, default=float)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _render(metrics, metric_type, model_name, max_points):
+    from metrics.metrics import plot_metrics
+    return plot_metrics(metrics, metric_type, model_name, max_points=max_points)
+
+
+class PlotRenderer:
+    def __init__(self, workers=None, hashes_path=PLOT_HASHES_PATH, force=False, max_points=MAX_POINTS):
+        self.workers = workers
+        self.hashes_path = hashes_path
+        self.force = force
+        self.max_points = max_points
+        self.hashes = {}
+        if hashes_path and os.path.exists(hashes_path):
+            with open(hashes_path, 'r') as file:
+                self.hashes = json.load(file)
+        self.executor = None
+        self.pending = {}
+        self.rendered, self.skipped = [], []
+
+    # Function to queue one plot; skipped when its PNG exists and was drawn from the same metrics
+    def submit(self, metrics, metric_type, model_name):
+        from metrics.metrics import plot_file_template
+        path = plot_file_template.format(metric_type=metric_type, model=model_name)
+        digest = plot_hash(metrics, metric_type, model_name, self.max_points)
+        if not self.force and self.hashes.get(path) == digest and os.path.exists(path):
+            self.skipped.append(path)
+            return
+
+        if self.workers == 1:
+            _render(metrics, metric_type, model_name, self.max_points)
+            self._done(path, digest)
+            return
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.pending[self.executor.submit(_render, metrics, metric_type, model_name, self.max_points)] = (path, digest)
+
+    def _done(self, path, digest):
+        self.hashes[path] = digest
+        self.rendered.append(path)
+
+    # Function to wait for the queued plots and record their hashes
+    def close(self):
+        if self.executor is not None:
+            for future, (path, digest) in self.pending.items():
+                future.result()
+                self._done(path, digest)
+            self.executor.shutdown()
+            self.executor = None
+            self.pending = {}
+        if self.hashes_path and self.rendered:
+            tmp_path = f"{self.hashes_path}.tmp"
+            with open(tmp_path, 'w') as file:
+                json.dump(self.hashes, file, indent=4, sort_keys=True)
+            os.replace(tmp_path, self.hashes_path)
+        return self.rendered, self.skipped
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
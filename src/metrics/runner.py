@@ -0,0 +1,246 @@
+# File: src/metrics/runner.py
+
+# Registry-driven evaluation runner. Model keys are discovered from the log entries themselves
+# (any key whose value carries a 'direction' and an 'amount', except 'outcome'). Every
+# (log file, model) pair is evaluated by the registered evaluators in a process pool, and the
+# results come back as one consolidated dict:
+#     {log_label: {model: {evaluator_name: result}}}
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import instrumentation
+from common.settings import data_path
+from metrics.eval_log import default_log_path, load_entries
+
+DEFAULT_LOGS = default_log_path()
+SUMMARY_FILE_PATH = data_path('logs', 'evaluation_summary.json')
+BATCH_PATTERN = re.compile(r'^(\d+)-')
+
+# Evaluator name -> function(data, model, label, options) returning a JSON-serialisable result
+EVALUATORS = {}
+
+
+# Decorator to register an evaluator under a name
+def register_evaluator(name):
+    def decorator(function):
+        EVALUATORS[name] = function
+        return function
+    return decorator
+
+
+# Plots are not drawn here: run_evaluation hands the results to a PlotRenderer (see plots.py)
+@register_evaluator('metrics')
+def evaluate_metrics(data, model, label, options):
+    from metrics import metrics
+    results = {}
+    for metric_type, values in metrics.evaluate_model(data, model, options.get('rolling_windows')):
+        results[metric_type] = values
+        if options.get('write', True):
+            metrics.save_metrics_to_json(values, label, metric_type)
+    return results
+
+
+@register_evaluator('simulation')
+def evaluate_simulation(data, model, label, options):
+    from metrics import investment_simulation
+    initial = options.get('initial_investment', investment_simulation.initial_investment)
+    return {'initial_investment': initial,
+            'final_value': investment_simulation.simulate_investment(data, initial, model)}
+
+
+@register_evaluator('backtest')
+def evaluate_backtest(data, model, label, options):
+    from metrics import backtest
+    result = backtest.backtest_model(data, model, options.get('strategy', 'threshold'),
+                                     options.get('cost_bps', 0.0), options.get('slippage_bps', 0.0),
+                                     **options.get('strategy_params', {}))
+    return {name: float(result[name][0]) for name in ('final_value', 'total_return', 'max_drawdown', 'sharpe', 'turnover')}
+
+
+# Directional hit rate and confusion matrix; bootstrap intervals come from significance.py
+@register_evaluator('direction')
+def evaluate_direction(data, model, label, options):
+    from metrics import significance
+    return significance.directional_report(data, model)
+
+
+# Function to find the model keys in an evaluation log, in order of first appearance
+def discover_models(data):
+    models = {}
+    for entry in data:
+        for key, value in entry.items():
+            if key != 'outcome' and isinstance(value, dict) and 'direction' in value and 'amount' in value:
+                models.setdefault(key, None)
+    return list(models)
+
+
+# Function to label a log file: '' for the main log, the batch number for '{batch}-...' files and
+# 'batch:{batch}' store logs
+def log_label(path):
+    from metrics.batch_store import STORE_PREFIX, is_store_path
+    if is_store_path(path):
+        return path[len(STORE_PREFIX):]
+    match = BATCH_PATTERN.match(os.path.basename(path))
+    return match.group(1) if match else ''
+
+
+def model_label(log, model):
+    return f"{log}-{model}" if log else model
+
+
+_loaded_logs = {}
+
+
+# Function to load an evaluation log (JSON Lines or JSON array, normalized, or 'batch:{batch}' from
+# the batch store) once per process; `reload` reads it again (e.g. after it has grown)
+def load_log(path, reload=False):
+    if reload or path not in _loaded_logs:
+        from metrics import batch_store
+        with instrumentation.stage('metrics.load_log') as stage:
+            if batch_store.is_store_path(path):
+                _loaded_logs[path] = batch_store.load_store_log(path)
+            else:
+                _loaded_logs[path] = load_entries(path)
+            stage.records = len(_loaded_logs[path])
+    return _loaded_logs[path]
+
+
+# Function to run the evaluators for one (log, model) pair; also returns the unparseable amounts it
+# met, so the parent process can merge them into its own report
+def _run_task(path, model, evaluator_names, options):
+    from metrics.amount_parser import UNPARSEABLE
+    before = UNPARSEABLE.copy()
+    data = load_log(path)
+    label = model_label(log_label(path), model)
+    result = {}
+    for name in evaluator_names:
+        with instrumentation.stage(f"metrics.{name}") as stage:
+            result[name] = EVALUATORS[name](data, model, label, options)
+            stage.records = len(data)
+    return path, model, result, UNPARSEABLE - before
+
+
+# Same as _run_task, in a worker process: the instrumentation recorded there is returned as well
+def _run_task_in_worker(path, model, evaluator_names, options):
+    outcome = _run_task(path, model, evaluator_names, options)
+    instrumentation.REGISTRY.dump_profiles(f"-{os.getpid()}")
+    return outcome + (instrumentation.REGISTRY.drain(),)
+
+
+# Function to queue the plots of one metrics result
+def _submit_plots(plotter, path, model, result):
+    if plotter is not None and 'metrics' in result:
+        label = model_label(log_label(path), model)
+        for metric_type, values in result['metrics'].items():
+            plotter.submit(values, metric_type, label)
+
+
+# Function to evaluate every model of every log file with the given evaluators. `workers=1` runs
+# everything in this process; otherwise tasks are spread over a process pool. Metric plots
+# (options 'plot', default True, and 'force_plots') are rendered in a second pool while the
+# evaluation continues.
+def run_evaluation(log_paths, evaluators=('metrics', 'simulation'), models=None, workers=None, **options):
+    unknown = [name for name in evaluators if name not in EVALUATORS]
+    if unknown:
+        raise ValueError(f"Unknown evaluator(s): {', '.join(unknown)}")
+
+    tasks = []
+    for path in log_paths:
+        found = discover_models(load_log(path))
+        selected = [model for model in found if models is None or model in models]
+        if not selected:
+            print(f"No model predictions found in {path}; skipping")
+        tasks.extend((path, model) for model in selected)
+
+    plotter = None
+    if options.get('plot', True) and 'metrics' in evaluators:
+        from metrics.plots import PlotRenderer
+        plotter = PlotRenderer(workers=workers, force=options.get('force_plots', False))
+
+    results = {}
+    if workers == 1 or len(tasks) <= 1:
+        outcomes = []
+        for path, model in tasks:
+            outcomes.append(_run_task(path, model, evaluators, options))
+            _submit_plots(plotter, *outcomes[-1][:3])
+    else:
+        from metrics.amount_parser import UNPARSEABLE
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_run_task_in_worker, path, model, evaluators, options)
+                       for path, model in tasks]
+            for future in as_completed(futures):
+                _submit_plots(plotter, *future.result()[:3])
+            outcomes = [future.result() for future in futures]
+        for outcome in outcomes:
+            UNPARSEABLE.update(outcome[3])
+            instrumentation.REGISTRY.merge(outcome[4])
+        outcomes = [outcome[:4] for outcome in outcomes]
+
+    if plotter is not None:
+        rendered, skipped = plotter.close()
+        if skipped:
+            print(f"Rendered {len(rendered)} plot(s); {len(skipped)} unchanged plot(s) skipped")
+
+    for path, model, result, _ in outcomes:
+        results.setdefault(log_label(path) or 'main', {})[model] = result
+    return results
+
+
+# Function to reduce the consolidated results to overall metrics and final values per model
+def summarize(results):
+    summary = {}
+    for log, models in results.items():
+        for model, result in models.items():
+            entry = {}
+            if result.get('metrics'):
+                entry['overall'] = result['metrics']['overall'][0]
+            if 'simulation' in result:
+                entry['final_value'] = result['simulation']['final_value']
+            if 'backtest' in result:
+                entry['backtest'] = result['backtest']
+            if 'direction' in result:
+                entry['directional_accuracy'] = result['direction']['accuracy']
+            summary.setdefault(log, {})[model] = entry
+    return summary
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate every model found in one or more evaluation logs.")
+    parser.add_argument('logs', nargs='*', default=[DEFAULT_LOGS],
+                        help=f"Log files or glob patterns, e.g. '{data_path('logs', '*-eval*.logs.json')}'")
+    parser.add_argument('--evaluator', action='append', choices=sorted(EVALUATORS),
+                        help="Evaluator to run (repeatable; default: all)")
+    parser.add_argument('--model', action='append', help="Only evaluate these model keys (repeatable)")
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument('--no-plots', action='store_true', help="Only write the metrics JSON files")
+    parser.add_argument('--force-plots', action='store_true', help="Redraw plots even when their metrics are unchanged")
+    parser.add_argument('--batches', action='store_true',
+                        help="Evaluate every batch of the batch log store (see batch_store.py) instead of log files")
+    parser.add_argument('--summary', default=SUMMARY_FILE_PATH, help="Where to write the summary JSON")
+    args = parser.parse_args(argv)
+
+    paths = sorted({path for pattern in args.logs for path in (glob.glob(pattern) or [pattern])})
+    if args.batches:
+        from metrics.batch_store import store_log_paths
+        paths = store_log_paths()
+    results = run_evaluation(paths, tuple(args.evaluator or EVALUATORS), args.model, args.workers,
+                             plot=not args.no_plots, force_plots=args.force_plots)
+    summary = summarize(results)
+    with open(args.summary, 'w') as file:
+        json.dump(summary, file, indent=4)
+    print(json.dumps(summary, indent=4))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
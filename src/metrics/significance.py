@@ -0,0 +1,217 @@
+# File: src/metrics/significance.py
+
+# Directional accuracy, confusion matrices and block-bootstrap confidence intervals.
+#
+# Every model gets a (log entries x statistics) matrix of per-entry sufficient statistics: valid
+# flag, squared and absolute error, actual and squared actual, direction flag and hit. A bootstrap
+# resample is then just a count of how often each entry was drawn, so the statistics of a whole
+# batch of resamples are one matrix product (counts @ statistics) for all models at once. Resamples
+# use circular blocks of consecutive entries, which keeps the day-to-day dependence of the series.
+# All models share the same resamples, so their differences are paired.
+
+import argparse
+import itertools
+import json
+import os
+import sys
+
+import numpy as np
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.settings import data_path
+from metrics import engine
+from metrics.eval_log import default_log_path, load_entries
+
+input_file_path = default_log_path()
+REPORT_PATH = data_path('logs', 'significance.json')
+RESAMPLES = 10000
+# Consecutive log entries drawn together (one trading week)
+BLOCK_LENGTH = 5
+CONFIDENCE = 0.95
+DIRECTIONS = ('rise', 'fall')
+METRICS = ('RMSE', 'MAE', 'R²', 'accuracy')
+# Size of the resample count matrices built at once
+CHUNK_CELLS = 8_000_000
+
+# Columns of the per-entry statistics matrix
+VALID, SQUARED, ABSOLUTE, ACTUAL, ACTUAL_SQUARED, DIRECTED, HIT = range(7)
+COLUMNS = 7
+
+
+def _direction(value):
+    direction = str(value).strip().lower()
+    return direction if direction in DIRECTIONS else None
+
+
+# Function to build the per-entry statistics of one model over the whole log; entries without the
+# model, or with amounts that cannot be parsed, contribute zeros
+def entry_statistics(data, model):
+    matrix = np.zeros((len(data), COLUMNS))
+    arrays = engine.extract_arrays(data, model)
+    rows = arrays['index']
+    errors = arrays['prediction'] - arrays['actual']
+    matrix[rows, VALID] = 1.0
+    matrix[rows, SQUARED] = errors * errors
+    matrix[rows, ABSOLUTE] = np.abs(errors)
+    matrix[rows, ACTUAL] = arrays['actual']
+    matrix[rows, ACTUAL_SQUARED] = arrays['actual'] * arrays['actual']
+
+    for row, entry in enumerate(data):
+        if model in entry:
+            predicted = _direction(entry[model]['direction'])
+            actual = _direction(entry['outcome']['direction'])
+            if predicted is not None and actual is not None:
+                matrix[row, DIRECTED] = 1.0
+                matrix[row, HIT] = float(predicted == actual)
+    return matrix
+
+
+# Function to turn summed statistics (..., COLUMNS) into metric arrays
+def metrics_from_statistics(sums):
+    metrics = engine.metrics_from_sums(sums[..., VALID], sums[..., SQUARED], sums[..., ABSOLUTE],
+                                       sums[..., ACTUAL], sums[..., ACTUAL_SQUARED])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        accuracy = sums[..., HIT] / sums[..., DIRECTED]
+    return {'RMSE': metrics['RMSE'], 'MAE': metrics['MAE'], 'R²': metrics['R²'], 'accuracy': accuracy}
+
+
+# Function to draw `resamples` circular block-bootstrap resamples of n entries as an index matrix
+# (resamples, n)
+def block_indices(n, resamples, block_length, rng):
+    blocks = -(-n // block_length)
+    starts = rng.integers(0, n, size=(resamples, blocks, 1))
+    return ((starts + np.arange(block_length)) % n).reshape(resamples, -1)[:, :n]
+
+
+# Function to count how often each entry appears in each resample: (resamples, n) float matrix
+def resample_counts(indices, n):
+    resamples = len(indices)
+    offsets = (np.arange(resamples) * n)[:, None]
+    return np.bincount((indices + offsets).ravel(), minlength=resamples * n).reshape(resamples, n).astype(np.float64)
+
+
+# Function to compute the summed statistics of every resample, for a (n, k) statistics matrix.
+# Resamples are processed in chunks so the count matrix stays small. Returns (resamples, k).
+def bootstrap_sums(statistics, resamples=RESAMPLES, block_length=BLOCK_LENGTH, seed=0):
+    n = len(statistics)
+    rng = np.random.default_rng(seed)
+    chunk = max(1, CHUNK_CELLS // max(n, 1))
+    sums = []
+    for done in range(0, resamples, chunk):
+        indices = block_indices(n, min(chunk, resamples - done), block_length, rng)
+        sums.append(resample_counts(indices, n) @ statistics)
+    return np.concatenate(sums)
+
+
+# Function to build the 2x2 confusion matrix of predicted against actual direction
+def confusion_matrix(data, model):
+    matrix = {f"actual_{actual}": {f"predicted_{predicted}": 0 for predicted in DIRECTIONS} for actual in DIRECTIONS}
+    for entry in data:
+        if model in entry:
+            predicted = _direction(entry[model]['direction'])
+            actual = _direction(entry['outcome']['direction'])
+            if predicted is not None and actual is not None:
+                matrix[f"actual_{actual}"][f"predicted_{predicted}"] += 1
+    return matrix
+
+
+# Function to report the point directional accuracy and confusion matrix of one model
+def directional_report(data, model):
+    confusion = confusion_matrix(data, model)
+    total = sum(sum(row.values()) for row in confusion.values())
+    hits = sum(confusion[f"actual_{direction}"][f"predicted_{direction}"] for direction in DIRECTIONS)
+    return {'accuracy': hits / total if total else None, 'count': total, 'confusion': confusion}
+
+
+# Function to report a point value with its percentile interval over the bootstrap samples
+def _interval(point, samples, confidence):
+    samples = samples[np.isfinite(samples)]
+    low = high = np.nan
+    if len(samples):
+        low, high = np.percentile(samples, [50 * (1 - confidence), 50 * (1 + confidence)])
+    return {'value': _number(point), 'low': _number(low), 'high': _number(high)}
+
+
+def _number(value):
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+# Function to build the full report: per model, point metrics with confidence intervals, directional
+# accuracy and confusion matrix; per pair of models, the paired difference (first - second) of every
+# metric with its interval and a two-sided bootstrap p-value
+def significance_report(data, models=None, resamples=RESAMPLES, block_length=BLOCK_LENGTH,
+                        confidence=CONFIDENCE, seed=0):
+    from metrics.runner import discover_models
+
+    models = list(models or discover_models(data))
+    statistics = np.concatenate([entry_statistics(data, model) for model in models], axis=1)
+    samples = bootstrap_sums(statistics, resamples, block_length, seed).reshape(resamples, len(models), COLUMNS)
+    points = metrics_from_statistics(statistics.sum(axis=0).reshape(len(models), COLUMNS))
+    sampled = metrics_from_statistics(samples)
+
+    report = {'entries': len(data), 'resamples': resamples, 'block_length': block_length,
+              'confidence': confidence, 'models': {}, 'differences': {}}
+    for m, model in enumerate(models):
+        report['models'][model] = dict(
+            directional_report(data, model),
+            metrics={name: _interval(points[name][m], sampled[name][:, m], confidence) for name in METRICS})
+
+    for (a, first), (b, second) in itertools.combinations(enumerate(models), 2):
+        differences = {}
+        for name in METRICS:
+            with np.errstate(invalid='ignore'):
+                diff = sampled[name][:, a] - sampled[name][:, b]
+            diff = diff[np.isfinite(diff)]
+            result = _interval(points[name][a] - points[name][b], diff, confidence)
+            if len(diff):
+                result['p_value'] = float(min(1.0, 2 * min((diff <= 0).mean(), (diff >= 0).mean())))
+                result['significant'] = bool(result['low'] is not None and (result['low'] > 0 or result['high'] < 0))
+            differences[name] = result
+        report['differences'][f"{first}-{second}"] = differences
+    return report
+
+
+# Function to print a value with its interval; missing values (no valid resamples) print as 'n/a'
+def _format(interval):
+    if interval['value'] is None:
+        return 'n/a'
+    if interval['low'] is None or interval['high'] is None:
+        return f"{interval['value']:.4f} [n/a]"
+    return f"{interval['value']:.4f} [{interval['low']:.4f}, {interval['high']:.4f}]"
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Directional accuracy and block-bootstrap confidence intervals "
+                                                 "for every model and every pair of models.")
+    parser.add_argument('log', nargs='?', default=input_file_path)
+    parser.add_argument('--model', action='append', help="Only these model keys (repeatable)")
+    parser.add_argument('--resamples', type=int, default=RESAMPLES)
+    parser.add_argument('--block-length', type=int, default=BLOCK_LENGTH,
+                        help="Consecutive log entries drawn together")
+    parser.add_argument('--confidence', type=float, default=CONFIDENCE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=REPORT_PATH)
+    args = parser.parse_args(argv)
+
+    report = significance_report(load_entries(args.log), args.model, args.resamples, args.block_length,
+                                 args.confidence, args.seed)
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=4)
+
+    level = f"{args.confidence:.0%}"
+    for model, result in report['models'].items():
+        print(f"{model}: " + ', '.join(f"{name} {_format(result['metrics'][name])}" for name in METRICS))
+    print(f"Paired differences ({level} intervals; * = interval excludes 0):")
+    for pair, differences in report['differences'].items():
+        print(f"  {pair}: " + ', '.join(f"{name} {_format(result)}{'*' if result.get('significant') else ''}"
+                                        for name, result in differences.items()))
+    print(f"Report saved to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
@@ -0,0 +1,219 @@
+# File: src/news_fetch/dedup.py
+
+# Near-duplicate detection for news stories (syndicated wire copies across sources).
+#
+# Each story's title + body is cut into hashed word shingles and summarised as a MinHash signature.
+# Signatures are banded into an LSH index, so a new story is only compared with the stories that
+# share a band bucket, not with every story pairwise. A candidate counts as a duplicate when its
+# estimated Jaccard similarity reaches `threshold`; identical normalized texts are caught by an exact
+# hash first. The index keeps the stories of the last `window_days` days around each processed day
+# and is persisted as an .npz file, so every new day is checked against what was already fetched.
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import threading
+import zlib
+from datetime import date as date_cls
+
+import numpy as np
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.settings import data_path
+
+NEWS_DIR = data_path('news')
+DEDUP_INDEX_PATH = data_path('news', 'dedup_index.npz')
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 16
+THRESHOLD = 0.8
+WINDOW_DAYS = 3
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+WORD = re.compile(r'\w+')
+
+
+# Function to normalize a story to the text that is compared (lowercased title and body words)
+def story_text(story):
+    return ' '.join(WORD.findall(f"{story.get('title', '')} {story.get('body', '')}".lower()))
+
+
+# Function to hash the word shingles of a text into 32-bit values
+def shingle_hashes(text, k=SHINGLE_SIZE):
+    words = text.split()
+    if len(words) <= k:
+        shingles = {' '.join(words)}
+    else:
+        shingles = {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        # a < 2**31 and 32-bit shingle hashes keep a * x + b below 2**64
+        self.a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+
+    # Function to compute the MinHash signature of a set of shingle hashes
+    def signature(self, hashes):
+        if len(hashes) == 0:
+            return np.full(len(self.a), MERSENNE_PRIME, dtype=np.uint64)
+        permuted = (hashes[:, None] * self.a + self.b) % MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+
+class DedupIndex:
+    def __init__(self, path=DEDUP_INDEX_PATH, threshold=THRESHOLD, window_days=WINDOW_DAYS,
+                 num_perm=NUM_PERM, bands=BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.threshold = threshold
+        self.window_days = window_days
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self.lock = threading.Lock()
+        # Parallel per-story lists: date (ordinal), exact hash, signature
+        self.days, self.exact, self.signatures = [], [], []
+        self.buckets, self.exact_index = {}, {}
+        self.load()
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def _rebuild_buckets(self):
+        self.buckets, self.exact_index = {}, {}
+        for i, (exact, signature) in enumerate(zip(self.exact, self.signatures)):
+            self.exact_index.setdefault(exact, []).append(i)
+            for key in self._band_keys(signature):
+                self.buckets.setdefault(key, []).append(i)
+
+    def _add(self, day, exact, signature):
+        i = len(self.signatures)
+        self.days.append(day)
+        self.exact.append(exact)
+        self.signatures.append(signature)
+        self.exact_index.setdefault(exact, []).append(i)
+        for key in self._band_keys(signature):
+            self.buckets.setdefault(key, []).append(i)
+
+    def _compact(self, keep):
+        self.days = [d for d, k in zip(self.days, keep) if k]
+        self.exact = [e for e, k in zip(self.exact, keep) if k]
+        self.signatures = [s for s, k in zip(self.signatures, keep) if k]
+        self._rebuild_buckets()
+
+    # Function to check one story against the index; returns True when it duplicates an indexed story
+    # within the window of `day`
+    def _is_duplicate(self, day, exact, signature):
+        if any(abs(self.days[i] - day) <= self.window_days for i in self.exact_index.get(exact, ())):
+            return True
+        candidates = {i for key in self._band_keys(signature) for i in self.buckets.get(key, ())}
+        for i in candidates:
+            if abs(self.days[i] - day) <= self.window_days:
+                if np.mean(self.signatures[i] == signature) >= self.threshold:
+                    return True
+        return False
+
+    # Function to drop the stories of `date` ('YYYY-MM-DD') that duplicate each other or a story
+    # already indexed within the window, and index the ones that are kept. Reprocessing a date
+    # replaces its earlier entries. Returns (kept stories, number dropped).
+    def filter_day(self, date, stories):
+        day = date_cls.fromisoformat(date).toordinal()
+        prepared = []
+        for story in stories:
+            text = story_text(story)
+            prepared.append((story, hashlib.sha1(text.encode('utf-8')).hexdigest(),
+                             self.hasher.signature(shingle_hashes(text))))
+
+        with self.lock:
+            if day in self.days:
+                self._compact([d != day for d in self.days])
+            kept = []
+            for story, exact, signature in prepared:
+                if self._is_duplicate(day, exact, signature):
+                    continue
+                self._add(day, exact, signature)
+                kept.append(story)
+        return kept, len(stories) - len(kept)
+
+    # Function to forget the stories older than the window before `date`
+    def evict_before(self, date):
+        cutoff = date_cls.fromisoformat(date).toordinal() - self.window_days
+        with self.lock:
+            if any(d < cutoff for d in self.days):
+                self._compact([d >= cutoff for d in self.days])
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with np.load(self.path) as saved:
+            if saved['signatures'].shape[1:] != (len(self.hasher.a),):
+                return
+            self.days = saved['days'].tolist()
+            self.exact = saved['exact'].tolist()
+            self.signatures = list(saved['signatures'])
+        self._rebuild_buckets()
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            signatures = np.array(self.signatures, dtype=np.uint64).reshape(-1, len(self.hasher.a))
+            days = np.array(self.days, dtype=np.int64)
+            exact = np.array(self.exact, dtype='U40')
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(tmp_path, days=days, exact=exact, signatures=signatures)
+        os.replace(tmp_path, self.path)
+
+
+# Function to deduplicate the daily files already on disk, oldest first, rewriting the files whose
+# stories change. Returns (stories kept, stories dropped).
+def dedup_news_dir(directory=NEWS_DIR, index_path=DEDUP_INDEX_PATH, threshold=THRESHOLD,
+                   window_days=WINDOW_DAYS, dry_run=False):
+    from news_fetch.news_merge import list_day_files
+    from news_fetch.story_io import read_stories, write_stories
+
+    index = DedupIndex(None if dry_run else index_path, threshold, window_days)
+    days, _ = list_day_files(directory)
+    total_kept = total_dropped = 0
+    for day in sorted(days, key=lambda d: (d['date'], d['counter'])):
+        stories = read_stories(day['path'])
+        kept, dropped = index.filter_day(day['date'], stories)
+        index.evict_before(day['date'])
+        total_kept += len(kept)
+        total_dropped += dropped
+        if dropped and not dry_run:
+            write_stories(day['path'], kept)
+    index.save()
+    return total_kept, total_dropped
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Drop exact and near-duplicate stories from the daily news files.")
+    parser.add_argument('--news-dir', default=NEWS_DIR)
+    parser.add_argument('--index', default=DEDUP_INDEX_PATH)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="Estimated Jaccard similarity at which stories count as duplicates")
+    parser.add_argument('--window', type=int, default=WINDOW_DAYS, help="Days around each day to compare with")
+    parser.add_argument('--dry-run', action='store_true', help="Only report; do not rewrite files or the index")
+    args = parser.parse_args(argv)
+
+    kept, dropped = dedup_news_dir(args.news_dir, args.index, args.threshold, args.window, args.dry_run)
+    print(f"Kept {kept} stories, dropped {dropped} duplicate(s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
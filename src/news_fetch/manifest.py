@@ -0,0 +1,92 @@
+# File: src/news_fetch/manifest.py
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+STATUS_DONE = 'done'
+STATUS_EMPTY = 'empty'
+STATUS_FAILED = 'failed'
+
+
+# Function to hash a saved day file so a resumed run can tell whether it is intact
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Persistent record of which days have been fetched, keyed by date (YYYY-MM-DD).
+# Each entry holds the status, counter, story count, last page cursor and content hash.
+class FetchManifest:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.days = {}
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                self.days = json.load(file).get('days', {})
+
+    # A day is complete when it was fetched successfully and its file (if any) is still there
+    def is_complete(self, date, verify=False):
+        entry = self.days.get(date)
+        if entry is None or entry.get('status') not in (STATUS_DONE, STATUS_EMPTY):
+            return False
+        if entry['status'] == STATUS_EMPTY:
+            return True
+        if not os.path.exists(entry.get('file', '')):
+            return False
+        return not verify or file_sha256(entry['file']) == entry.get('sha256')
+
+    # Function to list the days of a range that still need fetching
+    def pending(self, dates, verify=False):
+        return [date for date in dates if not self.is_complete(date, verify)]
+
+    def mark_done(self, date, counter, story_count, cursor=None, file=None):
+        status = STATUS_DONE if file else STATUS_EMPTY
+        self._update(date, {
+            'status': status,
+            'counter': counter,
+            'story_count': story_count,
+            'cursor': cursor,
+            'file': file,
+            'sha256': file_sha256(file) if file else None,
+        })
+
+    # Function to point a day at its file after the file was converted (e.g. compressed)
+    def replace_file(self, date, old_file, new_file):
+        entry = self.days.get(date)
+        if entry is None or entry.get('file') != old_file:
+            return
+        entry = dict(entry, file=new_file, sha256=file_sha256(new_file))
+        self._update(date, entry)
+
+    def mark_failed(self, date, counter, error):
+        entry = dict(self.days.get(date, {}))
+        entry.update({'status': STATUS_FAILED, 'counter': counter, 'error': str(error)})
+        self._update(date, entry)
+
+    def _update(self, date, entry):
+        entry['updated_at'] = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        with self.lock:
+            self.days[date] = entry
+            self.save()
+
+    # Write to a temporary file and rename it, so a crash never leaves a truncated manifest
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w') as file:
+                json.dump({'days': self.days}, file, indent=4, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
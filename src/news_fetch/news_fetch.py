@@ -2,77 +2,187 @@
 
 import requests
 import time
-import json
-from pprint import pprint
+import sys
+import argparse
+import threading
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
-from dotenv import load_dotenv
 from tqdm import tqdm
 
-# Load environment variables
-load_dotenv(dotenv_path='../../config/.env')
-
-username = os.getenv("USERNAME")
-password = os.getenv("PASSWORD")
-AppID = os.getenv("APP_ID")
-
-
-def get_auth_header(username, password, appid):
-    # Generate the authorization header for making requests to the Aylien API.
-    token_response = requests.post(
-        'https://api.aylien.com/v1/oauth/token',
-        auth=(username, password),
-        data={'grant_type': 'password'}
-    )
-    token_response.raise_for_status()
-    token = token_response.json()['access_token']
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'AppId': appid
-    }
-    return headers
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import instrumentation
+from common.backoff import backoff_delay, parse_retry_after
+from common.http import thread_session
+from common.http_cache import CachedSession, MODE_REPLAY, cache_from_env
+from common.rate_limit import RateLimiter
+from common.settings import data_path, load_env
+from news_fetch.dedup import DEDUP_INDEX_PATH, WINDOW_DAYS, DedupIndex
+from news_fetch.manifest import FetchManifest
+from news_fetch.story_io import FORMATS, FULL_FIELDS, day_file_name, project_story, truncate_body, write_stories
+
+NEWS_DIR = data_path('news')
+MANIFEST_PATH = os.path.join(NEWS_DIR, 'manifest.json')
+
+TOKEN_URL = 'https://api.aylien.com/v1/oauth/token'
+STORIES_URL = 'https://api.aylien.com/v6/news/stories'
+
+# Response cache settings; see common/http_cache.py for HTTP_CACHE_MODE=off|on|replay
+CACHE_DIR = data_path('cache', 'http')
+CACHE_TTLS = {'/news/stories': 30 * 86400}
+
+
+# Function to read the Aylien credentials (username, password, app id) from the environment,
+# loading config/.env on first use
+def credentials():
+    load_env()
+    return os.getenv("USERNAME"), os.getenv("PASSWORD"), os.getenv("APP_ID")
+
+
+# Bearer token shared by all workers; only one OAuth round-trip per token lifetime
+class AuthTokenCache:
+    def __init__(self, username, password, appid, margin=60, offline=False):
+        self.offline = offline
+        self.username = username
+        self.password = password
+        self.appid = appid
+        self.margin = margin
+        self.headers = None
+        self.expires_at = 0.0
+        self.lock = threading.Lock()
+
+    # Return valid auth headers, requesting a new token only when the cached one has expired
+    def get_headers(self):
+        if self.offline:
+            return {'AppId': self.appid}
+        with self.lock:
+            if self.headers is None or time.monotonic() >= self.expires_at:
+                token_response = requests.post(
+                    TOKEN_URL,
+                    auth=(self.username, self.password),
+                    data={'grant_type': 'password'}
+                )
+                token_response.raise_for_status()
+                token_json = token_response.json()
+                self.headers = {
+                    'Authorization': f"Bearer {token_json['access_token']}",
+                    'AppId': self.appid
+                }
+                expires_in = token_json.get('expires_in', 3600)
+                self.expires_at = time.monotonic() + max(0, expires_in - self.margin)
+            return self.headers
+
+    # Drop the cached token so the next call fetches a fresh one (e.g. after a 401)
+    def invalidate(self, headers=None):
+        with self.lock:
+            if headers is None or headers is self.headers:
+                self.headers = None
+
+
+_shared_auth = None
+_shared_auth_lock = threading.Lock()
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Function to return the process-wide response cache (None when HTTP_CACHE_MODE is off)
+def response_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = cache_from_env(CACHE_DIR, ttls=CACHE_TTLS) or False
+    return _cache or None
+
+
+# Function to get the calling thread's cached, keep-alive session for calls that do not pass their own
+def http_session():
+    return CachedSession(thread_session(), response_cache())
+
+
+# Function to return the process-wide token cache used by calls that do not pass their own `auth`,
+# so fetching day after day reuses one bearer token until it expires
+def shared_auth():
+    global _shared_auth
+    with _shared_auth_lock:
+        if _shared_auth is None:
+            cache = response_cache()
+            _shared_auth = AuthTokenCache(*credentials(), offline=cache is not None and cache.mode == MODE_REPLAY)
+        return _shared_auth
+
+
+class NewsFetchError(Exception):
+    pass
 
 
-def get_stories(params, headers, max_stories=20):
+def get_stories(params, headers, max_stories=20, session=None, limiter=None, auth=None,
+                max_retries=8, backoff_base=2.0, backoff_cap=300.0):
     # Fetch stories from the Aylien News API using the provided parameters and headers.
+    # With `auth`, headers come from the shared token cache and are refreshed on a 401.
+    # Rate limits, server errors and timeouts are retried with jittered exponential backoff
+    # (honouring Retry-After); NewsFetchError is raised once the retries are used up.
     fetched_stories = []
     stories = None
+    http = session if session is not None else http_session()
+    attempt = 0
+
+    def retry(reason, retry_after=None, pause_all=False):
+        nonlocal attempt
+        if attempt >= max_retries:
+            raise NewsFetchError(f"{reason}; giving up after {max_retries} retries")
+        delay = backoff_delay(attempt, backoff_base, backoff_cap, retry_after)
+        attempt += 1
+        instrumentation.count('news_fetch.retries')
+        tqdm.write(f"{reason}. Retrying in {delay:.1f} seconds.")
+        if pause_all and limiter is not None:
+            # The workers then wait in limiter.acquire(), counted as 'sleep_seconds.rate_limit'
+            instrumentation.count('news_fetch.rate_limit_pauses')
+            limiter.pause(delay)
+        else:
+            instrumentation.sleep(delay, 'news_fetch.backoff')
 
     while stories is None or len(stories) > 0:
         try:
-            response = requests.get('https://api.aylien.com/v6/news/stories', params=params, headers=headers,
-                                    timeout=30)
-            if response.status_code == 200:
+            if auth is not None:
+                headers = auth.get_headers()
+            if limiter is not None:
+                limiter.acquire()
+            response = http.get(STORIES_URL, params=params, headers=headers, timeout=30)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            retry(f"Request failed ({type(e).__name__})")
+            continue
+
+        if response.status_code == 200:
+            attempt = 0
+            with instrumentation.timer('news_fetch.parse_json'):
                 response_json = response.json()
-                stories = response_json.get('stories', [])
-                fetched_stories.extend(stories)
-                if len(fetched_stories) >= max_stories:
-                    fetched_stories = fetched_stories[:max_stories]
-                    break
-                if 'next_page_cursor' in response_json:
-                    params['cursor'] = response_json['next_page_cursor']
-                else:
-                    break
-                tqdm.write(f"Fetched {len(stories)} stories. Total story count so far: {len(fetched_stories)}")
-            elif response.status_code == 429:
-                tqdm.write("Rate limit reached. Sleeping for 10 seconds.")
-                time.sleep(10)
-            elif 500 <= response.status_code <= 599:
-                tqdm.write(f"Server error {response.status_code}. Sleeping for 260 seconds.")
-                time.sleep(260)
+            stories = response_json.get('stories', [])
+            fetched_stories.extend(stories)
+            if len(fetched_stories) >= max_stories:
+                fetched_stories = fetched_stories[:max_stories]
+                break
+            if 'next_page_cursor' in response_json:
+                params['cursor'] = response_json['next_page_cursor']
             else:
-                tqdm.write(response.text)
                 break
-        except requests.exceptions.Timeout:
-            tqdm.write("Request timed out. Retrying...")
-            continue
-        except Exception as e:
-            tqdm.write(str(e))
-            break
+            tqdm.write(f"Fetched {len(stories)} stories. Total story count so far: {len(fetched_stories)}")
+        elif response.status_code == 401 and auth is not None:
+            auth.invalidate(headers)
+            retry("Token rejected, refreshing bearer token")
+        elif response.status_code == 429:
+            retry("Rate limit reached", parse_retry_after(response.headers.get('Retry-After')), pause_all=True)
+        elif 500 <= response.status_code <= 599:
+            retry(f"Server error {response.status_code}", parse_retry_after(response.headers.get('Retry-After')))
+        else:
+            raise NewsFetchError(f"HTTP {response.status_code}: {response.text}")
     return fetched_stories
 
 
-def filter_stories(stories):
+# Function to keep the econ/fin stories, projected to `fields` (see story_io.FULL_FIELDS) and with
+# the body optionally truncated to `max_body_sentences` sentences / `max_body_tokens` tokens
+def filter_stories(stories, fields=FULL_FIELDS, max_body_sentences=None, max_body_tokens=None):
     filtered_stories = []
     for story in stories:
         # Filter the categories with score 1 in ay.econ or ay.fin
@@ -96,13 +206,20 @@ def filter_stories(stories):
                 },
                 "categories": filtered_categories
             }
+            if fields != FULL_FIELDS:
+                filtered_story = project_story(filtered_story, fields)
+            if "body" in filtered_story and (max_body_sentences is not None or max_body_tokens is not None):
+                filtered_story["body"] = truncate_body(filtered_story["body"], max_body_sentences, max_body_tokens)
             filtered_stories.append(filtered_story)
 
     return filtered_stories
 
 
-def fetch_and_save_news_for_day(date, counter):
-    headers = get_auth_header(username, password, AppID)
+# Function to fetch the econ/fin stories of one day; returns (filtered stories, last page cursor)
+def fetch_news_for_day(date, auth=None, session=None, limiter=None,
+                       fields=FULL_FIELDS, max_body_sentences=None, max_body_tokens=None):
+    if auth is None:
+        auth = shared_auth()
     params = {
         'published_at': f'[{date}T00:00:00Z TO {date}T23:59:59Z]',
         'language': 'en',
@@ -116,34 +233,144 @@ def fetch_and_save_news_for_day(date, counter):
         'per_page': 100
     }
 
-    # Fetch stories with a limit of 20 per day
-    stories = get_stories(params, headers, max_stories=20)
-    filtered_stories = filter_stories(stories)
+    with instrumentation.stage('news_fetch.day') as stage:
+        # Fetch stories with a limit of 20 per day
+        stories = get_stories(params, None, max_stories=20, session=session, limiter=limiter, auth=auth)
+        filtered_stories = filter_stories(stories, fields, max_body_sentences, max_body_tokens)
+        stage.records = len(filtered_stories)
+    return filtered_stories, params.get('cursor')
+
+
+# Function to drop the duplicates of a day's stories and save the rest to its day file
+def save_news_for_day(date, counter, stories, dedup=None, fmt='json'):
+    # Drop syndicated copies of stories already seen this day or in the surrounding window
+    if dedup is not None:
+        stories, dropped = dedup.filter_day(date, stories)
+        instrumentation.count('news_fetch.duplicates_dropped', dropped)
+        if dropped:
+            tqdm.write(f"Dropped {dropped} duplicate stories for {date}")
 
     # Ensure the directory exists
-    os.makedirs('../../data/news', exist_ok=True)
+    os.makedirs(NEWS_DIR, exist_ok=True)
 
-    # Save the filtered stories to a JSON file
-    if filtered_stories:
-        filename = f"../../data/news/{counter}_{date.replace('-', '_')}.json"
-        with open(filename, "w") as file:
-            json.dump(filtered_stories, file, indent=4)
+    # Save the filtered stories to a JSON (or compressed JSON Lines) file
+    filename = None
+    if stories:
+        filename = write_stories(os.path.join(NEWS_DIR, day_file_name(counter, date, fmt)), stories)
         tqdm.write(f"Filtered stories saved to {filename}")
     else:
         tqdm.write(f"No stories found for {date}")
+    return {"story_count": len(stories), "file": filename}
+
+
+def fetch_and_save_news_for_day(date, counter, auth=None, session=None, limiter=None, dedup=None,
+                                fields=FULL_FIELDS, max_body_sentences=None, max_body_tokens=None, fmt='json'):
+    stories, cursor = fetch_news_for_day(date, auth, session, limiter, fields, max_body_sentences, max_body_tokens)
+    result = save_news_for_day(date, counter, stories, dedup, fmt)
+    return dict(result, cursor=cursor)
+
+
+# Function to fetch a range of days concurrently with a shared token, pooled sessions
+# and one rate limiter across all workers. Days already recorded as complete in the
+# manifest are skipped, so a restarted run only fetches missing or failed days.
+# The days are fetched in parallel but deduplicated, saved and recorded in date order; the dedup
+# index is saved before each day is marked done, so an interrupted run resumes with an index that
+# covers every completed day.
+def backfill_news(start_date, end_date, workers=4, requests_per_second=3.0, first_counter=1,
+                  manifest_path=MANIFEST_PATH, verify=False, dedup_window=WINDOW_DAYS, fmt='json', **options):
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    total_days = (end - start).days + 1
+    counters = {(start + timedelta(days=offset)).strftime("%Y-%m-%d"): first_counter + offset
+                for offset in range(total_days)}
+    manifest = FetchManifest(manifest_path)
+    pending = sorted(manifest.pending(list(counters), verify=verify))
+    tqdm.write(f"{total_days - len(pending)} of {total_days} days already fetched; {len(pending)} to go.")
+    if not pending:
+        return []
+
+    cache = cache_from_env(CACHE_DIR, ttls=CACHE_TTLS)
+    replay = cache is not None and cache.mode == MODE_REPLAY
+    auth = AuthTokenCache(*credentials(), offline=replay)
+    limiter = RateLimiter(requests_per_second, burst=workers)
+    dedup = DedupIndex(DEDUP_INDEX_PATH, window_days=dedup_window) if dedup_window is not None else None
+
+    # Index in `pending` of the next day to save; days fetched early wait for the days before them.
+    # The pool starts tasks in submission order, so every earlier day is already running or done.
+    turn = [0]
+    ready = threading.Condition()
+    order = {date_str: index for index, date_str in enumerate(pending)}
+
+    def fetch_day(date_str):
+        fetched = None
+        try:
+            session = CachedSession(thread_session(workers), cache)
+            fetched = fetch_news_for_day(date_str, auth=auth, session=session, limiter=limiter, **options)
+        finally:
+            with ready:
+                ready.wait_for(lambda: turn[0] == order[date_str])
+                try:
+                    if fetched is not None:
+                        stories, cursor = fetched
+                        result = save_news_for_day(date_str, counters[date_str], stories, dedup, fmt)
+                        if dedup is not None:
+                            dedup.evict_before(date_str)
+                            dedup.save()
+                        manifest.mark_done(date_str, counters[date_str], result["story_count"],
+                                           cursor=cursor, file=result["file"])
+                finally:
+                    turn[0] += 1
+                    ready.notify_all()
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor, \
+            tqdm(total=len(pending), desc="Progress", unit="day", ncols=100) as pbar:
+        futures = {executor.submit(fetch_day, date_str): date_str for date_str in pending}
+        for future in as_completed(futures):
+            date_str = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                tqdm.write(f"Failed to fetch {date_str}: {e}")
+                manifest.mark_failed(date_str, counters[date_str], e)
+                failed.append(date_str)
+            pbar.update(1)
+    return sorted(failed)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch daily news stories from the Aylien News API.")
+    parser.add_argument('--start-date', default="2022-05-30")
+    parser.add_argument('--end-date', default="2024-08-12")
+    parser.add_argument('--workers', type=int, default=4, help="Number of concurrent workers")
+    parser.add_argument('--rate', type=float, default=3.0,
+                        help="Maximum requests per second shared by all workers")
+    parser.add_argument('--manifest', default=MANIFEST_PATH, help="Path of the resume manifest")
+    parser.add_argument('--verify', action='store_true',
+                        help="Re-hash saved files and refetch days whose content changed")
+    parser.add_argument('--dedup-window', type=int, default=WINDOW_DAYS,
+                        help="Days around each day to check for duplicate stories")
+    parser.add_argument('--no-dedup', action='store_true', help="Keep duplicate and syndicated stories")
+    parser.add_argument('--format', choices=sorted(FORMATS), default='json',
+                        help="Day file format; gzip/zstd write compressed JSON Lines")
+    parser.add_argument('--fields', nargs='+', default=list(FULL_FIELDS),
+                        help="Story fields to keep (dotted names select nested fields, e.g. source.name)")
+    parser.add_argument('--max-body-sentences', type=int, help="Truncate story bodies to N sentences")
+    parser.add_argument('--max-body-tokens', type=int, help="Truncate story bodies to N tokens")
+    return parser.parse_args(argv)
+
+
+def run_cli(argv=None):
+    args = parse_args(argv)
+    failed_days = backfill_news(args.start_date, args.end_date, workers=args.workers,
+                                requests_per_second=args.rate, manifest_path=args.manifest, verify=args.verify,
+                                dedup_window=None if args.no_dedup else args.dedup_window,
+                                fields=tuple(args.fields), max_body_sentences=args.max_body_sentences,
+                                max_body_tokens=args.max_body_tokens, fmt=args.format)
+    if failed_days:
+        print(f"{len(failed_days)} day(s) failed: {', '.join(failed_days)}")
+    return 1 if failed_days else 0
 
 
 if __name__ == '__main__':
-    start_date = datetime.strptime("2022-05-30", "%Y-%m-%d")
-    end_date = datetime.strptime("2024-08-12", "%Y-%m-%d")
-    total_days = (end_date - start_date).days + 1  # Calculate total number of days to process
-    counter = 1
-
-    with tqdm(total=total_days, desc="Progress", unit="day", ncols=100) as pbar:
-        current_date = start_date
-        while current_date <= end_date:
-            date_str = current_date.strftime("%Y-%m-%d")
-            fetch_and_save_news_for_day(date_str, counter)
-            current_date += timedelta(days=1)
-            counter += 1
-            pbar.update(1)  # Update the progress bar
\ No newline at end of file
+    sys.exit(run_cli())
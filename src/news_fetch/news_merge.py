@@ -0,0 +1,196 @@
+# File: src/news_fetch/news_merge.py
+
+# Streaming merge of the daily news files ('{counter}_{YYYY}_{MM}_{DD}.json', or any of the
+# compressed formats of story_io.py) into one JSON Lines file, one line per day:
+# {"key": "12_2022_06_10", "stories": [...]}.
+#
+# Days are written in (counter, date) order, parsed from the file names, and only one day is held
+# in memory at a time. Next to the output, an offset index ('<output>.idx.json') records the byte
+# range of each day and the size/mtime of its source file. A later run then only appends the new
+# days, and any single day can be read back with one seek.
+
+import argparse
+import json
+import os
+import re
+import sys
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import instrumentation
+from common.settings import data_path
+from news_fetch.story_io import SUFFIX_PATTERN, read_stories
+
+NEWS_DIR = data_path('news')
+MERGED_PATH = data_path('news', 'merged_news_data.jsonl')
+
+DAY_FILE_PATTERN = re.compile(r'^(\d+)_(\d{4})_(\d{2})_(\d{2})' + SUFFIX_PATTERN + '$')
+KEY_PATTERN = re.compile(r'^\d+_\d{4}_\d{2}_\d{2}$')
+# Temporary files of an interrupted write (see story_io.write_stories), e.g. '3_2022_06_03.tmp.json'
+TMP_FILE_PATTERN = re.compile(r'\.tmp' + SUFFIX_PATTERN + '$')
+# Files the news pipeline itself writes next to the daily files
+ARTIFACT_FILES = {'manifest.json', 'merged_news_data.json', 'merged_news_data.jsonl', 'sorted_output.json'}
+
+
+def index_path(output_path):
+    return f"{output_path}.idx.json"
+
+
+# Function to list the daily news files of a directory, sorted by (counter, date). File names that
+# do not match the expected '{counter}_{YYYY}_{MM}_{DD}.json' format are returned separately;
+# leftover temporary files are ignored. When a day exists in two formats (an interrupted
+# migration), the most recently written file is used.
+def list_day_files(directory):
+    days, invalid = {}, []
+    for filename in os.listdir(directory):
+        if (not re.search(SUFFIX_PATTERN + '$', filename) or filename in ARTIFACT_FILES
+                or filename.endswith('.idx.json') or TMP_FILE_PATTERN.search(filename)):
+            continue
+        match = DAY_FILE_PATTERN.match(filename)
+        if not match:
+            invalid.append(filename)
+            continue
+        counter, year, month, day, suffix = match.groups()
+        path = os.path.join(directory, filename)
+        stat = os.stat(path)
+        key = filename[:-len(suffix)]
+        if key in days and days[key]['source'][1] >= stat.st_mtime:
+            continue
+        days[key] = {
+            'key': key,
+            'counter': int(counter),
+            'date': f"{year}-{month}-{day}",
+            'path': path,
+            'source': [stat.st_size, stat.st_mtime],
+        }
+    days = sorted(days.values(), key=lambda d: (d['counter'], d['date']))
+    return days, sorted(invalid)
+
+
+def load_index(output_path):
+    path = index_path(output_path)
+    if not os.path.exists(path) or not os.path.exists(output_path):
+        return None
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def save_index(output_path, index):
+    tmp_path = f"{index_path(output_path)}.tmp"
+    with open(tmp_path, 'w') as file:
+        json.dump(index, file)
+    os.replace(tmp_path, index_path(output_path))
+
+
+def _write_days(file, days, index):
+    for day in days:
+        stories = read_stories(day['path'])
+        line = json.dumps({'key': day['key'], 'stories': stories}, ensure_ascii=False).encode('utf-8') + b'\n'
+        offset = file.tell()
+        file.write(line)
+        index['entries'].append({'key': day['key'], 'counter': day['counter'], 'date': day['date'],
+                                 'offset': offset, 'length': len(line), 'stories': len(stories),
+                                 'source': day['source']})
+
+
+# Function to merge the daily files of `directory` into `output_path`. In incremental mode only
+# days missing from the index are appended; the file is rebuilt when a merged day changed or was
+# deleted on disk, or a new day sorts before the last merged one. Returns (number of days written,
+# invalid file names).
+@instrumentation.timed('news_merge.merge', records=lambda result: result[0])
+def merge_day_files(directory, output_path, incremental=True):
+    days, invalid = list_day_files(directory)
+    index = load_index(output_path) if incremental else None
+
+    if index is not None:
+        merged = {entry['key']: entry for entry in index['entries']}
+        changed = [d for d in days if d['key'] in merged and d['source'] != merged[d['key']]['source']]
+        removed = set(merged) - {d['key'] for d in days}
+        new_days = [d for d in days if d['key'] not in merged]
+        last = index['entries'][-1] if index['entries'] else None
+        in_order = last is None or all((d['counter'], d['date']) > (last['counter'], last['date']) for d in new_days)
+        if not changed and not removed and in_order:
+            with open(output_path, 'r+b') as file:
+                # Drop anything an interrupted run wrote after the last indexed day
+                file.truncate(last['offset'] + last['length'] if last else 0)
+                file.seek(0, os.SEEK_END)
+                start = file.tell()
+                _write_days(file, new_days, index)
+                instrumentation.count('bytes_written.news_merged', file.tell() - start)
+            save_index(output_path, index)
+            return len(new_days), invalid
+
+    index = {'entries': []}
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'wb') as file:
+        _write_days(file, days, index)
+    os.replace(tmp_path, output_path)
+    save_index(output_path, index)
+    instrumentation.record_write('news_merged', output_path)
+    return len(days), invalid
+
+
+# Function to stream (key, stories) pairs from a merged JSON Lines file
+def iter_merged(output_path):
+    with open(output_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                yield record['key'], record['stories']
+
+
+# Function to read the stories of one day with a single seek, using the offset index
+def read_day(output_path, key, index=None):
+    index = index or load_index(output_path)
+    for entry in index['entries']:
+        if entry['key'] == key:
+            with open(output_path, 'rb') as file:
+                file.seek(entry['offset'])
+                return json.loads(file.read(entry['length']))['stories']
+    raise KeyError(key)
+
+
+# Function to write the merged days as one {key: stories} JSON object (the original merged / sorted
+# layout) without holding the corpus in memory. Keys that do not match KEY_PATTERN are skipped.
+def export_json_object(output_path, json_path, indent=4, ensure_ascii=False):
+    pad = ' ' * indent if indent else ''
+    newline = '\n' if indent else ''
+    with open(json_path, 'w', encoding='utf-8') as file:
+        file.write('{')
+        first = True
+        for key, stories in iter_merged(output_path):
+            if not KEY_PATTERN.match(key):
+                continue
+            value = json.dumps(stories, indent=indent, ensure_ascii=ensure_ascii)
+            if indent:
+                value = value.replace('\n', '\n' + pad)
+            # Same separators as json.dump: ',' before a newline, ', ' on a single line
+            separator = '' if first else ',' if indent else ', '
+            file.write(separator + newline + pad + json.dumps(key, ensure_ascii=ensure_ascii) + ': ' + value)
+            first = False
+        file.write(newline + '}' if not first else '}')
+    return json_path
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Merge the daily news files into one JSON Lines file.")
+    parser.add_argument('--news-dir', default=NEWS_DIR)
+    parser.add_argument('--output', default=MERGED_PATH)
+    parser.add_argument('--full', action='store_true', help="Rebuild from scratch instead of appending new days")
+    parser.add_argument('--json', metavar='PATH', help="Also export the {key: stories} JSON object to PATH")
+    args = parser.parse_args(argv)
+
+    written, invalid = merge_day_files(args.news_dir, args.output, incremental=not args.full)
+    for filename in invalid:
+        print(f"Invalid key found: '{filename}' (skipped)")
+    print(f"{written} day file(s) merged into {args.output}")
+    if args.json:
+        export_json_object(args.output, args.json)
+        print(f"Merged data has been written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
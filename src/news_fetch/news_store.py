@@ -0,0 +1,169 @@
+# File: src/news_fetch/news_store.py
+
+# Indexed access to the news corpus written by news_fetch.py.
+#
+# A SQLite database holds one row per story with its publish date (taken from the daily file name),
+# source and categories. The date, source and category columns are B-tree indexed, so range queries
+# are O(log n + k). Story bodies stay in the daily JSON files and are only read, one day file at a
+# time, when the query results are iterated. build() is incremental: only new or changed day files
+# are (re)indexed.
+
+import argparse
+import os
+import sqlite3
+import sys
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common.settings import data_path
+from news_fetch.news_merge import list_day_files
+from news_fetch.story_io import read_stories
+
+NEWS_DIR = data_path('news')
+DB_PATH = data_path('news', 'news_index.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    counter INTEGER NOT NULL,
+    published_date TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stories (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+    story_index INTEGER NOT NULL,
+    published_date TEXT NOT NULL,
+    source_name TEXT,
+    source_domain TEXT,
+    title TEXT
+);
+CREATE TABLE IF NOT EXISTS story_categories (
+    story_id INTEGER NOT NULL REFERENCES stories(id) ON DELETE CASCADE,
+    category_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_date ON files(published_date);
+CREATE INDEX IF NOT EXISTS idx_stories_date ON stories(published_date);
+CREATE INDEX IF NOT EXISTS idx_stories_source_date ON stories(source_name, published_date);
+CREATE INDEX IF NOT EXISTS idx_stories_path ON stories(path);
+CREATE INDEX IF NOT EXISTS idx_categories ON story_categories(category_id, story_id);
+CREATE INDEX IF NOT EXISTS idx_categories_story ON story_categories(story_id);
+"""
+
+
+class NewsStore:
+    def __init__(self, db_path=DB_PATH, news_dir=NEWS_DIR):
+        self.db_path = db_path
+        self.news_dir = news_dir
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Function to (re)index the day files that are new or changed since the last build, and drop
+    # files that no longer exist. Returns the number of day files indexed.
+    def build(self):
+        days, _ = list_day_files(self.news_dir)
+        known = {path: (size, mtime) for path, size, mtime in self.connection.execute(
+            'SELECT path, size, mtime FROM files')}
+        on_disk = {day['path'] for day in days}
+        stale = [(path,) for path in known if path not in on_disk]
+        todo = [day for day in days if known.get(day['path']) != tuple(day['source'])]
+
+        with self.connection:
+            self.connection.executemany('DELETE FROM files WHERE path = ?', stale)
+            for day in todo:
+                stories = read_stories(day['path'])
+                self.connection.execute('DELETE FROM files WHERE path = ?', (day['path'],))
+                self.connection.execute(
+                    'INSERT INTO files (path, key, counter, published_date, size, mtime) VALUES (?, ?, ?, ?, ?, ?)',
+                    (day['path'], day['key'], day['counter'], day['date'], *day['source']))
+                for story_index, story in enumerate(stories):
+                    source = story.get('source', {})
+                    cursor = self.connection.execute(
+                        'INSERT INTO stories (path, story_index, published_date, source_name, source_domain, title) '
+                        'VALUES (?, ?, ?, ?, ?, ?)',
+                        (day['path'], story_index, day['date'], source.get('name'), source.get('domain'),
+                         story.get('title')))
+                    self.connection.executemany(
+                        'INSERT INTO story_categories (story_id, category_id) VALUES (?, ?)',
+                        [(cursor.lastrowid, category.get('id')) for category in story.get('categories', [])])
+        return len(todo)
+
+    # Function to list the indexed days in [start_date, end_date] as (key, date, story count)
+    def days(self, start_date='0000-00-00', end_date='9999-99-99'):
+        return self.connection.execute(
+            'SELECT f.key, f.published_date, COUNT(s.id) FROM files f LEFT JOIN stories s ON s.path = f.path '
+            'WHERE f.published_date BETWEEN ? AND ? GROUP BY f.path ORDER BY f.published_date, f.counter',
+            (start_date, end_date)).fetchall()
+
+    # Function to find stories by publish date range (inclusive), source name and category id.
+    # Yields (published_date, story) pairs lazily, reading each day file once.
+    def query(self, start_date=None, end_date=None, source=None, category=None):
+        sql = 'SELECT s.published_date, s.path, s.story_index FROM stories s'
+        where, params = [], []
+        if category is not None:
+            sql += ' JOIN story_categories c ON c.story_id = s.id'
+            where.append('c.category_id = ?')
+            params.append(category)
+        if start_date is not None:
+            where.append('s.published_date >= ?')
+            params.append(start_date)
+        if end_date is not None:
+            where.append('s.published_date <= ?')
+            params.append(end_date)
+        if source is not None:
+            where.append('s.source_name = ?')
+            params.append(source)
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY s.published_date, s.path, s.story_index'
+
+        current_path, stories = None, None
+        for published_date, path, story_index in self.connection.execute(sql, params):
+            if path != current_path:
+                stories = read_stories(path)
+                current_path = path
+            yield published_date, stories[story_index]
+
+    def stories_for_day(self, date):
+        return [story for _, story in self.query(date, date)]
+
+    # Function to list the day keys published after `after_date` (exclusive) up to `date` (inclusive),
+    # i.e. the news a planner entry for `date` should include
+    def keys_between(self, after_date, date):
+        return [key for (key,) in self.connection.execute(
+            'SELECT key FROM files WHERE published_date > ? AND published_date <= ? '
+            'ORDER BY published_date, counter', (after_date or '', date))]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the news index and query it by date range.")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--news-dir', default=NEWS_DIR)
+    parser.add_argument('--start-date')
+    parser.add_argument('--end-date')
+    parser.add_argument('--source')
+    parser.add_argument('--category')
+    args = parser.parse_args()
+
+    with NewsStore(args.db, args.news_dir) as store:
+        print(f"Indexed {store.build()} new or changed day file(s)")
+        if args.start_date or args.end_date or args.source or args.category:
+            for published_date, story in store.query(args.start_date, args.end_date, args.source, args.category):
+                print(f"{published_date}  {story.get('source', {}).get('name', '')}: {story.get('title', '')}")
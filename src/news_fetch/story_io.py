@@ -0,0 +1,185 @@
+# File: src/news_fetch/story_io.py
+
+# Reading and writing of the daily story files, plus the compact story projection.
+#
+# A day can be stored as the original indented JSON array ('.json') or as JSON Lines with one story
+# per line, plain ('.jsonl'), gzip-compressed ('.jsonl.gz') or zstd-compressed ('.jsonl.zst', needs
+# the optional `zstandard` package). read_stories() picks the format from the file name, so every
+# reader opens all of them transparently. migrate_news_dir() converts an existing news directory.
+
+import argparse
+import gzip
+import io
+import json
+import os
+import re
+import sys
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for '.jsonl.zst' files
+    zstandard = None
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import instrumentation
+from common.settings import data_path
+
+NEWS_DIR = data_path('news')
+
+# Output format name -> file suffix
+FORMATS = {
+    'json': '.json',
+    'jsonl': '.jsonl',
+    'gzip': '.jsonl.gz',
+    'zstd': '.jsonl.zst',
+}
+SUFFIX_PATTERN = r'(\.json|\.jsonl|\.jsonl\.gz|\.jsonl\.zst)'
+
+# Fields kept by filter_stories by default (the original layout) and by the compact projection
+FULL_FIELDS = ('author', 'body', 'summary', 'title', 'source.domain', 'source.home_page_url', 'source.name',
+               'categories')
+COMPACT_FIELDS = ('title', 'body', 'source.name', 'categories')
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def story_suffix(path):
+    for suffix in sorted(FORMATS.values(), key=len, reverse=True):
+        if path.endswith(suffix):
+            return suffix
+    raise ValueError(f"Not a story file: {path}")
+
+
+def day_file_name(counter, date, fmt='json'):
+    return f"{counter}_{date.replace('-', '_')}{FORMATS[fmt]}"
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise RuntimeError("Reading or writing '.jsonl.zst' files needs the 'zstandard' package (pip install zstandard)")
+
+
+# Function to open a story file as text, decompressing by suffix
+def open_text(path, mode='r'):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if path.endswith('.zst'):
+        _require_zstd()
+        if mode == 'r':
+            return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True),
+                                    encoding='utf-8')
+        return io.TextIOWrapper(zstandard.ZstdCompressor(level=10).stream_writer(open(path, 'wb'), closefd=True),
+                                encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+# Function to read the stories of one day file, whatever its format
+def read_stories(path):
+    with open_text(path) as file:
+        if story_suffix(path) == '.json':
+            return json.load(file)
+        return [json.loads(line) for line in file if line.strip()]
+
+
+# Function to write the stories of one day file in the format given by its suffix (atomically:
+# a failed write leaves the previous file, and no partial one)
+def write_stories(path, stories):
+    suffix = story_suffix(path)
+    tmp_path = f"{path[:-len(suffix)]}.tmp{suffix}"
+    try:
+        with open_text(tmp_path, 'w') as file:
+            if suffix == '.json':
+                json.dump(stories, file, indent=4)
+            else:
+                for story in stories:
+                    file.write(json.dumps(story, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    instrumentation.record_write('stories', path)
+    return path
+
+
+# Function to truncate a story body to at most `max_sentences` sentences and/or `max_tokens`
+# whitespace-separated tokens
+def truncate_body(body, max_sentences=None, max_tokens=None):
+    if max_sentences is not None:
+        sentences = SENTENCE_END.split(body.strip())
+        if len(sentences) > max_sentences:
+            body = ' '.join(sentences[:max_sentences])
+    if max_tokens is not None:
+        tokens = body.split()
+        if len(tokens) > max_tokens:
+            body = ' '.join(tokens[:max_tokens])
+    return body
+
+
+# Function to keep only the given fields of a story; dotted names select nested fields
+# ('source.name'). Fields missing from the story are skipped.
+def project_story(story, fields):
+    projected = {}
+    for field in fields:
+        head, _, rest = field.partition('.')
+        if head not in story:
+            continue
+        if rest:
+            if isinstance(story[head], dict):
+                nested = project_story(story[head], [rest])
+                projected.setdefault(head, {}).update(nested)
+        else:
+            projected[head] = story[head]
+    return projected
+
+
+# Function to convert every day file of a directory to `fmt`, optionally re-projecting and
+# truncating the stories; the manifest (if any) is pointed at the new files. Returns
+# (files converted, bytes before, bytes after).
+def migrate_news_dir(directory=NEWS_DIR, fmt='gzip', fields=None, max_sentences=None, max_tokens=None,
+                     manifest_path=None):
+    from news_fetch.manifest import FetchManifest
+    from news_fetch.news_merge import list_day_files
+
+    manifest_path = manifest_path or os.path.join(directory, 'manifest.json')
+    manifest = FetchManifest(manifest_path) if os.path.exists(manifest_path) else None
+    days, _ = list_day_files(directory)
+    converted = before = after = 0
+    for day in days:
+        stories = read_stories(day['path'])
+        if fields:
+            stories = [project_story(story, fields) for story in stories]
+        if max_sentences is not None or max_tokens is not None:
+            for story in stories:
+                if 'body' in story:
+                    story['body'] = truncate_body(story['body'], max_sentences, max_tokens)
+
+        new_path = os.path.join(directory, day['key'] + FORMATS[fmt])
+        before += os.path.getsize(day['path'])
+        write_stories(new_path, stories)
+        after += os.path.getsize(new_path)
+        if new_path != day['path']:
+            os.remove(day['path'])
+        if manifest is not None:
+            manifest.replace_file(day['date'], day['path'], new_path)
+        converted += 1
+    return converted, before, after
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert the daily news files to a compact/compressed format.")
+    parser.add_argument('--news-dir', default=NEWS_DIR)
+    parser.add_argument('--format', choices=sorted(FORMATS), default='gzip')
+    parser.add_argument('--fields', nargs='+', help=f"Fields to keep, e.g. {' '.join(COMPACT_FIELDS)}")
+    parser.add_argument('--compact', action='store_true', help="Same as --fields " + ' '.join(COMPACT_FIELDS))
+    parser.add_argument('--max-body-sentences', type=int)
+    parser.add_argument('--max-body-tokens', type=int)
+    args = parser.parse_args()
+
+    fields = COMPACT_FIELDS if args.compact else args.fields
+    converted, before, after = migrate_news_dir(args.news_dir, args.format, fields,
+                                                args.max_body_sentences, args.max_body_tokens)
+    print(f"Converted {converted} day file(s): {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
@@ -0,0 +1,76 @@
+// File: src/orchestration/batch-logs.js
+
+const fs = require("fs");
+const path = require("path");
+
+// Positions per batch; fine-tuning (when enabled) also runs at these boundaries
+const BATCH_SIZE = 30;
+
+const defaultLogsDir = path.resolve(__dirname, "../../data/logs");
+
+// Helper function to save the structured evaluations (eval.logs.json entries with every model's
+// direction and amount, and the outcome) of the positions in (fromPosition, toPosition] as
+// {batchNumber}-eval.logs.json. eval.logs.json itself keeps growing across batches.
+const saveEvaluationLogForBatch = (
+	batchNumber,
+	fromPosition,
+	toPosition,
+	logsDir = defaultLogsDir
+) => {
+	const logPath = path.join(logsDir, "eval.logs.json");
+	if (!fs.existsSync(logPath)) {
+		return 0;
+	}
+	const contents = fs.readFileSync(logPath, "utf8");
+	const entries = contents.trim() ? JSON.parse(contents) : [];
+	const batchEntries = entries.filter(
+		(entry) => entry.position > fromPosition && entry.position <= toPosition
+	);
+	const batchPath = path.join(logsDir, `${batchNumber}-eval.logs.json`);
+	fs.writeFileSync(batchPath, JSON.stringify(batchEntries, null, 2), "utf8");
+	console.log(`Saved ${batchEntries.length} evaluations to ${batchPath}`);
+	return batchEntries.length;
+};
+
+// Function to track the batches of an orchestration run. afterPosition() closes a batch every
+// BATCH_SIZE planner positions, whether or not fine-tuning runs, and finish() closes the last,
+// partial batch. The evaluations of position p are logged at p + 1. `onBatchEnd(batchNumber)` runs
+// before a full batch's evaluations are saved (fine-tuning and renaming the logs).
+const createBatchTracker = ({
+	logsDir = defaultLogsDir,
+	batchSize = BATCH_SIZE,
+	onBatchEnd = async () => {},
+} = {}) => {
+	let batchNumber = 1;
+	// Last planner position of the previous batch, and the last position processed
+	let batchStartPosition = 0;
+	let lastPosition = 0;
+
+	const closeBatch = (position) => {
+		saveEvaluationLogForBatch(
+			batchNumber,
+			batchStartPosition + 1,
+			position + 1,
+			logsDir
+		);
+		batchStartPosition = position;
+		batchNumber++;
+	};
+
+	return {
+		afterPosition: async (position) => {
+			lastPosition = position;
+			if (position % batchSize === 0) {
+				await onBatchEnd(batchNumber);
+				closeBatch(position);
+			}
+		},
+		finish: () => {
+			if (lastPosition > batchStartPosition) {
+				closeBatch(lastPosition);
+			}
+		},
+	};
+};
+
+module.exports = { BATCH_SIZE, saveEvaluationLogForBatch, createBatchTracker };
@@ -32,6 +32,7 @@ const prepareGptcData = require("../fine_tuning/gptc_prepare_data");
 const fineTuneGptc = require("../fine_tuning/gptc_fine_tune_and_monitor");
 const prepareGptdData = require("../fine_tuning/gptd_prepare_data");
 const fineTuneGptd = require("../fine_tuning/gptd_fine_tune_and_monitor");
+const { createBatchTracker } = require("./batch-logs");
 
 require("dotenv").config({ path: "../../config/.env" });
 
@@ -191,7 +192,6 @@ const fineTuneModels = async (fineTunedModels) => {
 // Orchestration function to coordinate adaptors and fine-tuning
 const orchestrateAdaptors = async () => {
 	try {
-		let batchNumber = 1;
 		let fineTunedModels = {
 			gptaModel: "ft:gpt-4o-mini-2024-07-18:personal::A61aSDs3",
 			gptbModel: "ft:gpt-4o-mini-2024-07-18:personal::A61oMQw6",
@@ -199,6 +199,16 @@ const orchestrateAdaptors = async () => {
 			gptdModel: "ft:gpt-4o-mini-2024-07-18:personal::A62ErC61",
 		};
 
+		// Fine-tuning after each batch is disabled; to enable it, uncomment the calls below
+		const batches = createBatchTracker({
+			onBatchEnd: async (batchNumber) => {
+				// console.log(`Fine-tuning after batch ${batchNumber}`);
+				// await fineTuneModels(fineTunedModels);
+				// // Rename logs after fine-tuning
+				// renameLogsForBatch(batchNumber);
+			},
+		});
+
 		// Iterate over each entry in the planner except the last one
 		for (let i = 0; i < plannerData.length - 1; i++) {
 			const { position, daily } = plannerData[i];
@@ -229,19 +239,12 @@ const orchestrateAdaptors = async () => {
 			console.log(`Evaluating GPTD results for position ${position}`);
 			await evalGptd(position, fineTunedModels.gptdModel);
 
-			// // === Step 3: Fine-Tune After Each Batch ===
-			// // Fine-tuning is triggered after every 10 positions
-			// if (position % 30 === 0) {
-			// 	console.log(
-			// 		`Fine-tuning after processing position ${position}`
-			// 	);
-			// 	await fineTuneModels(fineTunedModels);
-
-			// 	// Rename logs after fine-tuning
-			// 	renameLogsForBatch(batchNumber);
-			// 	batchNumber++;
-			// }
+			// === Step 3: Close the batch every 30 positions ===
+			// Saves the batch's structured evaluations as {batch}-eval.logs.json
+			await batches.afterPosition(position);
 		}
+		// Save the evaluations of the last, partial batch
+		batches.finish();
 	} catch (error) {
 		console.error("Error during orchestration:", error);
 	}
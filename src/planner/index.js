@@ -44,7 +44,26 @@ async function createPlanner() {
 		const planner = [];
 		let lastNewsDate = null;
 
-		const newsEntriesArray = Object.entries(newsData);
+		// Index the news keys by date once (sorted, so each trading day only advances a cursor) and
+		// the weekly/monthly keys by date, instead of scanning every entry for every trading day
+		const newsByDate = Object.keys(newsData)
+			.map((newsKey) => ({
+				key: newsKey,
+				date: formatDate(newsKey.split("_").slice(1).join("-")),
+			}))
+			.sort((a, b) => (a.date < b.date ? -1 : a.date > b.date ? 1 : 0));
+		let newsCursor = 0;
+
+		const keysByDate = (series) => {
+			const keys = new Map();
+			for (const key of Object.keys(series)) {
+				const date = key.split("_")[1];
+				if (!keys.has(date)) keys.set(date, key);
+			}
+			return keys;
+		};
+		const weeklyKeys = keysByDate(weeklySeries);
+		const monthlyKeys = keysByDate(monthlySeries);
 
 		for (const [dailyKey, dailyValue] of Object.entries(dailySeries)) {
 			console.log(`Processing daily entry: ${dailyKey}`);
@@ -54,34 +73,28 @@ async function createPlanner() {
 			const entry = { position: parseInt(position), daily: dailyKey };
 
 			// Include weekly data if it matches the daily date
-			const weeklyKey = Object.keys(weeklySeries).find(
-				(key) => key.split("_")[1] === dailyDate
-			);
+			const weeklyKey = weeklyKeys.get(dailyDate);
 			if (weeklyKey) {
 				entry.weekly = weeklyKey;
 				console.log(`Including weekly entry: ${weeklyKey}`);
 			}
 
 			// Include monthly data if it matches the daily date
-			const monthlyKey = Object.keys(monthlySeries).find(
-				(key) => key.split("_")[1] === dailyDate
-			);
+			const monthlyKey = monthlyKeys.get(dailyDate);
 			if (monthlyKey) {
 				entry.monthly = monthlyKey;
 				console.log(`Including monthly entry: ${monthlyKey}`);
 			}
 
-			// Include news data up to the current daily date
+			// Include news data after the last included news date, up to the current daily date
 			const newsEntries = [];
-			for (const [newsKey, newsValue] of newsEntriesArray) {
-				const newsDate = newsKey.split("_").slice(1).join("-");
-				const formattedNewsDate = formatDate(newsDate);
-				if (
-					(lastNewsDate === null ||
-						new Date(formattedNewsDate) > new Date(lastNewsDate)) &&
-					new Date(formattedNewsDate) <= new Date(formattedDate)
-				) {
-					newsEntries.push(newsKey);
+			while (
+				newsCursor < newsByDate.length &&
+				newsByDate[newsCursor].date <= formattedDate
+			) {
+				const news = newsByDate[newsCursor++];
+				if (lastNewsDate === null || news.date > lastNewsDate) {
+					newsEntries.push(news.key);
 				}
 			}
 			entry.news = newsEntries.join(", ");
@@ -89,10 +102,7 @@ async function createPlanner() {
 
 			// Update lastNewsDate to the latest included news date
 			if (newsEntries.length > 0) {
-				lastNewsDate = newsEntries[newsEntries.length - 1]
-					.split("_")
-					.slice(1)
-					.join("-");
+				lastNewsDate = newsByDate[newsCursor - 1].date;
 			}
 
 			planner.push(entry);
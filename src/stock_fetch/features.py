@@ -0,0 +1,262 @@
+# File: src/stock_fetch/features.py
+
+# Technical-indicator features computed over whole columnar series (see series_store.py).
+#
+# A feature is named '<kind>_<parameter>' ('return_5', 'sma_20', 'rsi_14', ...) or just '<kind>'
+# ('gap'). Every kind is one vectorized NumPy pass over the series; the recursive ones (EMA, RSI)
+# run through scipy.signal.lfilter. Returns, gaps and volatility are fractions (0.01 = 1%).
+#
+# Features are stored next to the prices as a series of their own ('daily_SPY_features.series',
+# oldest bar first), with the state of the recursive indicators in its meta.json. When new bars
+# arrive, update_features() only computes the new rows, from the last `history` bars before them
+# and that state. If the prices of the stored rows changed, everything is recomputed.
+
+import argparse
+import hashlib
+import os
+import sys
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import instrumentation
+from common.settings import data_path
+from stock_fetch import series_store
+
+DEFAULT_FEATURES = ('return_1', 'return_5', 'return_20', 'sma_20', 'sma_50', 'ema_12', 'ema_26', 'rsi_14',
+                    'volatility_20', 'gap', 'volume_z_20')
+FEATURES_SUFFIX = '_features'
+# Same directory as stock_fetch.HISTORY_DIR, without importing requests for it
+HISTORY_DIR = data_path('stock', 'history')
+
+# Feature kind -> (function, function(parameter) giving the number of earlier bars a row needs)
+FEATURE_KINDS = {}
+
+
+# Decorator to register a feature kind. The function gets the price columns (oldest first), the
+# parameter, the index of the first row to compute and the state left by the previous update
+# (None on a full computation); it returns the values of rows [start:] and its new state.
+def register_feature(kind, history):
+    def decorator(function):
+        FEATURE_KINDS[kind] = (function, history)
+        return function
+    return decorator
+
+
+# Function to split 'volume_z_20' into ('volume_z', 20); features without a parameter give None
+def parse_feature(name):
+    kind, _, parameter = name.rpartition('_')
+    if kind in FEATURE_KINDS and parameter.isdigit():
+        return kind, int(parameter)
+    if name in FEATURE_KINDS:
+        return name, None
+    raise ValueError(f"Unknown feature '{name}' (kinds: {', '.join(sorted(FEATURE_KINDS))})")
+
+
+def feature_history(names):
+    history = 0
+    for name in names:
+        kind, parameter = parse_feature(name)
+        history = max(history, FEATURE_KINDS[kind][1](parameter))
+    return history
+
+
+def _windows(values, width, start):
+    # Rolling windows ending at each row from `start` on; rows without a full window give None
+    first = max(start, width - 1)
+    if first >= len(values):
+        return first, None
+    return first, sliding_window_view(values[first - width + 1:], width)
+
+
+def _padded(values, count):
+    # Prefix NaN for the first rows, which have no value yet
+    result = np.full(count, np.nan)
+    if len(values):
+        result[count - len(values):] = values
+    return result
+
+
+@register_feature('return', history=lambda horizon: horizon)
+def _return(prices, horizon, start, state):
+    close = prices['close']
+    result = np.full(len(close) - start, np.nan)
+    first = max(start, horizon)
+    result[first - start:] = close[first:] / close[first - horizon:len(close) - horizon] - 1
+    return result, None
+
+
+@register_feature('sma', history=lambda width: width - 1)
+def _sma(prices, width, start, state):
+    first, windows = _windows(prices['close'], width, start)
+    values = windows.mean(axis=1) if windows is not None else np.empty(0)
+    return _padded(values, len(prices['close']) - start), None
+
+
+@register_feature('ema', history=lambda span: 0)
+def _ema(prices, span, start, state):
+    from scipy.signal import lfilter
+
+    close = prices['close'][start:]
+    if not len(close):
+        return np.empty(0), state
+    alpha = 2.0 / (span + 1)
+    # Seeded with the first close on a full computation (pandas' ewm(adjust=False))
+    previous = close[0] if state is None else state
+    values = lfilter([alpha], [1, alpha - 1], close, zi=[(1 - alpha) * previous])[0]
+    return values, float(values[-1])
+
+
+@register_feature('rsi', history=lambda period: period)
+def _rsi(prices, period, start, state):
+    from scipy.signal import lfilter
+
+    close = prices['close']
+    count = len(close) - start
+    result = np.full(count, np.nan)
+    changes = np.diff(close)  # changes[i] is the change into row i + 1
+    gains, losses = np.maximum(changes, 0), np.maximum(-changes, 0)
+
+    if state is None:
+        # Wilder's RSI: the first average is the mean of the first `period` changes
+        if len(close) <= period:
+            return result, None
+        first, averages = period, [gains[:period].mean(), losses[:period].mean()]
+    else:
+        first, averages = start - 1, state
+    # Rows after `first` smooth the averages: avg = (avg * (period - 1) + change) / period
+    smoothing = (period - 1) / period
+    gain, loss = (np.concatenate([[average], lfilter([1 / period], [1, -smoothing], moves[first:],
+                                                     zi=[smoothing * average])[0]])
+                  for average, moves in zip(averages, (gains, losses)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(loss > 0, 100 - 100 / (1 + gain / loss), np.where(gain > 0, 100.0, 50.0))
+    # rsi[0] is the row `first`, which an incremental update already has
+    if state is None:
+        result[first - start:] = rsi
+    else:
+        result[:] = rsi[1:]
+    return result, [float(gain[-1]), float(loss[-1])]
+
+
+@register_feature('volatility', history=lambda width: width)
+def _volatility(prices, width, start, state):
+    close = prices['close']
+    returns = np.concatenate([[np.nan], close[1:] / close[:-1] - 1])
+    first, windows = _windows(returns, width, start)
+    values = windows.std(axis=1, ddof=1) if windows is not None else np.empty(0)
+    return _padded(values, len(close) - start), None
+
+
+@register_feature('gap', history=lambda _: 1)
+def _gap(prices, _, start, state):
+    close, open_ = prices['close'], prices['open']
+    result = np.full(len(close) - start, np.nan)
+    first = max(start, 1)
+    result[first - start:] = open_[first:] / close[first - 1:-1] - 1
+    return result, None
+
+
+@register_feature('volume_z', history=lambda width: width - 1)
+def _volume_z(prices, width, start, state):
+    volume = prices['volume']
+    first, windows = _windows(volume, width, start)
+    if windows is None:
+        return np.full(len(volume) - start, np.nan), None
+    std = windows.std(axis=1, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.where(std > 0, (volume[first:] - windows.mean(axis=1)) / std, 0.0)
+    return _padded(values, len(volume) - start), None
+
+
+# Function to compute the features of rows [start:] of a series sorted oldest first. `state` is the
+# state returned by the previous call (None for a full computation); returns (columns, new state).
+def compute_features(series, features=DEFAULT_FEATURES, start=0, state=None):
+    columns, new_state = {'date': np.asarray(series['date'][start:], dtype=np.int64)}, {}
+    prices = {column: np.asarray(series[column], dtype=np.float64) for column in ('open', 'close', 'volume')}
+    for name in features:
+        kind, parameter = parse_feature(name)
+        function = FEATURE_KINDS[kind][0]
+        columns[name], new_state[name] = function(prices, parameter, start, (state or {}).get(name))
+    return columns, new_state
+
+
+# Function to fingerprint the price columns the features are computed from, over the first `rows` rows
+def prices_digest(prices, rows):
+    digest = hashlib.sha256()
+    for column in ('date', 'open', 'close', 'volume'):
+        digest.update(np.ascontiguousarray(prices[column][:rows]).tobytes())
+    return digest.hexdigest()
+
+
+def features_path(path):
+    root = series_store.series_path(path)[:-len(series_store.SERIES_SUFFIX)]
+    return series_store.series_path(root + FEATURES_SUFFIX)
+
+
+# Function to read the stored features of a price series; None when there are none yet
+def load_features(path, mmap=True):
+    stored = features_path(path)
+    if not os.path.exists(os.path.join(stored, 'meta.json')):
+        return None, None
+    return series_store.read_series(stored, mmap)
+
+
+# Function to bring the features stored next to a price series up to date. Only bars newer than the
+# last stored one are computed, unless `full`, the feature list changed, or the stored rows no longer
+# match the prices. Returns (features, number of rows computed).
+@instrumentation.timed('stock_fetch.features', records=lambda result: result[1])
+def update_features(path, features=DEFAULT_FEATURES, key=series_store.DAILY_KEY, full=False):
+    features = list(features)
+    prices = series_store.sort_by_date(series_store.load_series(path, key, mmap=False))
+    stored, info = (None, None) if full else load_features(path, mmap=False)
+    history = feature_history(features)
+
+    start = 0
+    if stored is not None:
+        meta = info['meta']
+        rows = len(stored['date'])
+        # Bars before the stored ones corrected or added since: recompute everything
+        if (meta.get('features') == features and history < rows <= len(prices['date'])
+                and meta.get('prices') == prices_digest(prices, rows)):
+            start = rows
+    if stored is not None and start == len(prices['date']):
+        return stored, 0
+
+    # Rows before `start` only provide history; the stored rows stay as they are
+    offset = max(0, start - history)
+    window = {column: values[offset:] for column, values in prices.items()}
+    state = info['meta'].get('state') if start else None
+    computed, state = compute_features(window, features, start - offset, state)
+    if start:
+        computed = {column: np.concatenate([stored[column], computed[column]]) for column in computed}
+
+    meta = {'features': features, 'state': state, 'prices': prices_digest(prices, len(prices['date']))}
+    series_store.write_series(features_path(path), computed, key, meta)
+    instrumentation.record_write('stock_features', features_path(path))
+    return computed, len(prices['date']) - start
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Compute technical-indicator features for stored daily series.")
+    parser.add_argument('--symbols', nargs='+', default=['SPY'], help="Symbols whose stored history to use")
+    parser.add_argument('--path', nargs='+', default=[], help="Price series (JSON or .series) to use instead")
+    parser.add_argument('--feature', action='append', help=f"Feature to compute (repeatable; default: "
+                                                           f"{' '.join(DEFAULT_FEATURES)})")
+    parser.add_argument('--full', action='store_true', help="Recompute every row")
+    args = parser.parse_args(argv)
+
+    paths = args.path or [os.path.join(HISTORY_DIR, f'daily_{symbol}.series') for symbol in args.symbols]
+    features = args.feature or DEFAULT_FEATURES
+    for path in paths:
+        computed, rows = update_features(path, features, full=args.full)
+        print(f"{features_path(path)}: {rows} new row(s) of {len(features)} feature(s), {len(computed['date'])} in total")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
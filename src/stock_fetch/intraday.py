@@ -0,0 +1,188 @@
+# File: src/stock_fetch/intraday.py
+
+# Intraday bars stored in monthly partitions.
+#
+# Alpha Vantage returns one month of intraday history per TIME_SERIES_INTRADAY request (the 'month'
+# parameter), so the history of a symbol is fetched month by month and each month is written as its
+# own columnar series (see series_store.py), oldest bar first:
+#
+#     data/stock/intraday/SPY/1min/2022-06.series/
+#
+# A partition fetched after its month ended is complete and is never fetched again; the current
+# month (or one fetched before it ended) stays open and is refetched on the next run. Months are
+# fetched by a bounded thread pool under the shared Alpha Vantage quota. Readers memory-map only the
+# partitions a date range touches and slice them by date without reading the rest.
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import numpy as np
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import instrumentation
+from common.rate_limit import RateLimiter
+from common.settings import data_path
+from stock_fetch import series_store
+
+INTRADAY_DIR = data_path('stock', 'intraday')
+INTERVALS = ('1min', '5min', '15min', '30min', '60min')
+DEFAULT_INTERVAL = '1min'
+# A month counts as complete once it was fetched this long after it ended (late corrections and
+# the time zone of the exchange)
+COMPLETE_AFTER = timedelta(days=1)
+
+
+def intraday_key(interval):
+    return f"Time Series ({interval})"
+
+
+def partition_path(symbol, month, interval=DEFAULT_INTERVAL, root=INTRADAY_DIR):
+    return os.path.join(root, symbol, interval, f"{month}{series_store.SERIES_SUFFIX}")
+
+
+# Function to list the months ('YYYY-MM') touched by the date range [start_date, end_date)
+def month_range(start_date, end_date):
+    start = np.datetime64(start_date, 'M')
+    end = (np.datetime64(end_date, 'D') - np.timedelta64(1, 'D')).astype('datetime64[M]')
+    return [str(month) for month in np.arange(start, end + 1)]
+
+
+def month_end(month):
+    return datetime.strptime(str(np.datetime64(month, 'M') + 1), '%Y-%m')
+
+
+# Function to read the meta of a stored partition; None when it does not exist
+def partition_meta(path):
+    try:
+        with open(os.path.join(path, 'meta.json'), 'r') as file:
+            return json.load(file)['meta']
+    except FileNotFoundError:
+        return None
+
+
+# Function to pick the months of a range that must be fetched: missing or still open partitions,
+# or all of them with `refresh`
+def months_to_fetch(symbol, months, interval=DEFAULT_INTERVAL, root=INTRADAY_DIR, refresh=False):
+    if refresh:
+        return list(months)
+    todo = []
+    for month in months:
+        meta = partition_meta(partition_path(symbol, month, interval, root))
+        if meta is None or not meta.get('complete'):
+            todo.append(month)
+    return todo
+
+
+# Function to fetch one month of intraday bars and write it as a partition; returns the bar count
+@instrumentation.timed('stock_fetch.intraday_month', records=lambda rows: rows)
+def fetch_month(symbol, month, interval=DEFAULT_INTERVAL, root=INTRADAY_DIR, limiter=None):
+    from stock_fetch.stock_fetch import fetch_data
+
+    if limiter is not None:
+        limiter.acquire()
+    fetched = datetime.now()
+    data = fetch_data('TIME_SERIES_INTRADAY', symbol, outputsize='full', interval=interval, month=month)
+    series = series_store.sort_by_date(series_store.from_alpha_vantage(data, intraday_key(interval)))
+    # Bars outside the month (none expected) would end up in two partitions
+    start, end = series_store.parse_dates([f"{month}-01", month_end(month).strftime('%Y-%m-%d')])
+    series = series_store.take(series, (series['date'] >= start) & (series['date'] < end))
+
+    meta = {'symbol': symbol, 'interval': interval, 'month': month,
+            'fetched': fetched.isoformat(timespec='seconds'),
+            'complete': fetched >= month_end(month) + COMPLETE_AFTER}
+    path = series_store.write_series(partition_path(symbol, month, interval, root), series,
+                                     intraday_key(interval), meta)
+    instrumentation.record_write('stock_intraday', path)
+    return len(series['date'])
+
+
+# Function to bring the partitions of several symbols over [start_date, end_date) up to date with
+# at most `workers` requests in flight. Returns (partitions fetched, {(symbol, month): error}).
+def ingest(symbols, start_date, end_date, interval=DEFAULT_INTERVAL, workers=4, requests_per_minute=None,
+           root=INTRADAY_DIR, refresh=False):
+    from stock_fetch.stock_fetch import requests_per_minute_setting
+
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown interval '{interval}' (intervals: {', '.join(INTERVALS)})")
+    if requests_per_minute is None:
+        requests_per_minute = requests_per_minute_setting()
+    limiter = RateLimiter(requests_per_minute / 60.0)
+    months = month_range(start_date, end_date)
+    tasks = [(symbol, month) for symbol in symbols
+             for month in months_to_fetch(symbol, months, interval, root, refresh)]
+    skipped = len(symbols) * len(months) - len(tasks)
+    if skipped:
+        instrumentation.count('stock_fetch.intraday_months_skipped', skipped)
+        print(f"Skipping {skipped} complete partition(s)")
+
+    fetched, failed = 0, {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch_month, symbol, month, interval, root, limiter): (symbol, month)
+                   for symbol, month in tasks}
+        for future in as_completed(futures):
+            symbol, month = futures[future]
+            try:
+                rows = future.result()
+                fetched += 1
+                print(f"{symbol} {month}: {rows} {interval} bar(s)")
+            except Exception as e:
+                print(f"{symbol} {month}: {e}")
+                failed[(symbol, month)] = str(e)
+    return fetched, failed
+
+
+# Function to yield the stored bars of [start_date, end_date) one partition at a time, as
+# memory-mapped slices; partitions that were never fetched are skipped
+def iter_intraday(symbol, start_date, end_date, interval=DEFAULT_INTERVAL, root=INTRADAY_DIR, mmap=True):
+    start, end = series_store.parse_dates([start_date, end_date])
+    for month in month_range(start_date, end_date):
+        path = partition_path(symbol, month, interval, root)
+        if partition_meta(path) is None:
+            continue
+        series, _ = series_store.read_series(path, mmap)
+        # Partitions are sorted by date, so the range is one contiguous slice
+        first, last = np.searchsorted(series['date'], [start, end])
+        if last > first:
+            yield {column: values[first:last] for column, values in series.items()}
+
+
+# Function to load the stored bars of [start_date, end_date) as one series (oldest bar first)
+def load_intraday(symbol, start_date, end_date, interval=DEFAULT_INTERVAL, root=INTRADAY_DIR):
+    parts = list(iter_intraday(symbol, start_date, end_date, interval, root))
+    if not parts:
+        return {'date': np.empty(0, dtype=np.int64),
+                **{column: np.empty(0, dtype=np.float64) for column in series_store.PRICE_COLUMNS}}
+    return {column: np.concatenate([part[column] for part in parts]) for column in parts[0]}
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch intraday bars month by month into monthly partitions.")
+    parser.add_argument('--symbols', nargs='+', default=['SPY'])
+    parser.add_argument('--start-date', default='2022-02-01')
+    parser.add_argument('--end-date', default='2022-06-10')
+    parser.add_argument('--interval', choices=INTERVALS, default=DEFAULT_INTERVAL)
+    parser.add_argument('--workers', type=int, default=4, help="Months fetched at the same time")
+    parser.add_argument('--rpm', type=float, default=None,
+                        help="Alpha Vantage requests per minute (default: ALPHA_VANTAGE_RPM or 5)")
+    parser.add_argument('--refresh', action='store_true', help="Refetch complete partitions too")
+    parser.add_argument('--root', default=INTRADAY_DIR)
+    args = parser.parse_args(argv)
+
+    fetched, failed = ingest(args.symbols, args.start_date, args.end_date, args.interval, args.workers,
+                             args.rpm, args.root, args.refresh)
+    print(f"Fetched {fetched} partition(s)")
+    if failed:
+        print(f"Intraday fetching failed for: {', '.join(f'{symbol} {month}' for symbol, month in sorted(failed))}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
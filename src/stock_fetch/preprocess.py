@@ -0,0 +1,101 @@
+# File: src/stock_fetch/preprocess.py
+
+# Single-pass preprocessing of the daily stock series.
+#
+# Each stage takes a columnar series (see series_store.py) and returns one, so stages can be
+# composed freely. run_pipeline applies them in memory. preprocess_daily replaces the chain
+# stock_organise_series.py -> stock_direction_analysis.py -> stock_expand_data.py with one read of
+# the inputs and one write of merged_daily_SPY.
+
+import argparse
+import os
+import sys
+from functools import partial
+
+import numpy as np
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import instrumentation
+from common.settings import data_path
+from stock_fetch import series_store
+
+DATA_TIME_SERIES = series_store.DAILY_KEY
+PATH_SOURCE = data_path('stock', 'daily_SPY.json')
+PATH_MERGE = data_path('stock', '_daily_SPY.json')
+PATH_OUTPUT = data_path('stock', 'merged_daily_SPY.json')
+
+
+# Stage: number the rows in their stored order (start, start + step, ...)
+def index_positions(series, start=1, step=1):
+    series = dict(series)
+    series['position'] = start + step * np.arange(len(series['date']), dtype=np.int64)
+    return series
+
+
+# Stage: open -> close direction and percentage change (rounded to two decimals, negative on a fall)
+def derive_direction(series):
+    series = dict(series)
+    open_price = np.asarray(series['open'])
+    close_price = np.asarray(series['close'])
+    rise = close_price > open_price
+    # Python's round() as in the old stock_direction_analysis.py: np.round scales by 100 first and
+    # can land on the other side of a tie (40.00 -> 42.89 is 7.23 here, 7.22 with np.round)
+    change = (close_price - open_price) / open_price * 100
+    amount = np.array([round(value, 2) for value in change.tolist()], dtype=np.float64)
+    series['direction'] = np.where(rise, series_store.RISE, series_store.FALL).astype(np.int8)
+    series['amount'] = np.where(rise, amount, -np.abs(amount))
+    return series
+
+
+# Stage: merge another series in; its rows win on identical '<position>_<date>' keys
+def merge_with(series, other):
+    return series_store.merge_by_key(series, other)
+
+
+# Stage: stable sort by position, so rows sharing a position keep their order
+def sort_by_position(series):
+    order = np.argsort(series['position'], kind='stable')
+    return series_store.take(series, order)
+
+
+def run_pipeline(series, stages):
+    for stage in stages:
+        series = stage(series)
+    return series
+
+
+# Function to build merged_daily_SPY in one pass: derive direction/amount for the source series,
+# index it 0, -1, -2, ..., merge in the already-positioned series and sort by position
+@instrumentation.timed('preprocess.daily', records=lambda result: len(result['date']))
+def preprocess_daily(source_path=PATH_SOURCE, merge_path=PATH_MERGE, output_path=PATH_OUTPUT, json_export=True):
+    series = series_store.load_series(source_path, DATA_TIME_SERIES)
+    stages = [derive_direction, partial(index_positions, start=0, step=-1)]
+    if merge_path:
+        stages.append(partial(merge_with, other=series_store.load_series(merge_path, DATA_TIME_SERIES)))
+    stages.append(sort_by_position)
+
+    result = run_pipeline(series, stages)
+    series_store.save_series(output_path, result, DATA_TIME_SERIES, json_export=json_export)
+    instrumentation.record_write('stock_series', series_store.series_path(output_path))
+    if json_export:
+        instrumentation.record_write('stock_json', output_path)
+    return result
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Preprocess the daily stock series in a single pass.")
+    parser.add_argument('--source', default=PATH_SOURCE)
+    parser.add_argument('--merge', default=PATH_MERGE, help="Positioned series to merge in ('' to skip)")
+    parser.add_argument('--output', default=PATH_OUTPUT)
+    parser.add_argument('--no-json', action='store_true', help="Only write the columnar series")
+    args = parser.parse_args(argv)
+    merged = preprocess_daily(args.source, args.merge, args.output, json_export=not args.no_json)
+    print(f"Preprocessed {len(merged['date'])} rows into {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
@@ -0,0 +1,243 @@
+# File: src/stock_fetch/resample.py
+
+# Weekly, monthly and other higher-timeframe OHLCV bars built from the stored daily bars.
+#
+# A period is '<N><unit>': 'W' (calendar weeks starting on Monday), 'M' (calendar months) or 'B'
+# (N daily bars, counted from the first stored bar); 'weekly', 'monthly', 'quarterly' and 'yearly'
+# stand for 1W, 1M, 3M and 12M. Every daily bar gets a period id, and the bars of each period are
+# aggregated in one vectorized pass (np.*.reduceat over the period boundaries): first open, highest
+# high, lowest low, last close, summed volume. Like Alpha Vantage's weekly and monthly series, each
+# period is dated by its last trading day, so the current (open) period is dated by the latest bar.
+#
+# The aggregates are stored next to the daily history ('weekly_SPY.series'). update_resampled()
+# only recomputes the last stored period, which may still be open, and the periods after it; if
+# the daily bars of the closed periods changed, everything is recomputed. export_resampled() writes
+# the Alpha Vantage shape ('Weekly Time Series', ...) to data/stock for the planner, with the
+# position prefix on the keys ('1_2022-06-10') that the planner reads the dates from.
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+from datetime import datetime
+
+import numpy as np
+
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import instrumentation
+from common.settings import data_path
+from stock_fetch import series_store
+
+STOCK_DIR = data_path('stock')
+# Same directory as stock_fetch.HISTORY_DIR, without importing requests for it
+HISTORY_DIR = data_path('stock', 'history')
+DEFAULT_PERIODS = ('weekly', 'monthly')
+PERIOD_ALIASES = {'weekly': '1W', 'monthly': '1M', 'quarterly': '3M', 'yearly': '12M'}
+# Alpha Vantage's keys for the periods it serves itself
+PERIOD_KEYS = {'1W': 'Weekly Time Series', '1M': 'Monthly Time Series'}
+PERIOD_PATTERN = re.compile(r'^(\d+)([A-Z])$')
+# 1970-01-01 was a Thursday; shifting by 3 days makes day // 7 change on Mondays
+MONDAY_OFFSET_DAYS = 3
+
+# Period unit -> function(dates as int64 epoch seconds, count) giving each bar's period id
+PERIOD_UNITS = {}
+
+
+# Decorator to register a period unit
+def register_period(unit):
+    def decorator(function):
+        PERIOD_UNITS[unit] = function
+        return function
+    return decorator
+
+
+@register_period('W')
+def _weeks(dates, count):
+    return (dates // 86400 + MONDAY_OFFSET_DAYS) // 7 // count
+
+
+@register_period('M')
+def _months(dates, count):
+    return dates.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64) // count
+
+
+@register_period('B')
+def _bars(dates, count):
+    return np.arange(len(dates), dtype=np.int64) // count
+
+
+# Function to read 'weekly' or '2W' as ('2W', 2, 'W')
+def parse_period(period):
+    spec = PERIOD_ALIASES.get(period.lower(), period.upper())
+    match = PERIOD_PATTERN.match(spec)
+    if match is None or match.group(2) not in PERIOD_UNITS or int(match.group(1)) < 1:
+        raise ValueError(f"Unknown period '{period}' (use {', '.join(PERIOD_ALIASES)} or <N><unit> "
+                         f"with unit {'/'.join(PERIOD_UNITS)})")
+    return spec, int(match.group(1)), match.group(2)
+
+
+def period_ids(dates, period):
+    _, count, unit = parse_period(period)
+    return PERIOD_UNITS[unit](np.asarray(dates, dtype=np.int64), count)
+
+
+def period_key(period):
+    spec = parse_period(period)[0]
+    return PERIOD_KEYS.get(spec, f"Time Series ({spec})")
+
+
+# Function to name a period after its alias: 'weekly' for 1W, '2w' for 2W
+def period_name(period):
+    spec = parse_period(period)[0]
+    names = {alias_spec: alias for alias, alias_spec in PERIOD_ALIASES.items()}
+    return names.get(spec, spec.lower())
+
+
+# Function to name the stored aggregates of a symbol: weekly_SPY, monthly_SPY, 2w_SPY, ...
+def resampled_name(symbol, period):
+    return f"{period_name(period)}_{symbol}"
+
+
+# Function to find the first row of each period in ids sorted ascending
+def period_starts(ids):
+    if not len(ids):
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate([[0], np.flatnonzero(np.diff(ids)) + 1]).astype(np.int64)
+
+
+# Function to aggregate a daily series sorted oldest first into one bar per period
+def aggregate(series, ids):
+    starts = period_starts(ids)
+    if not len(starts):
+        return {column: np.asarray(series[column])[:0] for column in ('date',) + series_store.PRICE_COLUMNS}
+    ends = np.concatenate([starts[1:], [len(ids)]])
+    return {'date': np.asarray(series['date'])[ends - 1],
+            'open': np.asarray(series['open'])[starts],
+            'high': np.maximum.reduceat(np.asarray(series['high']), starts),
+            'low': np.minimum.reduceat(np.asarray(series['low']), starts),
+            'close': np.asarray(series['close'])[ends - 1],
+            'volume': np.add.reduceat(np.asarray(series['volume']), starts)}
+
+
+# Function to resample a daily series (any order) into `period` bars, oldest first
+def resample(series, period):
+    series = series_store.sort_by_date(series)
+    return aggregate(series, period_ids(series['date'], period))
+
+
+# Function to fingerprint the first `rows` daily bars the closed periods were built from
+def bars_digest(series, rows):
+    digest = hashlib.sha256()
+    for column in ('date',) + series_store.PRICE_COLUMNS:
+        digest.update(np.ascontiguousarray(series[column][:rows]).tobytes())
+    return digest.hexdigest()
+
+
+def resampled_path(daily_path, period, symbol):
+    directory = os.path.dirname(series_store.series_path(daily_path))
+    return series_store.series_path(os.path.join(directory, resampled_name(symbol, period)))
+
+
+# Function to bring the stored `period` bars of a daily history up to date. The stored meta keeps
+# the number of daily bars in the closed periods and their digest; when they still match, only the
+# bars from the last stored period on are aggregated again. Returns (bars, number of bars rebuilt).
+@instrumentation.timed('stock_fetch.resample', records=lambda result: result[1])
+def update_resampled(daily_path, period, symbol='SPY', full=False):
+    spec = parse_period(period)[0]
+    daily = series_store.sort_by_date(series_store.load_series(daily_path, mmap=False))
+    daily = {column: daily[column] for column in ('date',) + series_store.PRICE_COLUMNS}
+    path = resampled_path(daily_path, spec, symbol)
+    stored, info = None, None
+    if not full and os.path.exists(os.path.join(path, 'meta.json')):
+        stored, info = series_store.read_series(path, mmap=False)
+
+    start, kept = 0, 0
+    if stored is not None and len(stored['date']):
+        meta = info['meta']
+        closed = meta.get('closed_rows', 0)
+        # Bar-count periods are anchored on the first bar, so they stay aligned while it does
+        if (meta.get('period') == spec and closed < len(daily['date'])
+                and meta.get('digest') == bars_digest(daily, closed)):
+            start, kept = closed, len(stored['date']) - 1
+
+    ids = period_ids(daily['date'], spec)
+    rebuilt = aggregate({column: values[start:] for column, values in daily.items()}, ids[start:])
+    if kept:
+        rebuilt = {column: np.concatenate([stored[column][:kept], rebuilt[column]]) for column in rebuilt}
+    # The last period may still be open: the next update starts again from its first bar
+    closed = start + int(period_starts(ids[start:])[-1]) if len(ids) > start else start
+
+    meta = {'period': spec, 'symbol': symbol, 'closed_rows': closed, 'digest': bars_digest(daily, closed)}
+    series_store.write_series(path, rebuilt, period_key(spec), meta)
+    instrumentation.record_write('stock_resampled', path)
+    return rebuilt, len(rebuilt['date']) - kept
+
+
+# Function to write stored bars in the Alpha Vantage JSON shape, newest first, optionally limited
+# to bars dated in [start_date, end_date). With `positions`, keys carry the row number ('1_<date>').
+def export_resampled(bars, output_path, period, symbol='SPY', start_date=None, end_date=None, positions=True):
+    spec = parse_period(period)[0]
+    if start_date or end_date:
+        # Dates as typed on the command line ('2022-02-1') are normalised like fetch_and_save_daily does
+        start_date, end_date = (datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d')
+                                for date in (start_date or '1900-01-01', end_date or '9999-12-31'))
+        bars = series_store.select_dates(bars, start_date, end_date)
+    bars = series_store.sort_by_date(bars, descending=True)
+    if positions:
+        bars = dict(bars, position=np.arange(1, len(bars['date']) + 1, dtype=np.int64))
+    last = series_store.format_dates(bars['date'][:1])
+    meta = {'1. Information': f"{period_name(spec).capitalize()} Prices (resampled from daily bars)",
+            '2. Symbol': symbol, '3. Last Refreshed': last[0] if last else None}
+    series_store.export_json(bars, output_path, period_key(spec), meta)
+    instrumentation.record_write('stock_json', output_path)
+    return output_path
+
+
+# Function to update and export every period of a symbol's daily history
+def resample_symbol(daily_path, symbol='SPY', periods=DEFAULT_PERIODS, start_date=None, end_date=None,
+                    output_dir=STOCK_DIR, full=False, positions=True):
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = {}
+    for period in periods:
+        bars, rebuilt = update_resampled(daily_path, period, symbol, full)
+        output_path = os.path.join(output_dir, f"{resampled_name(symbol, period)}.json")
+        export_resampled(bars, output_path, period, symbol, start_date, end_date, positions)
+        outputs[period] = output_path
+        print(f"{symbol}: {rebuilt} {period} bar(s) rebuilt, {len(bars['date'])} in total -> {output_path}")
+    return outputs
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Build weekly, monthly or other period bars from the stored "
+                                                 "daily bars, in the Alpha Vantage JSON shape.")
+    parser.add_argument('--symbols', nargs='+', default=['SPY'], help="Symbols whose stored history to use")
+    parser.add_argument('--path', help="Daily series (JSON or .series) to use instead (one symbol)")
+    parser.add_argument('--period', action='append',
+                        help=f"weekly, monthly, quarterly, yearly or <N>W/<N>M/<N>B (repeatable; default: "
+                             f"{' '.join(DEFAULT_PERIODS)})")
+    parser.add_argument('--start-date', help="Only export bars dated from this day on")
+    parser.add_argument('--end-date', help="Only export bars dated before this day")
+    parser.add_argument('--output-dir', default=STOCK_DIR)
+    parser.add_argument('--full', action='store_true', help="Rebuild every period")
+    parser.add_argument('--no-positions', action='store_true', help="Plain date keys instead of '<position>_<date>'")
+    args = parser.parse_args(argv)
+
+    periods = args.period or DEFAULT_PERIODS
+    for period in periods:
+        try:
+            parse_period(period)
+        except ValueError as e:
+            parser.error(str(e))
+    for symbol in args.symbols:
+        daily_path = args.path or os.path.join(HISTORY_DIR, f'daily_{symbol}.series')
+        resample_symbol(daily_path, symbol, periods, args.start_date, args.end_date, args.output_dir,
+                        args.full, not args.no_positions)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
@@ -0,0 +1,239 @@
+# File: src/stock_fetch/series_store.py
+
+# Typed columnar storage for stock time series.
+#
+# A series is a dict of equal-length NumPy arrays. 'date' holds int64 seconds since the epoch and
+# the OHLCV columns hold float64. The preprocessing steps add optional columns: 'position' (int64),
+# 'direction' (int8, +1 rise / -1 fall) and 'amount' (float64, percent change).
+# On disk a series is a directory ('<name>.series') with one .npy file per column and a small
+# meta.json. Readers memory-map the columns, so opening a long history costs almost nothing.
+# to_alpha_vantage / export_json rebuild the original 'Time Series (...)' JSON shape
+# for the Node.js planner and adaptors.
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+AV_FIELDS = {'open': '1. open', 'high': '2. high', 'low': '3. low', 'close': '4. close', 'volume': '5. volume'}
+DIRECTION_FIELD = '6. direction'
+AMOUNT_FIELD = '7. amount'
+RISE, FALL = 1, -1
+DIRECTIONS = {'rise': RISE, 'fall': FALL}
+# Fill values for optional columns when series with different columns are combined
+COLUMN_DEFAULTS = {'position': 0, 'direction': 0, 'amount': np.nan}
+
+SERIES_SUFFIX = '.series'
+DAILY_KEY = 'Time Series (Daily)'
+
+
+# Function to map a JSON path (or bare name) to the columnar directory stored next to it
+def series_path(path):
+    if path.endswith(SERIES_SUFFIX):
+        return path
+    root, ext = os.path.splitext(path)
+    return (root if ext == '.json' else path) + SERIES_SUFFIX
+
+
+# Function to parse ISO date strings into int64 epoch seconds in one vectorized call
+def parse_dates(date_strings):
+    return np.array(date_strings, dtype='datetime64[s]').astype(np.int64)
+
+
+# Function to format int64 epoch seconds back into Alpha Vantage date strings
+def format_dates(dates, intraday=False):
+    stamps = np.asarray(dates, dtype=np.int64).astype('datetime64[s]')
+    if not intraday:
+        return np.datetime_as_string(stamps.astype('datetime64[D]')).tolist()
+    return [text.replace('T', ' ') for text in np.datetime_as_string(stamps).tolist()]
+
+
+def is_intraday(series):
+    return bool(len(series['date']) and np.any(series['date'] % 86400))
+
+
+# Function to convert an Alpha Vantage style response into a columnar series. Row order follows
+# the JSON order, and keys that carry a position prefix ('12_2022-02-01') fill the 'position' column.
+def from_alpha_vantage(data, key=DAILY_KEY):
+    if key not in data:
+        raise ValueError(f"Key '{key}' not found in data")
+    rows = data[key]
+    keys = list(rows)
+    values = list(rows.values())
+    count = len(keys)
+
+    series = {}
+    if keys and '_' in keys[0]:
+        prefixes, dates = zip(*(k.split('_', 1) for k in keys))
+        series['position'] = np.array(prefixes, dtype=np.int64)
+    else:
+        dates = keys
+    series['date'] = parse_dates(list(dates)) if count else np.empty(0, dtype=np.int64)
+    for column in PRICE_COLUMNS:
+        field = AV_FIELDS[column]
+        series[column] = np.fromiter((float(v[field]) for v in values), dtype=np.float64, count=count)
+    if any(DIRECTION_FIELD in v for v in values):
+        # Rows without a direction get 0 / NaN and are exported without the two fields
+        series['direction'] = np.fromiter(
+            (DIRECTIONS.get(v.get(DIRECTION_FIELD), 0) for v in values), dtype=np.int8, count=count)
+        series['amount'] = np.fromiter(
+            (float(v[AMOUNT_FIELD].rstrip('%')) if AMOUNT_FIELD in v else np.nan for v in values),
+            dtype=np.float64, count=count)
+    return series
+
+
+# Function to rebuild the Alpha Vantage JSON shape ({key: {date: {"1. open": "..."}}}) from a series
+def to_alpha_vantage(series, key=DAILY_KEY, meta=None):
+    dates = format_dates(series['date'], intraday=is_intraday(series))
+    if 'position' in series:
+        keys = [f"{position}_{date}" for position, date in zip(series['position'].tolist(), dates)]
+    else:
+        keys = dates
+
+    columns = {column: series[column].tolist() for column in PRICE_COLUMNS}
+    directions = series['direction'].tolist() if 'direction' in series else None
+    amounts = series['amount'].tolist() if 'amount' in series else None
+
+    rows = {}
+    for i, row_key in enumerate(keys):
+        row = {AV_FIELDS[column]: f"{columns[column][i]:.4f}" for column in PRICE_COLUMNS[:4]}
+        row[AV_FIELDS['volume']] = f"{int(columns['volume'][i])}"
+        if directions is not None and directions[i]:
+            row[DIRECTION_FIELD] = 'rise' if directions[i] == RISE else 'fall'
+            row[AMOUNT_FIELD] = f"{amounts[i]}%"
+        rows[row_key] = row
+
+    data = {}
+    if meta:
+        data['Meta Data'] = meta
+    data[key] = rows
+    return data
+
+
+# Function to select the rows whose date falls in [start_date, end_date)
+def select_dates(series, start_date, end_date):
+    start, end = parse_dates([start_date, end_date])
+    mask = (series['date'] >= start) & (series['date'] < end)
+    return {column: values[mask] for column, values in series.items()}
+
+
+def take(series, index):
+    return {column: values[index] for column, values in series.items()}
+
+
+# Function to sort a series by date (stable, so rows on the same date keep their order)
+def sort_by_date(series, descending=False):
+    order = np.argsort(series['date'], kind='stable')
+    if descending:
+        order = order[::-1]
+    return take(series, order)
+
+
+# Function to merge two series by date; rows from `new` replace rows of `old` on the same date
+def merge_by_date(old, new, descending=True):
+    if not len(old['date']):
+        return sort_by_date(new, descending)
+    keep = ~np.isin(old['date'], new['date'])
+    columns = [column for column in old if column in new]
+    merged = {column: np.concatenate([old[column][keep], new[column]]) for column in columns}
+    return sort_by_date(merged, descending)
+
+
+def _column_or_default(series, column, dtype):
+    if column in series:
+        return np.asarray(series[column])
+    return np.full(len(series['date']), COLUMN_DEFAULTS.get(column, np.nan), dtype=dtype)
+
+
+# Function to combine two series the way {**first, **second} combines the JSON dicts keyed
+# '<position>_<date>': rows of `second` replace rows of `first` with the same key in place, the
+# remaining rows of `second` are appended, and missing optional columns are filled with defaults
+def merge_by_key(first, second):
+    columns = list(first) + [column for column in second if column not in first]
+    dtypes = {column: first[column].dtype if column in first else second[column].dtype for column in columns}
+    first_keys = list(zip(_column_or_default(first, 'position', np.int64).tolist(), first['date'].tolist()))
+    second_keys = list(zip(_column_or_default(second, 'position', np.int64).tolist(), second['date'].tolist()))
+    slots = {key: ('first', i) for i, key in enumerate(first_keys)}
+    for j, key in enumerate(second_keys):
+        slots[key] = ('second', j)
+
+    # Row r of the result is row index[r] of `second` when from_second[r], else of `first`
+    count = len(slots)
+    from_second = np.zeros(count, dtype=bool)
+    index = np.empty(count, dtype=np.int64)
+    for r, (source, i) in enumerate(slots.values()):
+        from_second[r] = source == 'second'
+        index[r] = i
+
+    merged = {}
+    for column in columns:
+        a = _column_or_default(first, column, dtypes[column])
+        b = _column_or_default(second, column, dtypes[column])
+        values = np.empty(count, dtype=dtypes[column])
+        values[~from_second] = a[index[~from_second]]
+        values[from_second] = b[index[from_second]]
+        merged[column] = values
+    return merged
+
+
+# Function to write a series as one .npy file per column plus meta.json. The directory is replaced
+# atomically, so readers never see a half-written series.
+def write_series(path, series, key=DAILY_KEY, meta=None):
+    path = series_path(path)
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for column, values in series.items():
+        np.save(os.path.join(tmp_path, f"{column}.npy"), np.ascontiguousarray(values))
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as file:
+        json.dump({'key': key, 'columns': list(series), 'rows': int(len(series['date'])), 'meta': meta or {}},
+                  file, indent=4)
+    old_path = f"{path}.old"
+    if os.path.exists(path):
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return path
+
+
+# Function to read a series; columns are memory-mapped unless mmap=False
+def read_series(path, mmap=True):
+    path = series_path(path)
+    with open(os.path.join(path, 'meta.json'), 'r') as file:
+        info = json.load(file)
+    series = {
+        column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode='r' if mmap else None)
+        for column in info['columns']
+    }
+    return series, info
+
+
+# Function to export a series to the original indent=4 JSON layout
+def export_json(series, json_path, key=DAILY_KEY, meta=None):
+    with open(json_path, 'w') as file:
+        json.dump(to_alpha_vantage(series, key, meta), file, indent=4)
+    return json_path
+
+
+# Function to save a series in columnar form, plus the JSON export unless json_export=False.
+# The JSON is written first so the columnar copy is never older than it (see load_series).
+def save_series(json_path, series, key=DAILY_KEY, meta=None, json_export=True):
+    if json_export:
+        export_json(series, json_path, key, meta)
+    return write_series(json_path, series, key, meta)
+
+
+# Function to load a series, preferring the columnar copy and falling back to parsing the JSON when
+# there is none or it is older than the JSON. Nothing is written; save_series() creates the copy
+def load_series(json_path, key=DAILY_KEY, mmap=True):
+    columnar = series_path(json_path)
+    meta_path = os.path.join(columnar, 'meta.json')
+    if os.path.exists(meta_path):
+        if not os.path.exists(json_path) or os.path.getmtime(meta_path) >= os.path.getmtime(json_path):
+            return read_series(columnar, mmap)[0]
+    with open(json_path, 'r') as file:
+        data = json.load(file)
+    return from_alpha_vantage(data, key)
@@ -1,30 +1,91 @@
 # File: src/stock_fetch/stock_fetch.py
 
-import requests
 import json
 import os
-from datetime import datetime, timedelta
-from dotenv import load_dotenv
+import sys
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import numpy as np
 
-load_dotenv(dotenv_path='../../config/.env')
+if __package__ in (None, ''):
+    # Running as a script: make the sibling packages under src/ importable
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Replace with your Alpha Vantage API key
-API_KEY = os.getenv('ALPHA_VANTAGE_API_KEY')
-BASE_URL = os.getenv('ALPHA_VANTAGE_BASE_URL')
+from common import instrumentation
+from common.http import thread_session
+from common.http_cache import CachedSession, cache_from_env
+from common.rate_limit import RateLimiter
+from common.settings import data_path, load_env
+from stock_fetch import series_store
 
-# Function to fetch data from Alpha Vantage API
-def fetch_data(function, symbol='SPY', outputsize='compact', interval=None):
+STOCK_DIR = data_path('stock')
+
+# Response cache settings; see common/http_cache.py for HTTP_CACHE_MODE=off|on|replay
+CACHE_DIR = data_path('cache', 'http')
+CACHE_TTLS = {
+    'TIME_SERIES_INTRADAY': 3600,
+    'TIME_SERIES_DAILY': 12 * 3600,
+    'TIME_SERIES_WEEKLY': 24 * 3600,
+    'TIME_SERIES_MONTHLY': 24 * 3600,
+}
+API_MESSAGE_KEYS = ("Error Message", "Note", "Information")
+
+# Full per-symbol histories kept between runs so later refreshes only need 'compact' requests
+HISTORY_DIR = data_path('stock', 'history')
+DAILY_KEY = 'Time Series (Daily)'
+# 'compact' returns the latest 100 bars; refetch the full history when the gap could be larger
+COMPACT_MAX_GAP_DAYS = 130
+# Shared Alpha Vantage quota (free tier: 5 requests per minute), overridable with ALPHA_VANTAGE_RPM
+DEFAULT_REQUESTS_PER_MINUTE = 5.0
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Alpha Vantage reports errors and quota notes with HTTP 200, so only cache real data
+def is_cacheable(response):
+    head = response.text[:512]
+    return response.status_code == 200 and not any(f'"{key}"' in head for key in API_MESSAGE_KEYS)
+
+
+# Function to get the calling thread's cached, keep-alive session for Alpha Vantage calls
+def http_session():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = cache_from_env(CACHE_DIR, ttls=CACHE_TTLS) or False
+    return CachedSession(thread_session(), _cache or None, is_cacheable)
+
+# Function to read the Alpha Vantage settings from the environment, loading config/.env on first use
+def api_settings():
+    load_env()
+    # Replace with your Alpha Vantage API key
+    return os.getenv('ALPHA_VANTAGE_API_KEY'), os.getenv('ALPHA_VANTAGE_BASE_URL')
+
+
+def requests_per_minute_setting():
+    load_env()
+    return float(os.getenv('ALPHA_VANTAGE_RPM', DEFAULT_REQUESTS_PER_MINUTE))
+
+# Function to fetch data from Alpha Vantage API; `month` ('YYYY-MM') selects one month of intraday history
+def fetch_data(function, symbol='SPY', outputsize='compact', interval=None, month=None):
+    api_key, base_url = api_settings()
     params = {
         'function': function,
         'symbol': symbol,
-        'apikey': API_KEY,
+        'apikey': api_key,
         'outputsize': outputsize
     }
     if interval:
         params['interval'] = interval
+    if month:
+        params['month'] = month
 
-    response = requests.get(BASE_URL, params=params)
-    data = response.json()
+    response = http_session().get(base_url, params=params, timeout=30)
+    with instrumentation.timer('stock_fetch.parse_json'):
+        data = response.json()
     
     if "Error Message" in data:
         raise ValueError(f"Error fetching data: {data['Error Message']}")
@@ -39,33 +100,103 @@ def filter_data_by_date(data, start_date, end_date, key):
     if key not in data:
         raise ValueError(f"Key '{key}' not found in data")
     
-    filtered_data = {key: {}}
-    start_date = datetime.strptime(start_date, '%Y-%m-%d')
-    end_date = datetime.strptime(end_date, '%Y-%m-%d')
-
-    for date_str, values in data[key].items():
-        date = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S' if ' ' in date_str else '%Y-%m-%d')
-        if start_date <= date < end_date:  # Changed <= to < for end_date consistency
-            filtered_data[key][date_str] = values
-    
+    # Keys are ISO dates ('YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'), which sort the same way as the
+    # datetimes they encode, so the bounds are normalised once and rows are compared as strings
+    start_date = datetime.strptime(start_date, '%Y-%m-%d').strftime('%Y-%m-%d')
+    end_date = datetime.strptime(end_date, '%Y-%m-%d').strftime('%Y-%m-%d')
+
+    filtered_data = {key: {
+        date_str: values for date_str, values in data[key].items()
+        if start_date <= date_str < end_date  # Changed <= to < for end_date consistency
+    }}
     return filtered_data
 
 # Function to save data to a JSON file
 def save_data(data, filename):
-    os.makedirs('../../data/stock', exist_ok=True)
-    filepath = os.path.join('../../data/stock', filename)
+    os.makedirs(STOCK_DIR, exist_ok=True)
+    filepath = os.path.join(STOCK_DIR, filename)
     with open(filepath, 'w') as file:
         json.dump(data, file, indent=4)
+    instrumentation.record_write('stock_json', filepath)
     print(f"Data saved to {filepath}")
 
-# Fetch and save daily data
-def fetch_and_save_daily(symbol='SPY', start_date='2022-02-01', end_date='2022-06-10'):
-    data = fetch_data('TIME_SERIES_DAILY', symbol, outputsize='full')
-    print(f"Fetched daily data: {list(data.keys())}")  # Debug statement
-    filtered_data = filter_data_by_date(data, start_date, end_date, 'Time Series (Daily)')
-    print(f"Filtered data for range {start_date} to {end_date}: {json.dumps(filtered_data, indent=4)[:500]}")  # Debug statement
-    save_data(filtered_data, f'daily_{symbol}.json')
+# Function to save a columnar series together with its JSON export
+def save_series_data(series, filename, key=DAILY_KEY):
+    os.makedirs(STOCK_DIR, exist_ok=True)
+    filepath = os.path.join(STOCK_DIR, filename)
+    series_store.save_series(filepath, series, key)
+    instrumentation.record_write('stock_json', filepath)
+    instrumentation.record_write('stock_series', series_store.series_path(filepath))
+    print(f"Data saved to {filepath} and {series_store.series_path(filepath)}")
+
+# Function to bring the stored daily history of a symbol up to date. The first run downloads the
+# full history; later runs request only the latest bars ('compact') and merge them into it.
+# The history is kept as a columnar series (see series_store.py), newest bar first.
+def update_daily_history(symbol, limiter=None):
+    path = os.path.join(HISTORY_DIR, f'daily_{symbol}.series')
+    history = None
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        history, _ = series_store.read_series(path)
+
+    outputsize = 'full'
+    if history is not None and len(history['date']):
+        latest = series_store.format_dates([history['date'].max()])[0]
+        if (datetime.now() - datetime.strptime(latest, '%Y-%m-%d')).days <= COMPACT_MAX_GAP_DAYS:
+            outputsize = 'compact'
+
+    if limiter is not None:
+        limiter.acquire()
+    data = fetch_data('TIME_SERIES_DAILY', symbol, outputsize=outputsize)
+    series = series_store.from_alpha_vantage(data, DAILY_KEY)
+
+    if outputsize == 'compact':
+        # New bars win over stored ones so late corrections are picked up
+        new_bars = int((~np.isin(series['date'], history['date'])).sum())
+        series = series_store.merge_by_date(history, series, descending=True)
+        print(f"{symbol}: merged {new_bars} new bar(s) into stored history")
+    else:
+        series = series_store.sort_by_date(series, descending=True)
+        print(f"{symbol}: fetched full history ({len(series['date'])} bars)")
+
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    series_store.write_series(path, series, DAILY_KEY, meta=data.get('Meta Data'))
+    instrumentation.record_write('stock_series', path)
+    return series
 
+# Fetch and save daily data; returns the saved (filtered) series
+@instrumentation.timed('stock_fetch.symbol', records=lambda series: len(series['date']))
+def fetch_and_save_daily(symbol='SPY', start_date='2022-02-01', end_date='2022-06-10', limiter=None):
+    series = update_daily_history(symbol, limiter)
+    start_date = datetime.strptime(start_date, '%Y-%m-%d').strftime('%Y-%m-%d')
+    end_date = datetime.strptime(end_date, '%Y-%m-%d').strftime('%Y-%m-%d')
+    filtered = series_store.select_dates(series, start_date, end_date)
+    print(f"Filtered {len(filtered['date'])} bars for range {start_date} to {end_date}")
+    save_series_data(filtered, f'daily_{symbol}.json')
+    return filtered
+
+# Function to fetch and save a watch-list of symbols concurrently under one shared quota limiter.
+# Returns a dict of symbol -> error message for the symbols that failed.
+def fetch_and_save_daily_many(symbols, start_date='2022-02-01', end_date='2022-06-10', workers=4,
+                              requests_per_minute=None):
+    if requests_per_minute is None:
+        requests_per_minute = requests_per_minute_setting()
+    limiter = RateLimiter(requests_per_minute / 60.0)
+    failed = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(fetch_and_save_daily, symbol, start_date, end_date, limiter): symbol
+            for symbol in symbols
+        }
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                print(f"{symbol}: {e}")
+                failed[symbol] = str(e)
+    return failed
+
+# Weekly and monthly series are now built from the stored daily bars by resample.py, without API calls
 # # Fetch and save weekly data
 # def fetch_and_save_weekly(symbol='SPY', start_date='2022-05-30', end_date='2024-08-12'):
 #     data = fetch_data('TIME_SERIES_WEEKLY', symbol, outputsize='full')
@@ -80,16 +211,49 @@ def fetch_and_save_daily(symbol='SPY', start_date='2022-02-01', end_date='2022-0
 #     filtered_data = filter_data_by_date(data, start_date, end_date, 'Monthly Time Series')
 #     save_data(filtered_data, f'monthly_{symbol}.json')
 
-if __name__ == '__main__':
-    symbol = 'SPY'  # S&P 500 ETF as a proxy
-    start_date = '2022-02-1'
-    end_date = '2022-06-10'
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch daily stock data from Alpha Vantage.")
+    parser.add_argument('--symbols', nargs='+', default=['SPY'])  # S&P 500 ETF as a proxy
+    parser.add_argument('--start-date', default='2022-02-01')
+    parser.add_argument('--end-date', default='2022-06-10')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rpm', type=float, default=None,
+                        help="Alpha Vantage requests per minute (default: ALPHA_VANTAGE_RPM or 5)")
+    parser.add_argument('--no-resample', action='store_true',
+                        help="Do not rebuild weekly_<symbol>.json and monthly_<symbol>.json (see resample.py)")
+    parser.add_argument('--features', action='store_true',
+                        help="Update the technical-indicator features of each stored history (see features.py)")
+    args = parser.parse_args(argv)
     try:
-        fetch_and_save_daily(symbol, start_date, end_date)
+        args.start_date, args.end_date = (datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d')
+                                          for date in (args.start_date, args.end_date))
+        failed = fetch_and_save_daily_many(args.symbols, args.start_date, args.end_date,
+                                           workers=args.workers, requests_per_minute=args.rpm)
         # fetch_and_save_weekly(symbol, start_date, end_date)
         # fetch_and_save_monthly(symbol, start_date, end_date)
+        if not args.no_resample:
+            from stock_fetch.resample import resample_symbol
+            for symbol in args.symbols:
+                if symbol not in failed:
+                    resample_symbol(os.path.join(HISTORY_DIR, f'daily_{symbol}.series'), symbol,
+                                    start_date=args.start_date, end_date=args.end_date)
+        if args.features:
+            from stock_fetch.features import update_features
+            for symbol in args.symbols:
+                if symbol not in failed:
+                    update_features(os.path.join(HISTORY_DIR, f'daily_{symbol}.series'))
+        if failed:
+            print(f"Data fetching failed for: {', '.join(sorted(failed))}")
+            return 1
         print("Data fetching completed successfully.")
     except ValueError as e:
         print(e)
+        return 1
     except Exception as e:
-        print(f"An error occurred: {e}")
\ No newline at end of file
+        print(f"An error occurred: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run_cli())
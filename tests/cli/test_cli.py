@@ -0,0 +1,52 @@
+# File: tests/cli/test_cli.py
+
+import importlib
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from cli.__main__ import COMMANDS
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+HEAVY_MODULES = ('numpy', 'requests', 'matplotlib')
+# Commands that talk to an HTTP API, the only ones that need requests
+FETCH_COMMANDS = ('fetch-stock', 'fetch-news')
+# Commands whose modules do not need numpy at all
+PLAIN_COMMANDS = ('merge-news', 'eval', 'convert-eval-log', 'batch-store', 'bench')
+
+# Runs `python -m cli <command> --help` in a fresh interpreter and prints the heavy modules it loaded
+HELP_SCRIPT = """
+import json, sys
+from cli.__main__ import main
+try:
+    main([sys.argv[1], '--help'])
+except SystemExit:
+    pass
+print(json.dumps(sorted(name for name in {modules} if name in sys.modules)))
+"""
+
+
+def loaded_modules(command):
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    result = subprocess.run([sys.executable, '-c', HELP_SCRIPT.format(modules=HEAVY_MODULES), command],
+                            cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True)
+    assert 'usage:' in result.stdout
+    return set(json.loads(result.stdout.splitlines()[-1]))
+
+
+@pytest.mark.parametrize('command', list(COMMANDS))
+def test_help_loads_only_the_commands_dependencies(command):
+    loaded = loaded_modules(command)
+    assert 'matplotlib' not in loaded
+    assert ('requests' in loaded) == (command in FETCH_COMMANDS)
+    if command in PLAIN_COMMANDS:
+        assert 'numpy' not in loaded
+
+
+@pytest.mark.parametrize('command', list(COMMANDS))
+def test_every_command_module_has_run_cli(command):
+    module = importlib.import_module(COMMANDS[command][0])
+    assert callable(getattr(module, 'run_cli', None))
@@ -0,0 +1,95 @@
+# File: tests/common/test_http_cache.py
+
+import json
+import os
+import time
+
+import pytest
+
+from common import http_cache
+from common.http_cache import CacheMiss, CachedResponse, CachedSession, ResponseCache
+from common.settings import data_path
+from stock_fetch.stock_fetch import is_cacheable
+
+URL = 'https://www.alphavantage.co/query'
+
+
+class FakeSession:
+    def __init__(self, text):
+        self.text = text
+        self.requests = []
+
+    def get(self, url, params=None, **kwargs):
+        self.requests.append(params)
+        return CachedResponse(200, self.text, {'Content-Type': 'application/json'})
+
+
+def daily_params(symbol):
+    return {'function': 'TIME_SERIES_DAILY', 'symbol': symbol, 'apikey': 'secret'}
+
+
+def test_entries_expire_after_their_ttl(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path), ttls={'TIME_SERIES_DAILY': 60, '/news/stories': None})
+    cache.store(URL, daily_params('SPY'), CachedResponse(200, '{"bars": 1}'))
+    # The API key is not part of the key
+    assert cache.load(URL, dict(daily_params('SPY'), apikey='other')).json() == {'bars': 1}
+
+    now = time.time()
+    monkeypatch.setattr(http_cache.time, 'time', lambda: now + 61)
+    assert cache.load(URL, daily_params('SPY')) is None
+    assert cache.ttl_for('https://api.aylien.com/v6/news/stories', {}) is None
+    assert cache.ttl_for(URL, {'function': 'TIME_SERIES_WEEKLY'}) == cache.default_ttl
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    body = CachedResponse(200, 'x' * 1000)
+    for symbol in ('AAA', 'BBB', 'CCC'):
+        cache.store(URL, daily_params(symbol), body)
+    paths = {symbol: cache.path_for(http_cache.cache_key(URL, daily_params(symbol))) for symbol in ('AAA', 'BBB', 'CCC')}
+    for age, symbol in enumerate(('AAA', 'BBB', 'CCC')):
+        os.utime(paths[symbol], (1000 + age, 1000 + age))
+    # Reading AAA makes BBB the least recently used entry
+    assert cache.load(URL, daily_params('AAA')) is not None
+
+    cache.max_bytes = int(os.path.getsize(paths['AAA']) * 3.5)
+    cache.store(URL, daily_params('DDD'), body)
+    assert [cache.load(URL, daily_params(symbol)) is not None for symbol in ('AAA', 'BBB', 'CCC', 'DDD')] == [
+        True, False, True, True]
+    assert cache.total_bytes <= cache.max_bytes
+
+
+def test_replay_serves_stale_entries_and_never_fetches(tmp_path, monkeypatch):
+    recorder = ResponseCache(str(tmp_path), default_ttl=60)
+    network = FakeSession('{"bars": 2}')
+    CachedSession(network, recorder).get(URL, params=daily_params('SPY'))
+
+    now = time.time()
+    monkeypatch.setattr(http_cache.time, 'time', lambda: now + 3600)
+    session = CachedSession(network, ResponseCache(str(tmp_path), default_ttl=60, mode=http_cache.MODE_REPLAY))
+    response = session.get(URL, params=daily_params('SPY'))
+    assert response.from_cache and response.json() == {'bars': 2}
+    with pytest.raises(CacheMiss):
+        session.get(URL, params=daily_params('QQQ'))
+    assert len(network.requests) == 1
+
+
+@pytest.mark.parametrize('key', ['Note', 'Information', 'Error Message'])
+def test_api_messages_are_not_cached(tmp_path, key):
+    network = FakeSession(json.dumps({key: 'Thank you for using Alpha Vantage! Please retry later.'}))
+    session = CachedSession(network, ResponseCache(str(tmp_path)), is_cacheable)
+    session.get(URL, params=daily_params('SPY'))
+    session.get(URL, params=daily_params('SPY'))
+    assert len(network.requests) == 2
+    assert is_cacheable(CachedResponse(200, json.dumps({'Meta Data': {}, 'Time Series (Daily)': {}})))
+    assert not is_cacheable(CachedResponse(500, '{}'))
+
+
+def test_cache_dir_is_relative_to_the_data_dir(monkeypatch):
+    monkeypatch.setenv('HTTP_CACHE_MODE', 'on')
+    monkeypatch.setenv('HTTP_CACHE_DIR', os.path.join('cache', 'elsewhere'))
+    assert http_cache.cache_from_env(data_path('cache', 'http')).directory == data_path('cache', 'elsewhere')
+    monkeypatch.delenv('HTTP_CACHE_DIR')
+    assert http_cache.cache_from_env(data_path('cache', 'http')).directory == data_path('cache', 'http')
+    monkeypatch.setenv('HTTP_CACHE_MODE', 'off')
+    assert http_cache.cache_from_env(data_path('cache', 'http')) is None
@@ -0,0 +1,70 @@
+# File: tests/common/test_instrumentation.py
+
+import json
+
+import pytest
+
+from common.instrumentation import Histogram, Registry
+
+
+def record_work(registry, records, latencies):
+    @registry.timed('work.batch', records=len)
+    def batch(items):
+        return items
+
+    batch(list(range(records)))
+    registry.count('http.requests', len(latencies))
+    for seconds in latencies:
+        registry.observe('http.latency.example.com', seconds)
+    registry.observe('queue.depth', records, bounds=(1, 10, 100))
+
+
+def test_drain_returns_the_numbers_and_starts_afresh():
+    registry = Registry()
+    record_work(registry, 5, [0.02, 0.3])
+    drained = registry.drain()
+    assert drained['counters'] == {'http.requests': 2}
+    assert drained['stages']['work.batch']['calls'] == 1 and drained['stages']['work.batch']['records'] == 5
+    assert drained['histograms']['http.latency.example.com']['count'] == 2
+
+    after = registry.snapshot()
+    assert after['counters'] == {} and after['stages'] == {} and after['histograms'] == {}
+
+
+def test_merge_adds_up_worker_snapshots():
+    workers = []
+    for records, latencies in ((5, [0.02, 0.3]), (7, [0.004, 45.0, 0.3])):
+        worker = Registry()
+        record_work(worker, records, latencies)
+        # As returned from a worker process, through JSON
+        workers.append(json.loads(json.dumps(worker.drain())))
+
+    parent = Registry()
+    record_work(parent, 1, [1.5])
+    for snapshot in workers:
+        parent.merge(snapshot)
+    merged = parent.snapshot()
+
+    expected = Registry()
+    for records, latencies in ((1, [1.5]), (5, [0.02, 0.3]), (7, [0.004, 45.0, 0.3])):
+        record_work(expected, records, latencies)
+    reference = expected.snapshot()
+
+    assert merged['counters'] == reference['counters'] == {'http.requests': 6}
+    assert merged['stages']['work.batch']['calls'] == 3 and merged['stages']['work.batch']['records'] == 13
+    assert merged['histograms'] == reference['histograms']
+    assert list(merged['histograms']['queue.depth']['buckets']) == ['1', '10', '100', '+Inf']
+
+
+def test_histogram_quantiles_and_bounds():
+    histogram = Histogram()
+    for value in [0.001] * 50 + [0.2] * 40 + [3.0] * 9 + [90.0]:
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == 0.005
+    assert histogram.quantile(0.9) == 0.25
+    assert histogram.quantile(0.99) == 5.0
+    assert histogram.quantile(1.0) == 90.0
+    data = histogram.to_dict()
+    assert data['min'] == 0.001 and data['max'] == 90.0 and data['buckets']['+Inf'] == 1
+    assert data['mean'] == pytest.approx(sum([0.001] * 50 + [0.2] * 40 + [3.0] * 9 + [90.0]) / 100)
+    assert Histogram().quantile(0.5) is None
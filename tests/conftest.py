@@ -0,0 +1,12 @@
+# File: tests/conftest.py
+
+# Shared test setup: the packages under src/ are made importable, and the data directory is moved to
+# a temporary directory before any module resolves its paths (see common/settings.py), so no test
+# reads or writes the real data/.
+
+import os
+import sys
+import tempfile
+
+os.environ['DISSERTATION_DATA_DIR'] = tempfile.mkdtemp(prefix='dissertation-data-')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
@@ -0,0 +1,96 @@
+# File: tests/metrics/test_amount_parser.py
+
+import numpy as np
+import pytest
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from benchmarks import synthetic
+from metrics import amount_parser, engine
+from metrics.amount_parser import parse_amount, parse_amount_or_nan, parse_amounts
+from metrics.metrics import evaluate_model
+
+
+@pytest.fixture(autouse=True)
+def clear_unparseable():
+    amount_parser.UNPARSEABLE.clear()
+    yield
+    amount_parser.UNPARSEABLE.clear()
+
+
+@pytest.mark.parametrize('text, direction, expected', [
+    ('0.8%', 'rise', 0.8),
+    ('0.8%', 'fall', -0.8),
+    ('-0.3%', 'rise', -0.3),
+    ('Approximately 1.5% decline', 'fall', -1.5),
+    ('from 1.0% to 1.5%', 'rise', 1.0),
+    (2, 'fall', -2.0),
+    ('1.25', 'Rise', 1.25),
+])
+def test_parse_amount(text, direction, expected):
+    assert parse_amount(text, direction) == pytest.approx(expected)
+
+
+def test_unparseable_amounts_are_counted_not_zeroed():
+    assert np.isnan(parse_amount_or_nan('unclear', 'rise'))
+    assert parse_amount('unclear', 'rise') == 0.0
+    assert parse_amount('n/a', 'rise', default=None) is None
+    assert amount_parser.UNPARSEABLE == {'unclear': 2, 'n/a': 1}
+
+    report = []
+    values = parse_amounts(['0.5%', 'about a percent', '1%'], ['rise', 'rise', 'fall'], report)
+    np.testing.assert_array_equal(np.isnan(values), [False, True, False])
+    assert values[2] == -1.0
+    assert report == [(1, 'about a percent')]
+
+
+# Function to build a log whose amounts all parse ('<n>.<n>%')
+def clean_log(count, models, seed=0):
+    data = synthetic.eval_log(count, models, seed)
+    for i, entry in enumerate(data):
+        for key in models + ('outcome',):
+            entry[key]['amount'] = f"{(i * 7 + len(key)) % 23 / 10:.1f}%"
+    return data
+
+
+def test_extract_arrays_skips_unparseable_entries_and_missing_models():
+    data = clean_log(10, ('gpta', 'gptb'), seed=2)
+    data[3]['gpta']['amount'] = 'hard to say'
+    data[6]['outcome']['amount'] = '???'
+    del data[8]['gpta']
+
+    report = []
+    arrays = engine.extract_arrays(data, 'gpta', report)
+    assert arrays['index'].tolist() == [0, 1, 2, 4, 5, 7, 9]
+    assert arrays['position'].tolist() == [1, 2, 3, 5, 6, 8, 10]
+    assert not np.isnan(arrays['prediction']).any() and not np.isnan(arrays['actual']).any()
+    assert sorted(report) == [(4, 'hard to say'), (7, '???')]
+    assert len(engine.extract_arrays(data, 'gptb')['index']) == 9
+
+
+def test_window_metrics_match_sklearn():
+    rng = np.random.default_rng(0)
+    predictions, actuals = rng.normal(size=60), rng.normal(size=60)
+    starts, ends = engine.rolling_bounds(60, 20, 7)
+    metrics = engine.window_metrics(predictions, actuals, starts, ends)
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        p, a = predictions[start:end], actuals[start:end]
+        assert metrics['RMSE'][i] == pytest.approx(np.sqrt(mean_squared_error(a, p)))
+        assert metrics['MAE'][i] == pytest.approx(mean_absolute_error(a, p))
+        assert metrics['R²'][i] == pytest.approx(r2_score(a, p))
+
+    constant = engine.window_metrics([1.0, 1.0], [1.0, 1.0], [0], [2])
+    assert constant['R²'][0] == 1.0
+
+
+def test_evaluate_model_skips_unparseable_entries(capsys):
+    data = clean_log(40, ('gpta',), seed=1)
+    data[10]['gpta']['amount'] = 'somewhat'
+    results = dict(evaluate_model(data, 'gpta', rolling_windows=[(5, 5)]))
+    assert 'skipped 1 entries' in capsys.readouterr().out
+    assert len(results['daily']) == 39
+    assert 11 not in [record['position'] for record in results['daily']]
+    assert len(results['rolling_5']) == 7
+    assert results['overall'][0]['start_position'] == 1 and results['overall'][0]['end_position'] == 40
+
+    assert dict(evaluate_model([{'position': 1, 'outcome': {'direction': 'rise', 'amount': '1%'}}], 'gpta')) == {}
+    assert 'gpta: no parseable predictions; skipped' in capsys.readouterr().out
@@ -0,0 +1,70 @@
+# File: tests/metrics/test_backtest.py
+
+import json
+
+import numpy as np
+import pytest
+
+from benchmarks import synthetic
+from metrics import backtest
+
+
+def test_run_backtest_charges_costs_on_turnover():
+    positions = np.array([1.0, 1.0, 0.0, -1.0])
+    returns = np.array([0.01, -0.02, 0.03, -0.01])
+    result = backtest.run_backtest(positions, returns, cost_bps=10.0, slippage_bps=5.0, initial=100.0)
+    expected = positions * returns - np.array([1.0, 0.0, 1.0, 1.0]) * 0.0015
+    np.testing.assert_allclose(result['daily_returns'][0], expected)
+    assert result['final_value'][0] == pytest.approx(100.0 * np.prod(1 + expected))
+    assert result['turnover'][0] == 3.0
+    assert result['max_drawdown'][0] < 0
+
+
+def clean_log(count, seed):
+    data = synthetic.eval_log(count, models=('gpta', 'gptb'), seed=seed)
+    for i, entry in enumerate(data):
+        for key in ('gpta', 'gptb', 'outcome'):
+            entry[key]['amount'] = f"{(i * 3 + len(key)) % 11 / 10:.1f}%"
+    return data
+
+
+def test_sweep_matches_single_backtests():
+    data = clean_log(60, seed=6)
+    grid = {'threshold': {'threshold': [0.0, 0.5], 'long_only': [True, False]}}
+    records = backtest.sweep(data, ['gpta', 'gptb'], grid, cost_bps=(0.0, 5.0))
+    assert len(records) == 2 * 4 * 2
+    # Every amount parses, so both models cover the same positions and each run equals a backtest of that model alone
+    for record in records[::3]:
+        single = backtest.backtest_model(data, record['model'], 'threshold', record['cost_bps'],
+                                         threshold=record['threshold'], long_only=record['long_only'])
+        assert record['final_value'] == pytest.approx(float(single['final_value'][0]))
+
+
+def test_sweep_aligns_models_by_position():
+    data = clean_log(30, seed=8)
+    # gptb's answers for positions 5 and 9 were logged again later, after a restart, and gpta has no
+    # answer for position 12; the log is not in position order
+    data.append({'position': 5, 'gptb': {'direction': 'rise', 'amount': '0.9%'}, 'outcome': dict(data[4]['outcome'])})
+    data.append({'position': 9, 'gptb': {'direction': 'fall', 'amount': '0.3%'}, 'outcome': dict(data[8]['outcome'])})
+    del data[11]['gpta']
+    data[2], data[20] = data[20], data[2]
+
+    grid = {'threshold': {'threshold': [0.0], 'long_only': [False]}}
+    records = {record['model']: record for record in backtest.sweep(data, ['gpta', 'gptb'], grid)}
+    for model in ('gpta', 'gptb'):
+        # The same model backtested alone over one entry per position, in order, without position 12
+        latest = {entry['position']: entry for entry in data if model in entry}
+        own = [latest[position] for position in sorted(latest) if position != 12]
+        single = backtest.backtest_model(own, model, 'threshold', threshold=0.0, long_only=False)
+        assert records[model]['final_value'] == pytest.approx(float(single['final_value'][0]))
+        assert records[model]['turnover'] == pytest.approx(float(single['turnover'][0]))
+
+
+def test_run_cli(tmp_path, capsys):
+    path = tmp_path / 'eval.logs.json'
+    path.write_text(json.dumps(synthetic.eval_log(40, seed=2)))
+    assert backtest.run_cli(['--log', str(path), '--model', 'gpta', '--top', '3']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith('Evaluated 64 combinations')
+    sharpes = [json.loads(line)['sharpe'] for line in lines[1:]]
+    assert len(sharpes) == 3 and sharpes == sorted(sharpes, reverse=True)
@@ -0,0 +1,189 @@
+# File: tests/metrics/test_batch_store.py
+
+import json
+import os
+import random
+import shutil
+import subprocess
+
+import pytest
+
+from metrics import batch_store, significance
+from metrics.batch_store import BatchStore
+from metrics.eval_log import load_entries
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+MODELS = ('gptb', 'gptc', 'gptd')
+BATCH_SIZE = 30
+
+
+def write_json(path, data):
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=2)
+
+
+# Function to write the logs of an orchestration run the way the adaptors and renameLogsForBatch
+# leave them. Batches listed in `without_eval_log` lack '{batch}-eval.logs.json'.
+def write_batch_logs(logs_dir, batches=2, without_eval_log=(), seed=0):
+    rng = random.Random(seed)
+    os.makedirs(logs_dir, exist_ok=True)
+    for batch in range(1, batches + 1):
+        positions = range((batch - 1) * BATCH_SIZE + 1, batch * BATCH_SIZE + 1)
+        day = lambda position: f"2022-{2 + position // 28:02d}-{position % 28 + 1:02d}"
+        write_json(os.path.join(logs_dir, f"{batch}-gpta.logs.json"), [
+            {'position': p, 'current day': day(p),
+             'data': {'key information': 'Rates rose.', 'sentiment analysis': 'negative'}} for p in positions])
+        write_json(os.path.join(logs_dir, f"{batch}-gptb.logs.json"), [
+            {'position': p, 'current day': day(p), 'data': {'analysis': 'The index should fall 0.4%.'}}
+            for p in positions])
+        write_json(os.path.join(logs_dir, f"{batch}-eval-gpta.logs.json"), [
+            {'position': p, 'evaluation': 'The key information was relevant.'} for p in positions])
+        write_json(os.path.join(logs_dir, f"{batch}-eval-gptd.logs.json"), [
+            {'position': p + 1, 'current day': day(p), 'data': {'predict-evaluation': 'Direction was right.'}}
+            for p in positions])
+        if batch in without_eval_log:
+            continue
+        entries = []
+        for p in positions:
+            entry = {'position': p + 1, 'date': day(p)}
+            for model in MODELS:
+                entry[model] = {'direction': rng.choice(['rise', 'fall']), 'amount': f"{rng.uniform(0, 2):.2f}%"}
+            entry['outcome'] = {'direction': rng.choice(['rise', 'fall']), 'amount': f"{rng.uniform(0, 2):.2f}%"}
+            entries.append(entry)
+        write_json(os.path.join(logs_dir, f"{batch}-eval.logs.json"), entries)
+    # Files of the running logs and fine-tuning data are not batch logs
+    write_json(os.path.join(logs_dir, 'eval.logs.json'), [])
+    write_json(os.path.join(logs_dir, 'gpta.logs.json'), [])
+
+
+@pytest.fixture
+def store(tmp_path):
+    logs_dir = str(tmp_path / 'logs')
+    write_batch_logs(logs_dir, batches=3, without_eval_log=(3,))
+    with BatchStore(str(tmp_path / 'batch_logs.sqlite'), logs_dir) as store:
+        yield store
+
+
+def test_parse_batch_file():
+    assert batch_store.parse_batch_file('3-eval-gpta.logs.json') == (3, 'eval', 'gpta')
+    assert batch_store.parse_batch_file('3-eval.logs.jsonl') == (3, 'eval', None)
+    assert batch_store.parse_batch_file('12-gptb.logs.json') == (12, 'output', 'gptb')
+    assert batch_store.parse_batch_file('eval.logs.json') is None
+    assert batch_store.parse_batch_file('3-gpta_fine_tuning_data.jsonl') is None
+
+
+def test_build_ingests_batch_files_once(store):
+    assert store.build() == 14
+    assert store.build() == 0
+    assert [batch[:3] for batch in store.batches()] == [(1, 5, 150), (2, 5, 150), (3, 4, 120)]
+
+    path = os.path.join(store.logs_dir, '2-gptb.logs.json')
+    write_json(path, [{'position': 31, 'current day': '2022-03-04', 'data': {'analysis': 'Flat.'}}])
+    os.utime(path, (1, 1))
+    assert store.build() == 1
+    assert store.batches()[1][2] == 121
+
+    os.remove(os.path.join(store.logs_dir, '1-gpta.logs.json'))
+    store.build()
+    assert store.batches()[0][:3] == (1, 4, 120)
+
+
+def test_predictions_come_from_the_batch_evaluation_log(store):
+    store.build()
+    # The per-model evaluation logs carry no direction/amount, batch 3 has no combined log
+    assert [batch[3] for batch in store.batches()] == [len(MODELS) * BATCH_SIZE] * 2 + [0]
+    assert store.models() == list(MODELS)
+    assert store.models(3) == []
+
+    log = store.evaluation_log(2)
+    expected = load_entries(os.path.join(store.logs_dir, '2-eval.logs.json'))
+    assert log == expected
+    assert [entry['position'] for entry in store.evaluation_log()] == list(range(2, 2 * BATCH_SIZE + 2))
+    assert all(set(entry) == {'position', 'date', 'gptc', 'outcome'} for entry in store.evaluation_log(1, ['gptc']))
+
+
+def test_entries_query(store):
+    store.build()
+    rows = list(store.entries(batch=1, kind='eval', model='gptd', start_position=5, end_position=7))
+    assert [entry['position'] for _, _, _, entry in rows] == [5, 6, 7]
+    assert all(entry['data']['predict-evaluation'] for _, _, _, entry in rows)
+    assert len(list(store.entries(kind='output', model='gpta'))) == 3 * BATCH_SIZE
+
+
+def test_compare_matches_the_batch_files(store):
+    store.build()
+    comparison = store.compare()
+    assert sorted(comparison) == [1, 2]
+    for batch in (1, 2):
+        data = load_entries(os.path.join(store.logs_dir, f"{batch}-eval.logs.json"))
+        for model in MODELS:
+            statistics = significance.entry_statistics(data, model)
+            expected = significance.metrics_from_statistics(statistics.sum(axis=0))
+            assert comparison[batch][model]['entries'] == BATCH_SIZE
+            for name in significance.METRICS:
+                assert comparison[batch][model][name] == pytest.approx(float(expected[name]))
+
+
+def test_runner_evaluates_store_logs():
+    from metrics.runner import run_evaluation, summarize
+
+    shutil.rmtree(batch_store.LOGS_DIR, ignore_errors=True)
+    write_batch_logs(batch_store.LOGS_DIR, batches=2)
+    try:
+        paths = batch_store.store_log_paths()
+        assert paths == ['batch:1', 'batch:2']
+        results = run_evaluation(paths, evaluators=('simulation', 'direction'), workers=1)
+        summary = summarize(results)
+        assert sorted(summary) == ['1', '2']
+        assert sorted(summary['1']) == list(MODELS)
+    finally:
+        shutil.rmtree(batch_store.LOGS_DIR, ignore_errors=True)
+
+
+# Node script that drives the orchestrator's batch tracker over 70 planner positions, appending to
+# eval.logs.json the way the eval adaptors do (gptb adds the entry of position p + 1, gptc and gptd
+# add their prediction to it). Fine-tuning is off, so the running logs are never renamed.
+ORCHESTRATION_SCRIPT = """
+const fs = require("fs");
+const path = require("path");
+const { createBatchTracker } = require(path.resolve(process.argv[1], "src/orchestration/batch-logs.js"));
+const logsDir = process.argv[2];
+const logPath = path.join(logsDir, "eval.logs.json");
+const prediction = (p, k) => ({ direction: (p + k) % 3 ? "rise" : "fall", amount: `${((p * 7 + k) % 13) / 10}%` });
+(async () => {
+    const batches = createBatchTracker({ logsDir });
+    for (let position = 1; position <= 70; position++) {
+        const entries = fs.existsSync(logPath) ? JSON.parse(fs.readFileSync(logPath, "utf8")) : [];
+        entries.push({ position: position + 1, date: `day-${position}`, gptb: prediction(position, 1),
+                       outcome: prediction(position, 0) });
+        const entry = entries[entries.length - 1];
+        entry.gptc = prediction(position, 2);
+        entry.gptd = prediction(position, 3);
+        fs.writeFileSync(logPath, JSON.stringify(entries, null, 2), "utf8");
+        fs.writeFileSync(path.join(logsDir, "gpta.logs.json"), "[]", "utf8");
+        await batches.afterPosition(position);
+    }
+    batches.finish();
+})();
+"""
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="needs node to run the orchestration helpers")
+def test_store_reads_the_logs_the_orchestrator_writes(tmp_path):
+    logs_dir = str(tmp_path / 'logs')
+    os.makedirs(logs_dir)
+    subprocess.run(['node', '-e', ORCHESTRATION_SCRIPT, REPO_ROOT, logs_dir], check=True, capture_output=True)
+    assert sorted(name for name in os.listdir(logs_dir) if name[0].isdigit()) == [
+        '1-eval.logs.json', '2-eval.logs.json', '3-eval.logs.json']
+
+    with BatchStore(str(tmp_path / 'batch_logs.sqlite'), logs_dir) as store:
+        store.build()
+        assert [batch[3] for batch in store.batches()] == [3 * 30, 3 * 30, 3 * 10]
+        assert store.models() == ['gptb', 'gptc', 'gptd']
+        # The evaluations of planner positions 31..60 are logged at 32..61
+        assert [entry['position'] for entry in store.evaluation_log(2)] == list(range(32, 62))
+        assert store.evaluation_log() == load_entries(os.path.join(logs_dir, 'eval.logs.json'))
+        comparison = store.compare()
+        assert sorted(comparison) == [1, 2, 3]
+        assert comparison[3]['gptc']['entries'] == 10
@@ -0,0 +1,80 @@
+# File: tests/metrics/test_eval_log.py
+
+import json
+
+import pytest
+
+from benchmarks import synthetic
+from metrics import eval_log
+from metrics.eval_log import EvalLogReader, iter_entries, load_entries, normalize_entry
+
+
+def raw_entries(count, seed=0):
+    entries = synthetic.eval_log(count, models=('gpta', 'gptb'), seed=seed)
+    # Keys as the adaptors sometimes write them: padded, capitalized, outcome first
+    return [{'Outcome': entry['outcome'], ' position ': entry['position'],
+             'gpta': {'Direction': entry['gpta']['direction'], 'Amount ': entry['gpta']['amount']},
+             'gptb': entry['gptb']} for entry in entries]
+
+
+def write_jsonl(path, entries, tail=''):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.writelines(json.dumps(entry) + '\n' for entry in entries)
+        file.write(tail)
+
+
+def test_entries_are_normalized():
+    entry = normalize_entry(raw_entries(1)[0])
+    assert list(entry) == ['position', 'gpta', 'gptb', 'outcome']
+    assert set(entry['gpta']) == {'direction', 'amount'}
+
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    path = str(tmp_path / 'eval.logs.jsonl')
+    entries = raw_entries(5)
+    write_jsonl(path, entries, tail='{"position": 6, "gpta": {"direc')
+    assert load_entries(path) == [normalize_entry(entry) for entry in entries]
+
+    # A broken line in the middle is an error, not a line being written
+    with open(path, 'w') as file:
+        file.write(json.dumps(entries[0]) + '\n{"position": 2,\n' + json.dumps(entries[2]) + '\n')
+    with pytest.raises(ValueError):
+        load_entries(path)
+
+
+def test_reader_returns_only_complete_lines_as_the_log_grows(tmp_path):
+    path = str(tmp_path / 'eval.logs.jsonl')
+    entries = [normalize_entry(entry) for entry in raw_entries(6, seed=1)]
+    reader = EvalLogReader(path)
+    assert reader.read_new() == []
+
+    line = json.dumps(entries[3])
+    write_jsonl(path, entries[:3], tail=line[:20])
+    assert reader.read_new() == entries[:3]
+    with open(path, 'a') as file:
+        file.write(line[20:] + '\n')
+    eval_log.append_entries(path, entries[4:])
+    assert reader.read_new() == entries[3:]
+    assert reader.read_new() == []
+
+    resumed = EvalLogReader(path, offset=reader.offset)
+    eval_log.append_entries(path, entries[:1])
+    assert resumed.read_new() == entries[:1]
+
+
+def test_legacy_array_conversion_round_trip(tmp_path):
+    legacy = str(tmp_path / 'eval.logs.json')
+    raw = raw_entries(40, seed=2)
+    with open(legacy, 'w') as file:
+        json.dump(raw, file, indent=4)
+    normalized = [normalize_entry(entry) for entry in raw]
+    # Chunks smaller than one entry still decode every value
+    assert list(eval_log._iter_json_array(legacy, chunk_size=7)) == raw
+
+    jsonl = str(tmp_path / 'eval.logs.jsonl')
+    assert eval_log.convert_log(legacy, jsonl) == 40
+    assert list(iter_entries(jsonl)) == normalized == load_entries(legacy)
+
+    organised = eval_log.export_json_array(jsonl, str(tmp_path / 'eval-organised.logs.json'))
+    with open(organised, 'r') as file:
+        assert file.read() == json.dumps(normalized, indent=4)
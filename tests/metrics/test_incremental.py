@@ -0,0 +1,105 @@
+# File: tests/metrics/test_incremental.py
+
+import glob
+import json
+import os
+
+import pytest
+
+from benchmarks import synthetic
+from metrics import metrics
+from metrics.incremental import IncrementalEvaluator, append_json_records
+from metrics.investment_simulation import simulate_investment
+
+MODELS = ('gpta', 'gptb')
+WINDOWS = [[7, 3]]
+
+
+@pytest.fixture
+def logs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'output_file_template', str(tmp_path / 'metric_{metric_type}_{model}.json'))
+    return tmp_path
+
+
+def eval_log(count):
+    data = synthetic.eval_log(count, MODELS, seed=9)
+    for i, entry in enumerate(data):
+        for key in MODELS + ('outcome',):
+            entry[key]['amount'] = f"{(i * 5 + len(key) * 3) % 17 / 10:.1f}%"
+    # An unparseable amount and an entry without one model
+    data[12]['gpta']['amount'] = 'no idea'
+    del data[40]['gptb']
+    return data
+
+
+def write_log(path, data):
+    with open(path, 'w') as file:
+        if path.endswith('.jsonl'):
+            file.writelines(json.dumps(entry) + '\n' for entry in data)
+        else:
+            json.dump(data, file, indent=4)
+
+
+def read_metric_files(directory):
+    files = {}
+    for path in glob.glob(os.path.join(directory, 'metric_*.json')):
+        with open(path, 'r') as file:
+            files[os.path.basename(path)] = json.load(file)
+    return files
+
+
+def assert_records_equal(records, expected):
+    assert len(records) == len(expected)
+    for record, reference in zip(records, expected):
+        assert record == pytest.approx(reference)
+
+
+@pytest.mark.parametrize('name', ['eval.logs.json', 'eval.logs.jsonl'])
+def test_growing_log_matches_batch_evaluation(logs_dir, name):
+    data = eval_log(95)
+    log_path = str(logs_dir / name)
+    evaluator = IncrementalEvaluator(str(logs_dir / 'state.json'), WINDOWS)
+    for count in (10, 31, 60, 61, 95):
+        write_log(log_path, data[:count])
+        summary = evaluator.update(log_path)
+        evaluator.save()
+        # Reload the state between updates, as separate runs would
+        evaluator = IncrementalEvaluator(str(logs_dir / 'state.json'), WINDOWS)
+
+    written = read_metric_files(str(logs_dir))
+    for model in MODELS:
+        expected = dict(metrics.evaluate_model(data, model, [tuple(window) for window in WINDOWS]))
+        assert summary[model]['overall'] == pytest.approx(expected['overall'][0])
+        assert summary[model]['final_value'] == pytest.approx(simulate_investment(data, 10000.00, model))
+        for metric_type, records in expected.items():
+            assert_records_equal(written[f"metric_{metric_type}_{model}.json"], records)
+
+
+def test_rewritten_history_starts_over(logs_dir):
+    data = eval_log(70)
+    log_path = str(logs_dir / 'eval.logs.json')
+    evaluator = IncrementalEvaluator(None, WINDOWS)
+    write_log(log_path, data[:50])
+    evaluator.update(log_path)
+
+    # The last consumed entry changed: everything is evaluated again
+    data[49]['gpta']['amount'] = '9.9%'
+    write_log(log_path, data)
+    summary = evaluator.update(log_path)
+    assert summary['gpta']['new_entries'] == 70
+    expected = dict(metrics.evaluate_model(data, 'gpta', [tuple(window) for window in WINDOWS]))
+    assert_records_equal(read_metric_files(str(logs_dir))['metric_daily_gpta.json'], expected['daily'])
+
+    # So is a log that shrank
+    write_log(log_path, data[:40])
+    assert evaluator.update(log_path)['gpta']['new_entries'] == 40
+
+
+def test_append_json_records(tmp_path):
+    path = str(tmp_path / 'records.json')
+    append_json_records(path, [{'RMSE': 1.0, 'position': 1}])
+    append_json_records(path, [{'RMSE': 2.0, 'position': 2}, {'RMSE': 3.0, 'position': 3}])
+    append_json_records(path, [])
+    with open(path, 'r') as file:
+        text = file.read()
+    assert text == json.dumps([{'RMSE': value, 'position': int(value)} for value in (1.0, 2.0, 3.0)], indent=4)
@@ -0,0 +1,42 @@
+# File: tests/metrics/test_investment_simulation.py
+
+import json
+
+from benchmarks import synthetic
+from metrics import investment_simulation
+from metrics.runner import run_evaluation
+
+
+def test_entries_without_the_model_are_skipped():
+    data = synthetic.eval_log(20, models=('gpta', 'gptb'), seed=4)
+    partial = [dict(entry) for entry in data]
+    for entry in partial[::3]:
+        del entry['gptb']
+    present = [entry for entry in partial if 'gptb' in entry]
+
+    final_value = investment_simulation.simulate_investment(partial, 10000.0, 'gptb')
+    assert final_value == investment_simulation.simulate_investment(present, 10000.0, 'gptb')
+    assert investment_simulation.simulate_investment(partial, 10000.0, 'gptc') == 10000.0
+
+
+def test_runner_simulates_models_missing_from_some_entries(tmp_path):
+    data = synthetic.eval_log(20, models=('gpta', 'gptb'), seed=5)
+    del data[0]['gptb']
+    path = tmp_path / 'eval.logs.json'
+    path.write_text(json.dumps(data))
+    results = run_evaluation([str(path)], evaluators=('simulation',), workers=1)
+    assert sorted(results['main']) == ['gpta', 'gptb']
+
+
+def test_unparseable_amounts_are_skipped_not_traded(capsys):
+    data = synthetic.eval_log(30, models=('gpta',), seed=7)
+    for i, entry in enumerate(data):
+        entry['gpta']['amount'] = f"{i % 7 / 5:.1f}%"
+    clean = [dict(entry) for entry in data]
+    data[4]['gpta'] = {'direction': 'rise', 'amount': 'a modest gain'}
+    data[11]['outcome'] = dict(data[11]['outcome'], amount='n/a')
+
+    final_value = investment_simulation.simulate_investment(data, 10000.0, 'gpta')
+    assert 'gpta: skipped 2 entries with unparseable amounts' in capsys.readouterr().out
+    kept = [entry for i, entry in enumerate(clean) if i not in (4, 11)]
+    assert final_value == investment_simulation.simulate_investment(kept, 10000.0, 'gpta')
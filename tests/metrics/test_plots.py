@@ -0,0 +1,64 @@
+# File: tests/metrics/test_plots.py
+
+import os
+
+import numpy as np
+import pytest
+
+from metrics import metrics, plots
+from metrics.plots import PlotRenderer, lttb
+
+
+def test_lttb_keeps_the_endpoints_and_returns_n_points():
+    rng = np.random.default_rng(0)
+    x = np.arange(5000, dtype=np.float64)
+    y = np.cumsum(rng.normal(size=5000))
+    y[2345] = 500.0
+    selected = lttb(x, y, 200)
+    assert len(selected) == 200
+    assert selected[0] == 0 and selected[-1] == 4999
+    assert np.all(np.diff(selected) > 0)
+    # A spike always forms the largest triangle in its bucket
+    assert 2345 in selected
+
+
+@pytest.mark.parametrize('count, threshold', [(10, 10), (10, 50), (10, 2), (0, 5)])
+def test_lttb_passes_short_inputs_through(count, threshold):
+    x = np.arange(count)
+    np.testing.assert_array_equal(lttb(x, np.sin(x), threshold), np.arange(count))
+
+
+def daily(count, offset=0.0):
+    return [{'RMSE': abs(np.sin(i)) + offset, 'position': i + 1} for i in range(count)]
+
+
+def test_unchanged_plots_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'plot_file_template', str(tmp_path / '{metric_type}_metrics_{model}.png'))
+    hashes_path = str(tmp_path / 'plot_hashes.json')
+
+    def render(values, force=False):
+        with PlotRenderer(workers=1, hashes_path=hashes_path, force=force, max_points=50) as renderer:
+            renderer.submit(values, 'daily', 'gpta')
+            renderer.submit(daily(20), 'daily', 'gptb')
+        return [os.path.basename(path) for path in renderer.rendered], len(renderer.skipped)
+
+    assert render(daily(200)) == (['daily_metrics_gpta.png', 'daily_metrics_gptb.png'], 0)
+    assert render(daily(200)) == ([], 2)
+    assert render(daily(200, offset=0.1)) == (['daily_metrics_gpta.png'], 1)
+    assert render(daily(200, offset=0.1), force=True) == (['daily_metrics_gpta.png', 'daily_metrics_gptb.png'], 0)
+    os.remove(str(tmp_path / 'daily_metrics_gptb.png'))
+    assert render(daily(200, offset=0.1)) == (['daily_metrics_gptb.png'], 1)
+
+
+def test_plots_render_in_a_process_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'plot_file_template', str(tmp_path / '{metric_type}_metrics_{model}.png'))
+    renderer = PlotRenderer(workers=2, hashes_path=str(tmp_path / 'plot_hashes.json'))
+    monthly = [{'RMSE': 1.0 + i, 'MAE': 0.5 + i, 'R²': 0.1 * i, 'start_position': i, 'end_position': i + 29}
+               for i in range(4)]
+    renderer.submit(monthly, 'monthly', 'gpta')
+    renderer.submit(daily(30), 'daily', 'gpta')
+    rendered, skipped = renderer.close()
+    assert sorted(os.path.basename(path) for path in rendered) == ['daily_metrics_gpta.png', 'monthly_metrics_gpta.png']
+    assert all(os.path.getsize(path) > 0 for path in rendered) and skipped == []
+    assert plots.plot_hash(monthly, 'monthly', 'gpta') in PlotRenderer(
+        hashes_path=str(tmp_path / 'plot_hashes.json')).hashes.values()
@@ -0,0 +1,78 @@
+# File: tests/metrics/test_runner.py
+
+import json
+
+import pytest
+
+from benchmarks import synthetic
+from metrics import amount_parser, runner
+
+MODELS = ('gpta', 'gptb')
+
+
+@pytest.fixture(autouse=True)
+def clear_unparseable():
+    amount_parser.UNPARSEABLE.clear()
+    yield
+    amount_parser.UNPARSEABLE.clear()
+
+
+def write_log(path, count, seed):
+    data = synthetic.eval_log(count, MODELS, seed=seed)
+    for i, entry in enumerate(data):
+        for key in MODELS:
+            entry[key]['amount'] = f"{(i * 7 + len(key) + seed) % 13 / 10:.1f}%"
+    data[3]['gptb']['amount'] = 'hard to say'
+    with open(path, 'w') as file:
+        json.dump(data, file)
+    return str(path)
+
+
+@pytest.fixture
+def logs(tmp_path):
+    return [write_log(tmp_path / 'eval.logs.json', 45, 1), write_log(tmp_path / '2-eval.logs.json', 35, 2)]
+
+
+def test_registered_evaluators_are_looked_up_by_name(logs, monkeypatch):
+    calls = []
+    monkeypatch.setattr(runner, 'EVALUATORS', dict(runner.EVALUATORS))
+
+    @runner.register_evaluator('entries')
+    def count_entries(data, model, label, options):
+        calls.append(label)
+        return len(data)
+
+    results = runner.run_evaluation(logs, evaluators=('entries',), models=['gpta'], workers=1)
+    assert results == {'main': {'gpta': {'entries': 45}}, '2': {'gpta': {'entries': 35}}}
+    assert sorted(calls) == ['2-gpta', 'gpta']
+
+    with pytest.raises(ValueError, match="Unknown evaluator"):
+        runner.run_evaluation(logs, evaluators=('metrics', 'nonexistent'))
+
+
+def test_process_pool_results_match_a_single_process(logs):
+    evaluators = ('metrics', 'simulation', 'direction')
+    serial = runner.run_evaluation(logs, evaluators, workers=1, plot=False, write=False)
+    unparseable = amount_parser.UNPARSEABLE.copy()
+    amount_parser.UNPARSEABLE.clear()
+
+    pooled = runner.run_evaluation(logs, evaluators, workers=2, plot=False, write=False)
+    assert pooled == serial
+    assert sorted(pooled) == ['2', 'main'] and all(sorted(models) == list(MODELS) for models in pooled.values())
+    # The unparseable amounts met in the workers are merged into this process's report
+    assert amount_parser.UNPARSEABLE == unparseable and unparseable['hard to say'] > 0
+
+
+def test_model_without_parseable_predictions_is_skipped(tmp_path, capsys):
+    data = synthetic.eval_log(10, MODELS, seed=3)
+    for entry in data:
+        entry['gptb']['amount'] = 'unclear'
+        entry['gpta']['amount'] = '0.5%'
+    path = tmp_path / 'eval.logs.json'
+    path.write_text(json.dumps(data))
+
+    results = runner.run_evaluation([str(path)], ('metrics',), workers=1, plot=False, write=False)
+    assert results['main']['gptb'] == {'metrics': {}}
+    assert 'gptb: no parseable predictions; skipped' in capsys.readouterr().out
+    summary = runner.summarize(results)
+    assert summary['main']['gptb'] == {} and 'overall' in summary['main']['gpta']
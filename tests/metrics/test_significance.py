@@ -0,0 +1,76 @@
+# File: tests/metrics/test_significance.py
+
+import json
+
+import numpy as np
+import pytest
+
+from benchmarks import synthetic
+from metrics import significance
+
+
+def test_block_indices_draw_circular_blocks():
+    rng = np.random.default_rng(0)
+    n, block_length = 23, 5
+    indices = significance.block_indices(n, 200, block_length, rng)
+    assert indices.shape == (200, n)
+    assert indices.min() >= 0 and indices.max() < n
+    # Within a block, each index follows the previous one (wrapping around the end)
+    steps = (np.diff(indices, axis=1) % n)[:, [i for i in range(n - 1) if (i + 1) % block_length]]
+    assert (steps == 1).all()
+
+
+def test_resample_counts_match_bincount():
+    rng = np.random.default_rng(1)
+    indices = significance.block_indices(17, 50, 4, rng)
+    counts = significance.resample_counts(indices, 17)
+    assert counts.shape == (50, 17)
+    assert (counts.sum(axis=1) == 17).all()
+    for row, drawn in zip(counts, indices):
+        np.testing.assert_array_equal(row, np.bincount(drawn, minlength=17))
+
+
+def test_bootstrap_sums_match_direct_resampling(monkeypatch):
+    statistics = np.random.default_rng(2).random((40, 3))
+    sums = significance.bootstrap_sums(statistics, resamples=300, block_length=5, seed=7)
+    indices = significance.block_indices(40, 300, 5, np.random.default_rng(7))
+    np.testing.assert_allclose(sums, statistics[indices].sum(axis=1))
+
+    # Splitting the resamples into chunks draws the same resamples
+    monkeypatch.setattr(significance, 'CHUNK_CELLS', 40 * 7)
+    np.testing.assert_allclose(significance.bootstrap_sums(statistics, 300, 5, seed=7), sums)
+
+
+def test_report_points_and_paired_differences():
+    data = synthetic.eval_log(120, models=('gpta', 'gptb'), seed=3)
+    for entry in data:
+        entry['copy'] = dict(entry['gpta'])
+    report = significance.significance_report(data, resamples=500, seed=1)
+
+    for model in ('gpta', 'gptb'):
+        statistics = significance.entry_statistics(data, model)
+        points = significance.metrics_from_statistics(statistics.sum(axis=0))
+        for name in significance.METRICS:
+            interval = report['models'][model]['metrics'][name]
+            assert interval['value'] == pytest.approx(float(points[name]))
+            assert interval['low'] <= interval['value'] <= interval['high']
+
+    # A model against an identical copy differs by exactly 0 in every resample
+    same = report['differences']['gpta-copy']
+    assert all(same[name]['value'] == 0 and same[name]['p_value'] == 1.0 and not same[name]['significant']
+               for name in significance.METRICS)
+
+
+def test_missing_intervals_format_as_na(tmp_path):
+    assert significance._format({'value': None, 'low': None, 'high': None}) == 'n/a'
+    assert significance._format({'value': 0.5, 'low': None, 'high': None}) == '0.5000 [n/a]'
+    assert significance._format({'value': 0.5, 'low': 0.25, 'high': 0.75}) == '0.5000 [0.2500, 0.7500]'
+
+    # gptb appears in one entry only, with an amount that cannot be parsed
+    data = synthetic.eval_log(30, models=('gpta',))
+    data[0]['gptb'] = {'direction': 'up-ish', 'amount': 'unclear'}
+    log_path, output_path = tmp_path / 'eval.logs.json', tmp_path / 'significance.json'
+    log_path.write_text(json.dumps(data))
+    assert significance.run_cli([str(log_path), '--resamples', '200', '--output', str(output_path)]) == 0
+    report = json.loads(output_path.read_text())
+    assert report['models']['gptb']['metrics']['RMSE'] == {'value': None, 'low': None, 'high': None}
@@ -0,0 +1,133 @@
+# File: tests/news_fetch/test_dedup.py
+
+import json
+import os
+import random
+import time
+from datetime import date as date_cls
+
+from benchmarks import synthetic
+from news_fetch import dedup, news_fetch
+from news_fetch.dedup import DedupIndex
+from news_fetch.manifest import FetchManifest
+from news_fetch.story_io import day_file_name, read_stories
+
+
+def stories(count, seed=0):
+    return news_fetch.filter_stories(synthetic.aylien_stories(count, seed=seed, body_sentences=6))
+
+
+# Function to copy a story with one word of its body replaced, as a syndicated copy would differ
+def reworded(story):
+    words = story['body'].split()
+    words[len(words) // 2] = 'reportedly'
+    return dict(story, body=' '.join(words), source={'name': 'Newsday'})
+
+
+def test_exact_and_near_duplicates_are_dropped():
+    index = DedupIndex(None)
+    day = stories(6)
+    kept, dropped = index.filter_day('2022-06-01', day + [dict(day[0]), reworded(day[1])])
+    assert kept == day and dropped == 2
+
+    # Later days are checked against the indexed ones, within the window only
+    other = stories(3, seed=1)
+    kept, dropped = index.filter_day('2022-06-03', [reworded(day[2]), *other])
+    assert kept == other and dropped == 1
+    kept, dropped = index.filter_day('2022-06-10', [dict(day[3])])
+    assert dropped == 0 and kept == [day[3]]
+
+
+def test_reprocessing_a_day_replaces_its_entries():
+    index = DedupIndex(None)
+    day = stories(4)
+    index.filter_day('2022-06-01', day)
+    assert index.filter_day('2022-06-01', day) == (day, 0)
+    assert len(index.days) == len(day)
+
+
+def test_index_round_trip_and_eviction(tmp_path):
+    path = str(tmp_path / 'dedup_index.npz')
+    index = DedupIndex(path)
+    index.filter_day('2022-06-01', stories(4))
+    later = stories(3, seed=1)
+    index.filter_day('2022-06-06', later)
+    index.save()
+
+    loaded = DedupIndex(path)
+    assert loaded.days == index.days and loaded.exact == index.exact
+    assert loaded.filter_day('2022-06-07', later) == ([], len(later))
+    loaded.evict_before('2022-06-07')
+    assert loaded.days == [date_cls(2022, 6, 6).toordinal()] * len(later)
+
+
+def test_dedup_news_dir_keeps_the_first_copy(tmp_path):
+    directory = str(tmp_path / 'news')
+    synthetic.write_news_dir(directory, days=4, stories_per_day=6)
+    names = sorted(os.listdir(directory))
+    first = read_stories(os.path.join(directory, names[0]))
+    second_path = os.path.join(directory, names[1])
+    second = read_stories(second_path)
+    with open(second_path, 'w') as file:
+        json.dump(second + [reworded(first[0])], file)
+    total = sum(len(read_stories(os.path.join(directory, name))) for name in names)
+
+    index_path = str(tmp_path / 'dedup_index.npz')
+    kept, dropped = dedup.dedup_news_dir(directory, index_path)
+    assert (kept, dropped) == (total - 1, 1)
+    assert read_stories(os.path.join(directory, names[0])) == first
+    assert dedup.dedup_news_dir(directory, index_path) == (total - 1, 0)
+    assert dedup.run_cli(['--news-dir', directory, '--index', index_path, '--dry-run']) == 0
+
+
+def test_backfill_dedups_in_date_order_and_saves_the_index_per_day(tmp_path, monkeypatch):
+    dates = ['2022-06-01', '2022-06-02', '2022-06-03', '2022-06-04']
+    fetched = {date: stories(4, seed=seed) for seed, date in enumerate(dates)}
+    # The same story on the first and last day; the later copy must be the one dropped
+    fetched[dates[-1]].append(reworded(fetched[dates[0]][0]))
+    rng = random.Random(0)
+
+    def fetch_news_for_day(date, **kwargs):
+        # Later days finish first
+        time.sleep(0.05 * (len(dates) - dates.index(date)) * rng.uniform(0.5, 1))
+        return [dict(story) for story in fetched[date]], None
+
+    index_path = str(tmp_path / 'dedup_index.npz')
+    news_dir = str(tmp_path / 'news')
+    indexed_when_done = {}
+    mark_done = FetchManifest.mark_done
+
+    def checked_mark_done(self, date, *args, **kwargs):
+        indexed_when_done[date] = DedupIndex(index_path).days
+        return mark_done(self, date, *args, **kwargs)
+
+    monkeypatch.setattr(news_fetch, 'fetch_news_for_day', fetch_news_for_day)
+    monkeypatch.setattr(news_fetch, 'DEDUP_INDEX_PATH', index_path)
+    monkeypatch.setattr(news_fetch, 'NEWS_DIR', news_dir)
+    monkeypatch.setattr(FetchManifest, 'mark_done', checked_mark_done)
+
+    failed = news_fetch.backfill_news(dates[0], dates[-1], workers=4, requests_per_second=1000,
+                                      manifest_path=str(tmp_path / 'manifest.json'))
+    assert failed == []
+    for counter, date in enumerate(dates, 1):
+        saved = read_stories(os.path.join(news_dir, day_file_name(counter, date)))
+        assert saved == fetched[date][:-1] if date == dates[-1] else saved == fetched[date]
+        # The index on disk already covered the day when it was marked done
+        assert max(indexed_when_done[date]) == date_cls.fromisoformat(date).toordinal()
+
+
+def test_backfill_failed_day_does_not_block_later_days(tmp_path, monkeypatch):
+    def fetch_news_for_day(date, **kwargs):
+        if date == '2022-06-01':
+            raise news_fetch.NewsFetchError("HTTP 400: bad request")
+        return stories(2, seed=int(date[-2:])), None
+
+    monkeypatch.setattr(news_fetch, 'fetch_news_for_day', fetch_news_for_day)
+    monkeypatch.setattr(news_fetch, 'DEDUP_INDEX_PATH', str(tmp_path / 'dedup_index.npz'))
+    monkeypatch.setattr(news_fetch, 'NEWS_DIR', str(tmp_path / 'news'))
+    manifest_path = str(tmp_path / 'manifest.json')
+
+    assert news_fetch.backfill_news('2022-06-01', '2022-06-03', workers=2, manifest_path=manifest_path) \
+        == ['2022-06-01']
+    manifest = FetchManifest(manifest_path)
+    assert manifest.pending(['2022-06-01', '2022-06-02', '2022-06-03']) == ['2022-06-01']
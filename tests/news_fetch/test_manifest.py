@@ -0,0 +1,110 @@
+# File: tests/news_fetch/test_manifest.py
+
+import json
+import os
+
+import pytest
+
+from benchmarks import synthetic
+from news_fetch import news_fetch, story_io
+from news_fetch import manifest as manifest_module
+from news_fetch.manifest import STATUS_DONE, STATUS_FAILED, FetchManifest
+from news_fetch.news_merge import list_day_files
+from news_fetch.story_io import read_stories
+
+DATES = ['2022-06-01', '2022-06-02', '2022-06-03', '2022-06-04']
+
+
+@pytest.fixture
+def backfill(tmp_path, monkeypatch):
+    fetched = []
+    failing = set()
+
+    def fetch_news_for_day(date, **kwargs):
+        fetched.append(date)
+        if date in failing:
+            raise news_fetch.NewsFetchError("HTTP 503: unavailable")
+        return news_fetch.filter_stories(synthetic.aylien_stories(6, seed=DATES.index(date))), None
+
+    monkeypatch.setattr(news_fetch, 'fetch_news_for_day', fetch_news_for_day)
+    monkeypatch.setattr(news_fetch, 'DEDUP_INDEX_PATH', str(tmp_path / 'dedup_index.npz'))
+    monkeypatch.setattr(news_fetch, 'NEWS_DIR', str(tmp_path / 'news'))
+    manifest_path = str(tmp_path / 'manifest.json')
+
+    def run(**options):
+        fetched.clear()
+        failed = news_fetch.backfill_news(DATES[0], DATES[-1], workers=2, requests_per_second=1000,
+                                          manifest_path=manifest_path, **options)
+        return failed, sorted(fetched), FetchManifest(manifest_path)
+
+    run.failing = failing
+    return run
+
+
+def test_second_run_skips_done_days_and_retries_failed_ones(backfill):
+    backfill.failing.add(DATES[2])
+    failed, fetched, manifest = backfill()
+    assert failed == [DATES[2]] and fetched == DATES
+    assert [manifest.days[date]['status'] for date in DATES] == [STATUS_DONE, STATUS_DONE, STATUS_FAILED,
+                                                                 STATUS_DONE]
+    assert 'HTTP 503' in manifest.days[DATES[2]]['error']
+
+    backfill.failing.clear()
+    failed, fetched, manifest = backfill()
+    assert (failed, fetched) == ([], [DATES[2]])
+    assert manifest.days[DATES[2]]['status'] == STATUS_DONE and manifest.days[DATES[2]]['counter'] == 3
+    assert len(read_stories(manifest.days[DATES[2]]['file'])) == manifest.days[DATES[2]]['story_count']
+
+    failed, fetched, _ = backfill()
+    assert (failed, fetched) == ([], [])
+
+
+def test_missing_or_changed_files_are_fetched_again(backfill):
+    _, _, manifest = backfill()
+    os.remove(manifest.days[DATES[0]]['file'])
+    with open(manifest.days[DATES[3]]['file'], 'a') as file:
+        file.write(' ')
+    assert backfill()[1] == [DATES[0]]
+    assert backfill(verify=True)[1] == [DATES[3]]
+    assert backfill(verify=True)[1] == []
+
+
+def test_failed_writes_leave_no_partial_file(tmp_path, monkeypatch):
+    directory = str(tmp_path / 'news')
+    synthetic.write_news_dir(directory, days=2, stories_per_day=6)
+    manifest_path = os.path.join(directory, 'manifest.json')
+    manifest = FetchManifest(manifest_path)
+    days, _ = list_day_files(directory)
+    for day in days:
+        manifest.mark_done(day['date'], day['counter'], len(read_stories(day['path'])), file=day['path'])
+    with open(manifest_path, 'r') as file:
+        saved = file.read()
+
+    # Converting the first day file dies after two stories were written
+    dumps = json.dumps
+    calls = [0]
+
+    def failing_dumps(*args, **kwargs):
+        calls[0] += 1
+        if calls[0] > 2:
+            raise OSError("No space left on device")
+        return dumps(*args, **kwargs)
+
+    monkeypatch.setattr(story_io.json, 'dumps', failing_dumps)
+    with pytest.raises(OSError):
+        story_io.migrate_news_dir(directory, fmt='gzip', manifest_path=manifest_path)
+    monkeypatch.undo()
+
+    assert sorted(os.listdir(directory)) == sorted([os.path.basename(day['path']) for day in days] +
+                                                   ['manifest.json'])
+    manifest = FetchManifest(manifest_path)
+    assert all(manifest.is_complete(day['date'], verify=True) for day in days)
+
+    # A manifest that cannot be written keeps its previous contents
+    monkeypatch.setattr(manifest_module.json, 'dump', failing_dumps)
+    calls[0] = 2
+    with pytest.raises(OSError):
+        manifest.mark_failed(days[0]['date'], days[0]['counter'], "interrupted")
+    assert not os.path.exists(f"{manifest_path}.tmp")
+    with open(manifest_path, 'r') as file:
+        assert file.read() == saved
@@ -0,0 +1,82 @@
+# File: tests/news_fetch/test_news_fetch.py
+
+import json
+import os
+
+import pytest
+
+from benchmarks import synthetic
+from news_fetch import news_fetch
+from news_fetch.story_io import read_stories
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload or {}
+        self.headers = headers or {}
+        self.text = json.dumps(self.payload)
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.headers = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.headers.append(headers)
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def token_requests(monkeypatch, tmp_path):
+    made = []
+
+    def post(url, auth=None, data=None):
+        made.append(auth)
+        return FakeResponse(200, {'access_token': f"token-{len(made)}", 'expires_in': 3600})
+
+    monkeypatch.setattr(news_fetch.requests, 'post', post)
+    monkeypatch.setattr(news_fetch, '_shared_auth', None)
+    monkeypatch.setattr(news_fetch, 'credentials', lambda: ('user', 'secret', 'app'))
+    monkeypatch.setattr(news_fetch, 'NEWS_DIR', str(tmp_path / 'news'))
+    return made
+
+
+def test_single_days_share_one_token(token_requests):
+    for counter, date in enumerate(('2022-06-01', '2022-06-02', '2022-06-03'), 1):
+        session = FakeSession([FakeResponse(200, {'stories': synthetic.aylien_stories(5, seed=counter)})])
+        result = news_fetch.fetch_and_save_news_for_day(date, counter, session=session)
+        assert session.headers == [{'Authorization': 'Bearer token-1', 'AppId': 'app'}]
+        if result['file']:
+            assert len(read_stories(result['file'])) == result['story_count']
+            assert os.path.dirname(result['file']) == news_fetch.NEWS_DIR
+    assert token_requests == [('user', 'secret')]
+
+
+def test_rejected_token_is_refreshed(token_requests, monkeypatch):
+    monkeypatch.setattr(news_fetch.instrumentation, 'sleep', lambda seconds, name=None: None)
+    session = FakeSession([FakeResponse(401), FakeResponse(200, {'stories': []})])
+    news_fetch.fetch_and_save_news_for_day('2022-06-01', 1, session=session)
+    assert [headers['Authorization'] for headers in session.headers] == ['Bearer token-1', 'Bearer token-2']
+    assert len(token_requests) == 2
+
+
+def test_single_days_go_through_the_response_cache(token_requests, monkeypatch):
+    monkeypatch.setenv('HTTP_CACHE_MODE', 'on')
+    monkeypatch.setattr(news_fetch, '_cache', None)
+    stories = synthetic.aylien_stories(5, seed=7)
+    session = FakeSession([FakeResponse(200, {'stories': stories})])
+    monkeypatch.setattr(news_fetch, 'thread_session', lambda: session)
+
+    first, _ = news_fetch.fetch_news_for_day('2022-06-01')
+    second, _ = news_fetch.fetch_news_for_day('2022-06-01')
+    assert first == second == news_fetch.filter_stories(stories)
+    assert len(session.headers) == 1
+    assert news_fetch.response_cache().directory == news_fetch.CACHE_DIR
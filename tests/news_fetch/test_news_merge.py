@@ -0,0 +1,103 @@
+# File: tests/news_fetch/test_news_merge.py
+
+import json
+import os
+
+import pytest
+
+from benchmarks import synthetic
+from news_fetch import news_fetch, news_merge
+from news_fetch.story_io import day_file_name, read_stories, write_stories
+
+
+@pytest.fixture
+def news_dir(tmp_path):
+    return synthetic.write_news_dir(str(tmp_path / 'news'), days=4, stories_per_day=5)
+
+
+def add_day(directory, counter, date, fmt='json'):
+    stories = news_fetch.filter_stories(synthetic.aylien_stories(5, seed=100 + counter))
+    return write_stories(os.path.join(directory, day_file_name(counter, date, fmt)), stories)
+
+
+def day_stories(directory):
+    days, _ = news_merge.list_day_files(directory)
+    return [(day['key'], read_stories(day['path'])) for day in days]
+
+
+def rebuilt(directory, tmp_path):
+    path = str(tmp_path / 'rebuilt.jsonl')
+    news_merge.merge_day_files(directory, path, incremental=False)
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def read_bytes(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def test_incremental_merge_appends_only_new_days(news_dir, tmp_path):
+    output = os.path.join(news_dir, 'merged_news_data.jsonl')
+    assert news_merge.merge_day_files(news_dir, output) == (4, [])
+    size = os.path.getsize(output)
+
+    add_day(news_dir, 5, '2022-02-07')
+    add_day(news_dir, 6, '2022-02-08', fmt='gzip')
+    assert news_merge.merge_day_files(news_dir, output) == (2, [])
+    assert read_bytes(output)[:size] == rebuilt(news_dir, tmp_path)[:size]
+    assert read_bytes(output) == rebuilt(news_dir, tmp_path)
+    assert list(news_merge.iter_merged(output)) == day_stories(news_dir)
+    assert news_merge.read_day(output, '6_2022_02_08') == day_stories(news_dir)[-1][1]
+    assert news_merge.merge_day_files(news_dir, output) == (0, [])
+
+
+def test_changed_and_deleted_days_rebuild_the_output(news_dir, tmp_path):
+    output = os.path.join(news_dir, 'merged_news_data.jsonl')
+    news_merge.merge_day_files(news_dir, output)
+    days, _ = news_merge.list_day_files(news_dir)
+
+    os.remove(days[1]['path'])
+    assert news_merge.merge_day_files(news_dir, output) == (3, [])
+    assert [key for key, _ in news_merge.iter_merged(output)] == [days[0]['key'], days[2]['key'], days[3]['key']]
+    with pytest.raises(KeyError):
+        news_merge.read_day(output, days[1]['key'])
+
+    stories = read_stories(days[2]['path'])[:2]
+    write_stories(days[2]['path'], stories)
+    os.utime(days[2]['path'], (1, 1))
+    assert news_merge.merge_day_files(news_dir, output) == (3, [])
+    assert news_merge.read_day(output, days[2]['key']) == stories
+    assert read_bytes(output) == rebuilt(news_dir, tmp_path)
+
+
+def test_leftover_temporary_files_are_ignored(news_dir):
+    output = os.path.join(news_dir, 'merged_news_data.jsonl')
+    news_merge.merge_day_files(news_dir, output)
+    for name in ('5_2022_02_07.tmp.json', '6_2022_02_08.tmp.jsonl.gz'):
+        with open(os.path.join(news_dir, name), 'w') as file:
+            file.write('[{"title": "half')
+    with open(os.path.join(news_dir, 'notes.json'), 'w') as file:
+        file.write('{}')
+    assert news_merge.merge_day_files(news_dir, output) == (0, ['notes.json'])
+    assert len(list(news_merge.iter_merged(output))) == 4
+
+
+@pytest.mark.parametrize('indent', [4, None])
+def test_export_json_object_matches_json_dump(news_dir, tmp_path, indent):
+    output = os.path.join(news_dir, 'merged_news_data.jsonl')
+    news_merge.merge_day_files(news_dir, output)
+    json_path = str(tmp_path / 'merged_news_data.json')
+    news_merge.export_json_object(output, json_path, indent=indent)
+    with open(json_path, 'r', encoding='utf-8') as file:
+        text = file.read()
+    assert text == json.dumps(dict(day_stories(news_dir)), indent=indent, ensure_ascii=False)
+
+
+def test_export_json_object_of_nothing(tmp_path):
+    output = str(tmp_path / 'merged.jsonl')
+    with open(output, 'w') as file:
+        file.write(json.dumps({'key': 'not-a-day', 'stories': []}) + '\n')
+    json_path = news_merge.export_json_object(output, str(tmp_path / 'merged.json'))
+    with open(json_path, 'r') as file:
+        assert file.read() == '{}'
@@ -0,0 +1,62 @@
+# File: tests/news_fetch/test_news_store.py
+
+import os
+
+import pytest
+
+from benchmarks import synthetic
+from news_fetch.news_merge import list_day_files
+from news_fetch.news_store import NewsStore
+from news_fetch.story_io import read_stories, write_stories
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    directory = synthetic.write_news_dir(str(tmp_path / 'news'), days=6, stories_per_day=8)
+    days, _ = list_day_files(directory)
+    return directory, {day['date']: read_stories(day['path']) for day in days}, days
+
+
+@pytest.fixture
+def store(corpus, tmp_path):
+    with NewsStore(str(tmp_path / 'news_index.sqlite'), corpus[0]) as store:
+        yield store
+
+
+def test_date_range_and_per_day_lookup(corpus, store):
+    _, stories, days = corpus
+    assert store.build() == 6
+    dates = sorted(stories)
+    assert store.days() == [(day['key'], day['date'], len(stories[day['date']])) for day in days]
+    assert [date for _, date, _ in store.days(dates[1], dates[3])] == dates[1:4]
+
+    # Inclusive on both ends, in date order and in file order within a day
+    assert list(store.query(dates[2], dates[4])) == [(date, story) for date in dates[2:5] for story in stories[date]]
+    assert store.stories_for_day(dates[3]) == stories[dates[3]]
+    assert store.stories_for_day('2021-01-01') == []
+    assert store.keys_between(dates[0], dates[2]) == [days[1]['key'], days[2]['key']]
+    assert store.keys_between(None, dates[0]) == [days[0]['key']]
+
+
+def test_source_and_category_filters(corpus, store):
+    _, stories, _ = corpus
+    store.build()
+    everything = [(date, story) for date in sorted(stories) for story in stories[date]]
+    name = everything[0][1]['source']['name']
+    assert list(store.query(source=name)) == [pair for pair in everything if pair[1]['source']['name'] == name]
+    assert list(store.query(category='ay.fin')) == [
+        pair for pair in everything if 'ay.fin' in [category['id'] for category in pair[1]['categories']]]
+
+
+def test_build_only_reindexes_changed_files(corpus, store):
+    directory, stories, days = corpus
+    store.build()
+    assert store.build() == 0
+
+    write_stories(days[2]['path'], stories[days[2]['date']][:3])
+    os.utime(days[2]['path'], (1, 1))
+    os.remove(days[4]['path'])
+    assert store.build() == 1
+    assert store.stories_for_day(days[2]['date']) == stories[days[2]['date']][:3]
+    assert store.stories_for_day(days[4]['date']) == []
+    assert [date for _, date, _ in store.days()] == [day['date'] for i, day in enumerate(days) if i != 4]
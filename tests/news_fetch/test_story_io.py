@@ -0,0 +1,76 @@
+# File: tests/news_fetch/test_story_io.py
+
+import gzip
+import json
+import os
+
+import pytest
+
+from benchmarks import synthetic
+from news_fetch import news_fetch, story_io
+from news_fetch.manifest import FetchManifest
+from news_fetch.news_merge import list_day_files
+from news_fetch.story_io import day_file_name, read_stories, write_stories
+
+
+def stories(count=6, seed=0):
+    day = news_fetch.filter_stories(synthetic.aylien_stories(count, seed=seed))
+    # Non-ASCII text must survive the round trip
+    day[0] = dict(day[0], title=day[0]['title'] + ' – café €')
+    return day
+
+
+@pytest.mark.parametrize('fmt', ['json', 'jsonl', 'gzip'])
+def test_round_trip(tmp_path, fmt):
+    day = stories()
+    path = write_stories(str(tmp_path / day_file_name(3, '2022-06-03', fmt)), day)
+    assert read_stories(path) == day
+    assert os.listdir(str(tmp_path)) == [os.path.basename(path)]
+
+
+def test_gzip_files_are_json_lines(tmp_path):
+    day = stories()
+    path = write_stories(str(tmp_path / day_file_name(3, '2022-06-03', 'gzip')), day)
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        assert [json.loads(line) for line in file] == day
+    assert os.path.getsize(path) < len(json.dumps(day, indent=4).encode('utf-8'))
+
+
+def test_zstd_round_trip(tmp_path):
+    pytest.importorskip('zstandard')
+    day = stories()
+    assert read_stories(write_stories(str(tmp_path / day_file_name(3, '2022-06-03', 'zstd')), day)) == day
+
+
+def test_zstd_needs_the_optional_package(tmp_path, monkeypatch):
+    monkeypatch.setattr(story_io, 'zstandard', None)
+    with pytest.raises(RuntimeError, match='zstandard'):
+        write_stories(str(tmp_path / day_file_name(3, '2022-06-03', 'zstd')), stories())
+
+
+def test_projection_and_truncation():
+    story = stories()[0]
+    compact = story_io.project_story(story, story_io.COMPACT_FIELDS)
+    assert compact == {'title': story['title'], 'body': story['body'], 'source': {'name': story['source']['name']},
+                       'categories': story['categories']}
+    assert story_io.truncate_body('One. Two! Three? Four.', max_sentences=2) == 'One. Two!'
+    assert story_io.truncate_body('a b c d e', max_tokens=3) == 'a b c'
+    assert story_io.truncate_body('Short one.', max_sentences=5, max_tokens=5) == 'Short one.'
+
+
+def test_migrate_news_dir_to_gzip(tmp_path):
+    directory = synthetic.write_news_dir(str(tmp_path / 'news'), days=3, stories_per_day=5)
+    before = {day['key']: read_stories(day['path']) for day in list_day_files(directory)[0]}
+    manifest_path = os.path.join(directory, 'manifest.json')
+    manifest = FetchManifest(manifest_path)
+    for day in list_day_files(directory)[0]:
+        manifest.mark_done(day['date'], day['counter'], len(before[day['key']]), file=day['path'])
+
+    converted, size_before, size_after = story_io.migrate_news_dir(directory, 'gzip', manifest_path=manifest_path)
+    assert converted == 3 and size_after < size_before
+    days, _ = list_day_files(directory)
+    assert all(day['path'].endswith('.jsonl.gz') for day in days)
+    assert {day['key']: read_stories(day['path']) for day in days} == before
+    manifest = FetchManifest(manifest_path)
+    assert all(manifest.is_complete(day['date'], verify=True) and manifest.days[day['date']]['file'] == day['path']
+               for day in days)
@@ -0,0 +1,97 @@
+# File: tests/stock_fetch/test_features.py
+
+import numpy as np
+import pytest
+
+from benchmarks import synthetic
+from stock_fetch import features, series_store
+
+FEATURES = features.DEFAULT_FEATURES + ('rsi_3', 'return_2', 'volume_z_5')
+
+
+def daily_series(count, seed=0):
+    return series_store.sort_by_date(series_store.from_alpha_vantage(synthetic.alpha_vantage_daily(count, seed=seed)))
+
+
+def assert_features_equal(computed, expected):
+    assert list(computed) == list(expected)
+    np.testing.assert_array_equal(computed['date'], expected['date'])
+    for name in FEATURES:
+        np.testing.assert_allclose(computed[name], expected[name], rtol=1e-9, atol=1e-12, equal_nan=True,
+                                   err_msg=name)
+
+
+# Straightforward per-row versions of some indicators to check the vectorized ones against
+def naive_ema(close, span):
+    alpha, values = 2.0 / (span + 1), [close[0]]
+    for price in close[1:]:
+        values.append(alpha * price + (1 - alpha) * values[-1])
+    return np.array(values)
+
+
+def naive_rsi(close, period):
+    result = np.full(len(close), np.nan)
+    changes = np.diff(close)
+    gain, loss = np.maximum(changes[:period], 0).mean(), np.maximum(-changes[:period], 0).mean()
+    for row in range(period, len(close)):
+        if row > period:
+            change = changes[row - 1]
+            gain = (gain * (period - 1) + max(change, 0)) / period
+            loss = (loss * (period - 1) + max(-change, 0)) / period
+        result[row] = 100 - 100 / (1 + gain / loss) if loss > 0 else (100.0 if gain > 0 else 50.0)
+    return result
+
+
+def test_features_match_naive_indicators():
+    series = daily_series(120)
+    close = series['close']
+    computed, _ = features.compute_features(series, FEATURES)
+
+    np.testing.assert_allclose(computed['ema_12'], naive_ema(close, 12))
+    np.testing.assert_allclose(computed['rsi_14'], naive_rsi(close, 14), equal_nan=True)
+    sma = [np.nan] * 19 + [close[row - 19:row + 1].mean() for row in range(19, len(close))]
+    np.testing.assert_allclose(computed['sma_20'], sma, equal_nan=True)
+    returns = close[1:] / close[:-1] - 1
+    volatility = [np.nan] * 20 + [returns[row - 20:row].std(ddof=1) for row in range(20, len(close))]
+    np.testing.assert_allclose(computed['volatility_20'], volatility, equal_nan=True)
+    np.testing.assert_allclose(computed['return_5'][5:], close[5:] / close[:-5] - 1)
+    np.testing.assert_allclose(computed['gap'][1:], series['open'][1:] / close[:-1] - 1)
+
+
+def test_incremental_updates_match_full_recompute(tmp_path):
+    full = daily_series(200, seed=3)
+    path = str(tmp_path / 'daily_SPY.series')
+    for count in (10, 60, 61, 62, 120, 199, 200):
+        # The stored history is newest first, as update_daily_history writes it
+        part = series_store.sort_by_date(series_store.take(full, slice(0, count)), descending=True)
+        series_store.write_series(path, part)
+        computed, rows = features.update_features(path, FEATURES)
+        expected, _ = features.compute_features(series_store.take(full, slice(0, count)), FEATURES)
+        assert_features_equal(computed, expected)
+    assert rows == 1
+    assert features.update_features(path, FEATURES)[1] == 0
+    assert_features_equal(features.load_features(path)[0], expected)
+
+
+def test_changed_prices_or_features_recompute_everything(tmp_path):
+    series = daily_series(100, seed=4)
+    path = str(tmp_path / 'daily_SPY.series')
+    series_store.write_series(path, series_store.take(series, slice(0, 90)))
+    features.update_features(path, FEATURES)
+
+    series['close'] = series['close'].copy()
+    series['close'][10] *= 1.01
+    series_store.write_series(path, series)
+    computed, rows = features.update_features(path, FEATURES)
+    assert rows == 100
+    assert_features_equal(computed, features.compute_features(series, FEATURES)[0])
+
+    assert features.update_features(path, FEATURES[:3])[1] == 100
+
+
+def test_parse_feature():
+    assert features.parse_feature('volume_z_20') == ('volume_z', 20)
+    assert features.parse_feature('gap') == ('gap', None)
+    assert features.feature_history(['sma_50', 'rsi_14', 'gap']) == 49
+    with pytest.raises(ValueError):
+        features.parse_feature('macd_12')
@@ -0,0 +1,103 @@
+# File: tests/stock_fetch/test_intraday.py
+
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from stock_fetch import intraday, series_store
+from stock_fetch import stock_fetch
+
+
+# Function to fake TIME_SERIES_INTRADAY: 5-minute bars on the weekdays of the requested month,
+# newest first like Alpha Vantage, plus one stray bar of the next month
+def fake_fetch_data(requests):
+    def fetch_data(function, symbol, outputsize=None, interval=None, month=None):
+        requests.append((symbol, month))
+        days = np.arange(np.datetime64(month, 'D'), np.datetime64(intraday.month_end(month), 'D') + 1)
+        stamps = [day + np.timedelta64(9 * 60 + 30 + 5 * bar, 'm') for day in days if np.is_busday(day)
+                  for bar in range(3)]
+        rows = {}
+        for i, stamp in enumerate(reversed(stamps)):
+            price = 400.0 + i * 0.01
+            rows[str(stamp).replace('T', ' ') + ':00'] = {
+                '1. open': f"{price:.4f}", '2. high': f"{price + 0.5:.4f}", '3. low': f"{price - 0.5:.4f}",
+                '4. close': f"{price + 0.1:.4f}", '5. volume': str(1000 + i)}
+        return {'Meta Data': {'2. Symbol': symbol}, intraday.intraday_key(interval): rows}
+    return fetch_data
+
+
+@pytest.fixture
+def requests(monkeypatch):
+    made = []
+    monkeypatch.setattr(stock_fetch, 'fetch_data', fake_fetch_data(made))
+    return made
+
+
+def test_month_range():
+    assert intraday.month_range('2022-02-01', '2022-06-10') == ['2022-02', '2022-03', '2022-04', '2022-05',
+                                                                '2022-06']
+    assert intraday.month_range('2022-02-15', '2022-03-01') == ['2022-02']
+    assert intraday.month_end('2022-12') == datetime(2023, 1, 1)
+
+
+def test_months_are_partitioned_and_fetched_once(tmp_path, requests):
+    root = str(tmp_path / 'intraday')
+    fetched, failed = intraday.ingest(['SPY', 'QQQ'], '2022-05-20', '2022-07-05', '5min', workers=3,
+                                      requests_per_minute=6000, root=root)
+    assert (fetched, failed) == (6, {})
+    assert sorted(requests) == [(symbol, month) for symbol in ('QQQ', 'SPY')
+                                for month in ('2022-05', '2022-06', '2022-07')]
+    assert sorted(os.listdir(os.path.join(root, 'SPY', '5min'))) == ['2022-05.series', '2022-06.series',
+                                                                     '2022-07.series']
+
+    series, info = series_store.read_series(intraday.partition_path('SPY', '2022-06', '5min', root))
+    assert info['meta']['complete'] and info['meta']['month'] == '2022-06'
+    dates = series_store.format_dates(series['date'], intraday=True)
+    # Oldest bar first, and only bars of the partition's month
+    assert dates == sorted(dates) and all(date.startswith('2022-06') for date in dates)
+    assert dates[0] == '2022-06-01 09:30:00'
+
+    requests.clear()
+    assert intraday.ingest(['SPY', 'QQQ'], '2022-05-20', '2022-07-05', '5min', requests_per_minute=6000,
+                           root=root) == (0, {})
+    assert requests == []
+    intraday.ingest(['SPY'], '2022-06-01', '2022-07-01', '5min', requests_per_minute=6000, root=root, refresh=True)
+    assert requests == [('SPY', '2022-06')]
+
+
+def test_current_month_stays_open(tmp_path, requests):
+    root = str(tmp_path / 'intraday')
+    month = datetime.now().strftime('%Y-%m')
+    intraday.fetch_month('SPY', month, '5min', root)
+    assert not intraday.partition_meta(intraday.partition_path('SPY', month, '5min', root))['complete']
+    assert intraday.months_to_fetch('SPY', [month], '5min', root) == [month]
+
+
+def test_reading_a_range_touches_only_its_partitions(tmp_path, requests):
+    root = str(tmp_path / 'intraday')
+    intraday.ingest(['SPY'], '2022-05-01', '2022-08-01', '5min', requests_per_minute=6000, root=root)
+
+    parts = list(intraday.iter_intraday('SPY', '2022-05-31', '2022-06-02', '5min', root))
+    assert len(parts) == 2 and all(isinstance(part['close'], np.memmap) for part in parts)
+    loaded = intraday.load_intraday('SPY', '2022-05-31', '2022-06-02', '5min', root)
+    assert series_store.format_dates(loaded['date'], intraday=True) == [
+        f"{day} 09:{minute}:00" for day in ('2022-05-31', '2022-06-01') for minute in (30, 35, 40)]
+
+    # Months that were never fetched are skipped
+    assert len(intraday.load_intraday('SPY', '2022-07-25', '2022-09-01', '5min', root)['date']) == 15
+    assert len(intraday.load_intraday('SPY', '2023-01-01', '2023-02-01', '5min', root)['date']) == 0
+
+
+def test_failed_months_are_reported(tmp_path, monkeypatch):
+    def fetch_data(function, symbol, **kwargs):
+        raise ValueError("Error fetching data: Invalid API call")
+
+    monkeypatch.setattr(stock_fetch, 'fetch_data', fetch_data)
+    root = str(tmp_path / 'intraday')
+    fetched, failed = intraday.ingest(['SPY'], '2022-06-01', '2022-07-01', '5min', requests_per_minute=6000,
+                                      root=root)
+    assert fetched == 0 and failed == {('SPY', '2022-06'): "Error fetching data: Invalid API call"}
+    assert intraday.run_cli(['--start-date', '2022-06-01', '--end-date', '2022-07-01', '--rpm', '6000',
+                             '--root', root]) == 1
@@ -0,0 +1,57 @@
+# File: tests/stock_fetch/test_preprocess.py
+
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+
+from stock_fetch import preprocess
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+# daily_SPY.json and _daily_SPY.json, and the merged_daily_SPY.json the original
+# stock_organise_series.py -> stock_direction_analysis.py -> stock_expand_data.py chain made of them.
+# The inputs include ties that np.round and round() break differently (40.00 -> 42.89, 40.00 -> 37.11)
+# and a day that closes at its open.
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'preprocess')
+SCRIPTS = ['stock_organise_series.py', 'stock_direction_analysis.py', 'stock_expand_data.py']
+
+
+def read_expected():
+    with open(os.path.join(FIXTURES, 'merged_daily_SPY.json'), 'r') as file:
+        return file.read()
+
+
+def copy_inputs(directory):
+    os.makedirs(directory, exist_ok=True)
+    for name in ('daily_SPY.json', '_daily_SPY.json'):
+        shutil.copy(os.path.join(FIXTURES, name), directory)
+
+
+def test_pipeline_matches_the_original_scripts(tmp_path):
+    stock_dir = str(tmp_path / 'stock')
+    copy_inputs(stock_dir)
+    output = os.path.join(stock_dir, 'merged_daily_SPY.json')
+    preprocess.preprocess_daily(os.path.join(stock_dir, 'daily_SPY.json'), os.path.join(stock_dir, '_daily_SPY.json'),
+                                output)
+    with open(output, 'r') as file:
+        assert file.read() == read_expected()
+
+
+def test_scripts_still_match_their_original_output(tmp_path):
+    # The scripts use paths relative to scripts/, next to data/stock
+    copy_inputs(str(tmp_path / 'data' / 'stock'))
+    os.makedirs(str(tmp_path / 'scripts'))
+    for script in SCRIPTS:
+        subprocess.run([sys.executable, os.path.join(REPO_ROOT, 'scripts', script)], cwd=str(tmp_path / 'scripts'),
+                       check=True, capture_output=True)
+    with open(str(tmp_path / 'data' / 'stock' / 'merged_daily_SPY.json'), 'r') as file:
+        assert file.read() == read_expected()
+
+
+def test_derive_direction_rounds_like_round():
+    series = {'open': np.array([40.0, 40.0, 40.0, 100.0]), 'close': np.array([42.89, 37.11, 40.0, 100.125])}
+    derived = preprocess.derive_direction(series)
+    assert derived['amount'].tolist() == [7.23, -7.23, -0.0, 0.12]
+    assert derived['direction'].tolist() == [1, -1, -1, 1]
@@ -0,0 +1,112 @@
+# File: tests/stock_fetch/test_resample.py
+
+import json
+import os
+from datetime import date
+
+import numpy as np
+import pytest
+
+from benchmarks import synthetic
+from stock_fetch import resample, series_store
+from stock_fetch import stock_fetch
+
+# Period -> function(day, row index) giving the period a daily bar belongs to
+GROUPS = {
+    'weekly': lambda day, row: day.isocalendar()[:2],
+    'monthly': lambda day, row: (day.year, day.month),
+    'quarterly': lambda day, row: (day.year, (day.month - 1) // 3),
+    '2M': lambda day, row: (day.year * 12 + day.month - 1) // 2,
+    '5B': lambda day, row: row // 5,
+}
+
+
+def daily_series(count, seed=0):
+    return series_store.from_alpha_vantage(synthetic.alpha_vantage_daily(count, seed=seed))
+
+
+# Straightforward per-bar grouping to check the vectorized aggregation against
+def naive_resample(series, group):
+    series = series_store.sort_by_date(series)
+    dates = series_store.format_dates(series['date'])
+    groups = {}
+    for row, text in enumerate(dates):
+        groups.setdefault(group(date.fromisoformat(text), row), []).append(row)
+    return [(dates[rows[-1]], series['open'][rows[0]], series['high'][rows].max(), series['low'][rows].min(),
+             series['close'][rows[-1]], series['volume'][rows].sum()) for rows in groups.values()]
+
+
+def assert_bars(bars, expected):
+    got = list(zip(series_store.format_dates(bars['date']), bars['open'], bars['high'], bars['low'],
+                   bars['close'], bars['volume']))
+    assert len(got) == len(expected)
+    for row, reference in zip(got, expected):
+        assert row[0] == reference[0]
+        np.testing.assert_allclose(row[1:], reference[1:])
+
+
+@pytest.mark.parametrize('period', sorted(GROUPS))
+def test_resample_matches_naive_grouping(period):
+    series = daily_series(400)
+    assert_bars(resample.resample(series, period), naive_resample(series, GROUPS[period]))
+
+
+def test_parse_period():
+    assert resample.parse_period('weekly') == ('1W', 1, 'W')
+    assert resample.parse_period('3m') == ('3M', 3, 'M')
+    assert resample.period_key('monthly') == 'Monthly Time Series'
+    assert resample.resampled_name('SPY', '1W') == 'weekly_SPY'
+    with pytest.raises(ValueError):
+        resample.parse_period('2X')
+
+
+@pytest.mark.parametrize('period', ['weekly', 'monthly', '5B'])
+def test_incremental_updates_match_full_resample(tmp_path, period):
+    full = daily_series(300)
+    path = str(tmp_path / 'daily_SPY.series')
+    for count in (100, 101, 104, 160, 299, 300):
+        # The stored history is newest first, as update_daily_history writes it
+        part = series_store.sort_by_date(series_store.take(full, slice(0, count)), descending=True)
+        series_store.write_series(path, part)
+        bars, rebuilt = resample.update_resampled(path, period)
+        assert_bars(bars, naive_resample(part, GROUPS[period]))
+    # Only the last (open) period is rebuilt when nothing changed
+    assert resample.update_resampled(path, period)[1] == 1
+
+
+def test_corrected_bar_rebuilds_everything(tmp_path):
+    series = daily_series(120)
+    path = str(tmp_path / 'daily_SPY.series')
+    series_store.write_series(path, series)
+    resample.update_resampled(path, 'weekly')
+
+    series['close'] = series['close'].copy()
+    series['close'][-10] += 5.0
+    series_store.write_series(path, series)
+    bars, rebuilt = resample.update_resampled(path, 'weekly')
+    assert rebuilt == len(bars['date'])
+    assert_bars(bars, naive_resample(series, GROUPS['weekly']))
+
+
+def test_export_accepts_unpadded_dates(tmp_path):
+    path = str(tmp_path / 'daily_SPY.series')
+    series_store.write_series(path, daily_series(120))
+    outputs = resample.resample_symbol(path, 'SPY', start_date='2022-02-1', end_date='2022-06-10',
+                                       output_dir=str(tmp_path))
+
+    with open(outputs['weekly']) as file:
+        data = json.load(file)
+    keys = list(data['Weekly Time Series'])
+    assert keys[0].startswith('1_')
+    dates = [key.split('_')[1] for key in keys]
+    assert dates == sorted(dates, reverse=True)
+    assert '2022-02-01' <= dates[-1] and dates[0] < '2022-06-10'
+
+
+def test_fetch_stock_default_run_resamples(monkeypatch):
+    data = synthetic.alpha_vantage_daily(120)
+    monkeypatch.setattr(stock_fetch, 'fetch_data', lambda *args, **kwargs: data)
+
+    assert stock_fetch.run_cli(['--rpm', '6000']) == 0
+    for name in ('weekly_SPY.json', 'monthly_SPY.json'):
+        assert os.path.exists(os.path.join(stock_fetch.STOCK_DIR, name))
@@ -0,0 +1,80 @@
+# File: tests/stock_fetch/test_series_store.py
+
+import json
+import os
+
+import numpy as np
+
+from benchmarks import synthetic
+from stock_fetch import series_store
+
+
+def assert_series_equal(series, expected):
+    assert list(series) == list(expected)
+    for column in expected:
+        np.testing.assert_array_equal(series[column], expected[column])
+
+
+def test_alpha_vantage_round_trip():
+    data = synthetic.alpha_vantage_daily(50, seed=1)
+    series = series_store.from_alpha_vantage(data)
+    assert series['date'].dtype == np.int64 and len(series['date']) == 50
+    assert series_store.to_alpha_vantage(series) == {series_store.DAILY_KEY: data[series_store.DAILY_KEY]}
+
+
+def test_positions_and_directions_round_trip():
+    rows = {'2_2022-02-02': {'1. open': '10.0000', '2. high': '11.0000', '3. low': '9.0000', '4. close': '10.5000',
+                             '5. volume': '1200', '6. direction': 'rise', '7. amount': '5.0%'},
+            '1_2022-02-01': {'1. open': '10.0000', '2. high': '10.0000', '3. low': '10.0000', '4. close': '10.0000',
+                             '5. volume': '1000'}}
+    series = series_store.from_alpha_vantage({series_store.DAILY_KEY: rows})
+    np.testing.assert_array_equal(series['position'], [2, 1])
+    np.testing.assert_array_equal(series['direction'], [series_store.RISE, 0])
+    assert series_store.to_alpha_vantage(series)[series_store.DAILY_KEY] == rows
+
+
+def test_write_and_read_series(tmp_path):
+    series = series_store.from_alpha_vantage(synthetic.alpha_vantage_daily(30))
+    path = series_store.write_series(str(tmp_path / 'daily_SPY.json'), series, meta={'symbol': 'SPY'})
+    assert path.endswith('daily_SPY.series')
+
+    loaded, info = series_store.read_series(path)
+    assert isinstance(loaded['close'], np.memmap)
+    assert info['rows'] == 30 and info['meta'] == {'symbol': 'SPY'}
+    assert_series_equal(loaded, series)
+
+    # Rewriting replaces the directory as a whole
+    series_store.write_series(path, series_store.take(series, slice(0, 10)))
+    assert len(series_store.read_series(path, mmap=False)[0]['date']) == 10
+    assert sorted(os.listdir(tmp_path)) == ['daily_SPY.series']
+
+
+def test_load_series_prefers_the_newer_copy(tmp_path):
+    json_path = str(tmp_path / 'daily_SPY.json')
+    series = series_store.from_alpha_vantage(synthetic.alpha_vantage_daily(20))
+    series_store.save_series(json_path, series)
+    assert_series_equal(series_store.load_series(json_path), series)
+
+    # A JSON file edited after the columnar copy was written wins
+    edited = series_store.take(series, slice(0, 5))
+    with open(json_path, 'w') as file:
+        json.dump(series_store.to_alpha_vantage(edited), file)
+    os.utime(json_path, (os.path.getmtime(json_path) + 10,) * 2)
+    assert_series_equal(series_store.load_series(json_path), edited)
+
+
+def test_select_sort_and_merge():
+    series = series_store.from_alpha_vantage(synthetic.alpha_vantage_daily(40))
+    ascending = series_store.sort_by_date(series)
+    assert (np.diff(ascending['date']) > 0).all()
+
+    dates = series_store.format_dates(ascending['date'])
+    selected = series_store.select_dates(series, dates[5], dates[15])
+    assert sorted(series_store.format_dates(selected['date'])) == dates[5:15]
+
+    old = series_store.take(ascending, slice(0, 30))
+    new = series_store.take(ascending, slice(25, 40))
+    new['close'] = new['close'] + 1.0
+    merged = series_store.merge_by_date(old, new)
+    assert series_store.format_dates(merged['date']) == dates[::-1]
+    np.testing.assert_array_equal(merged['close'][:15], new['close'][::-1])
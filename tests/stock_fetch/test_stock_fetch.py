@@ -0,0 +1,96 @@
+# File: tests/stock_fetch/test_stock_fetch.py
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from benchmarks import synthetic
+from stock_fetch import series_store, stock_fetch
+from stock_fetch.stock_fetch import DAILY_KEY
+
+
+# Fake Alpha Vantage: the synthetic bars published before "now"; 'compact' returns the latest 100
+class FakeMarket:
+    def __init__(self, now):
+        self.now = now
+        self.bars = {symbol: synthetic.alpha_vantage_daily(300, symbol, seed)[DAILY_KEY]
+                     for seed, symbol in enumerate(('SPY', 'QQQ'))}
+        self.requests = []
+
+    def fetch_data(self, function, symbol='SPY', outputsize='compact', interval=None, month=None):
+        self.requests.append((symbol, outputsize))
+        if symbol not in self.bars:
+            raise ValueError("Error fetching data: Invalid API call")
+        today = self.now.strftime('%Y-%m-%d')
+        rows = [(day, values) for day, values in self.bars[symbol].items() if day < today]
+        if outputsize == 'compact':
+            rows = rows[:100]
+        return {'Meta Data': {'2. Symbol': symbol}, DAILY_KEY: dict(rows)}
+
+    def published(self, symbol):
+        today = self.now.strftime('%Y-%m-%d')
+        return [day for day in sorted(self.bars[symbol], reverse=True) if day < today]
+
+
+@pytest.fixture
+def market(tmp_path, monkeypatch):
+    market = FakeMarket(datetime(2022, 8, 1))
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return market.now
+
+    monkeypatch.setattr(stock_fetch, 'datetime', FrozenDatetime)
+    monkeypatch.setattr(stock_fetch, 'fetch_data', market.fetch_data)
+    monkeypatch.setattr(stock_fetch, 'HISTORY_DIR', str(tmp_path / 'history'))
+    monkeypatch.setattr(stock_fetch, 'STOCK_DIR', str(tmp_path / 'stock'))
+    return market
+
+
+def test_first_run_is_full_and_later_runs_are_compact(market):
+    series = stock_fetch.update_daily_history('SPY')
+    assert market.requests == [('SPY', 'full')]
+    assert series_store.format_dates(series['date']) == market.published('SPY')
+
+    market.now = datetime(2022, 8, 20)
+    # A stored bar corrected upstream: the refetched value wins
+    corrected = market.published('SPY')[20]
+    market.bars['SPY'][corrected] = dict(market.bars['SPY'][corrected], **{'4. close': '123.4500'})
+    series = stock_fetch.update_daily_history('SPY')
+    assert market.requests[-1] == ('SPY', 'compact')
+
+    stored, _ = series_store.read_series(os.path.join(stock_fetch.HISTORY_DIR, 'daily_SPY.series'))
+    dates = series_store.format_dates(stored['date'])
+    assert dates == series_store.format_dates(series['date']) == market.published('SPY')
+    assert stored['close'][dates.index(corrected)] == 123.45
+    expected = series_store.sort_by_date(series_store.from_alpha_vantage(market.fetch_data(
+        'TIME_SERIES_DAILY', 'SPY', outputsize='full')), descending=True)
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        np.testing.assert_array_equal(stored[column], expected[column])
+
+
+def test_long_gaps_refetch_the_full_history(market):
+    for symbol in ('SPY', 'QQQ'):
+        stock_fetch.update_daily_history(symbol)
+    latest = datetime.strptime(market.published('SPY')[0], '%Y-%m-%d').toordinal()
+    market.now = datetime.fromordinal(latest + stock_fetch.COMPACT_MAX_GAP_DAYS)
+    stock_fetch.update_daily_history('SPY')
+    market.now = datetime.fromordinal(latest + stock_fetch.COMPACT_MAX_GAP_DAYS + 1)
+    series = stock_fetch.update_daily_history('QQQ')
+    assert market.requests[2:] == [('SPY', 'compact'), ('QQQ', 'full')]
+    assert series_store.format_dates(series['date']) == market.published('QQQ')
+
+
+def test_failed_symbols_are_collected(market):
+    failed = stock_fetch.fetch_and_save_daily_many(['SPY', 'BAD', 'QQQ'], '2022-06-01', '2022-07-01',
+                                                   workers=3, requests_per_minute=6000)
+    assert failed == {'BAD': "Error fetching data: Invalid API call"}
+    for symbol in ('SPY', 'QQQ'):
+        with open(os.path.join(stock_fetch.STOCK_DIR, f'daily_{symbol}.json'), 'r') as file:
+            days = list(json.load(file)[DAILY_KEY])
+        assert days and all('2022-06-01' <= day < '2022-07-01' for day in days)
+    assert not os.path.exists(os.path.join(stock_fetch.STOCK_DIR, 'daily_BAD.json'))